@@ -12,7 +12,7 @@ export default function AdminClaimsPage() {
 
     useEffect(() => {
         apiClient.get("/admin/claims")
-            .then(res => setClaims(res.data))
+            .then(res => setClaims(res.data.items))
             .catch(err => console.error(err))
             .finally(() => setLoading(false));
     }, []);
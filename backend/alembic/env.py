@@ -13,7 +13,14 @@ from app.core.database import Base
 # Add backend directory to path so we can import app modules
 sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto  # noqa: F401
+from app.models.claims import (  # noqa: E402, F401
+    Claim,
+    ClaimAuditLog,
+    ClaimHistoryFeatures,
+    ClaimPhoto,
+)
+from app.models.payouts import Payout  # noqa: E402, F401
+from app.models.policies import Policy  # noqa: E402, F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
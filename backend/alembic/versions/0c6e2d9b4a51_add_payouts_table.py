@@ -0,0 +1,45 @@
+"""Add payouts table
+
+Revision ID: 0c6e2d9b4a51
+Revises: f3b8d61a2c47
+Create Date: 2026-10-18 17:21:09.402663
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0c6e2d9b4a51'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d61a2c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payouts',
+    sa.Column('id', sa.Uuid(as_uuid=True), nullable=False),
+    sa.Column('claim_id', sa.Uuid(as_uuid=True), nullable=False),
+    sa.Column('idempotency_key', sa.String(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('transfer_id', sa.String(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('paid_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['claim_id'], ['claims.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('claim_id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('payouts')
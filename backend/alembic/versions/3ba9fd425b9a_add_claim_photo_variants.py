@@ -0,0 +1,32 @@
+"""Add derived image variant paths to claim photos
+
+Revision ID: 3ba9fd425b9a
+Revises: 2feb53d2cb75
+Create Date: 2026-10-18 09:12:40.184512
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3ba9fd425b9a'
+down_revision: Union[str, Sequence[str], None] = '2feb53d2cb75'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('claim_photos', sa.Column('thumbnail_url', sa.String(), nullable=True))
+    op.add_column('claim_photos', sa.Column('inference_url', sa.String(), nullable=True))
+    op.add_column('claim_photos', sa.Column('llm_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('claim_photos', 'llm_url')
+    op.drop_column('claim_photos', 'inference_url')
+    op.drop_column('claim_photos', 'thumbnail_url')
@@ -0,0 +1,42 @@
+"""Add content and perceptual hash fingerprints to claim photos
+
+Revision ID: 8c1e5f0a7d24
+Revises: 3ba9fd425b9a
+Create Date: 2026-10-18 11:04:17.552903
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1e5f0a7d24'
+down_revision: Union[str, Sequence[str], None] = '3ba9fd425b9a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PHASH_BANDS = ['phash_band0', 'phash_band1', 'phash_band2', 'phash_band3']
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('claim_photos', sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.add_column('claim_photos', sa.Column('phash', sa.BigInteger(), nullable=True))
+    for band in PHASH_BANDS:
+        op.add_column('claim_photos', sa.Column(band, sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_claim_photos_sha256'), 'claim_photos', ['sha256'], unique=False)
+    for band in PHASH_BANDS:
+        op.create_index(op.f(f'ix_claim_photos_{band}'), 'claim_photos', [band], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for band in reversed(PHASH_BANDS):
+        op.drop_index(op.f(f'ix_claim_photos_{band}'), table_name='claim_photos')
+    op.drop_index(op.f('ix_claim_photos_sha256'), table_name='claim_photos')
+    for band in reversed(PHASH_BANDS):
+        op.drop_column('claim_photos', band)
+    op.drop_column('claim_photos', 'phash')
+    op.drop_column('claim_photos', 'sha256')
@@ -0,0 +1,44 @@
+"""Add claim listing indexes
+
+Revision ID: 9a4c7e1f2b63
+Revises: 0c6e2d9b4a51
+Create Date: 2026-10-18 18:02:47.118350
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c7e1f2b63'
+down_revision: Union[str, Sequence[str], None] = '0c6e2d9b4a51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The listing cursor is (created_at, id), so created_at must not be NULL
+    op.execute(
+        "UPDATE claims SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    )
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+    # Build the indexes without locking writes to the claims table
+    with op.get_context().autocommit_block():
+        op.create_index('ix_claims_created_at_id', 'claims', ['created_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_claims_status_created_at_id', 'claims', ['status', 'created_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_claims_status_created_at_id', table_name='claims', postgresql_concurrently=True)
+        op.drop_index('ix_claims_created_at_id', table_name='claims', postgresql_concurrently=True)
+
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
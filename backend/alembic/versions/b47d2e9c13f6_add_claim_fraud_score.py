@@ -0,0 +1,30 @@
+"""Add persisted fraud score to claims
+
+Revision ID: b47d2e9c13f6
+Revises: 8c1e5f0a7d24
+Create Date: 2026-10-18 13:26:51.307644
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b47d2e9c13f6'
+down_revision: Union[str, Sequence[str], None] = '8c1e5f0a7d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('claims', sa.Column('fraud_score', sa.Integer(), nullable=True))
+    op.add_column('claims', sa.Column('fraud_scored_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('claims', 'fraud_scored_at')
+    op.drop_column('claims', 'fraud_score')
@@ -0,0 +1,40 @@
+"""Add claim history feature table
+
+Revision ID: e5a90c7b3f18
+Revises: b47d2e9c13f6
+Create Date: 2026-10-18 14:48:03.915270
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a90c7b3f18'
+down_revision: Union[str, Sequence[str], None] = 'b47d2e9c13f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('claim_history_features',
+    sa.Column('id', sa.Uuid(as_uuid=True), nullable=False),
+    sa.Column('entity_type', sa.String(), nullable=False),
+    sa.Column('entity_key', sa.String(), nullable=False),
+    sa.Column('claim_count', sa.Integer(), nullable=False),
+    sa.Column('recent_claim_dates', sa.JSON(), nullable=False),
+    sa.Column('total_paid', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('last_claim_date', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entity_type', 'entity_key')
+    )
+    # Existing claims are backfilled with scripts/rebuild_claim_features.py
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('claim_history_features')
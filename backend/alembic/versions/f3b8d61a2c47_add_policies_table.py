@@ -0,0 +1,46 @@
+"""Add policies table
+
+Revision ID: f3b8d61a2c47
+Revises: e5a90c7b3f18
+Create Date: 2026-10-18 16:02:37.118402
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d61a2c47'
+down_revision: Union[str, Sequence[str], None] = 'e5a90c7b3f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('policies',
+    sa.Column('id', sa.Uuid(as_uuid=True), nullable=False),
+    sa.Column('policy_number', sa.String(), nullable=False),
+    sa.Column('holder_name', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('vehicle_vin', sa.String(), nullable=True),
+    sa.Column('vehicle_info', sa.String(), nullable=True),
+    sa.Column('coverage_limit', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('deductible', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('effective_date', sa.Date(), nullable=False),
+    sa.Column('expiration_date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_policies_policy_number'), 'policies', ['policy_number'], unique=True)
+    op.create_index(op.f('ix_policies_vehicle_vin'), 'policies', ['vehicle_vin'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_policies_vehicle_vin'), table_name='policies')
+    op.drop_index(op.f('ix_policies_policy_number'), table_name='policies')
+    op.drop_table('policies')
@@ -1,8 +1,11 @@
+import base64
+import json
 import uuid
-from typing import Any, List, Optional
+from datetime import datetime
+from typing import Any, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -10,30 +13,52 @@ from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.core.security import get_current_admin_user
 from app.models.claims import Claim, ClaimAuditLog
-from app.schemas.claims import ClaimResponse
+from app.schemas.claims import ClaimPage, ClaimResponse
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ClaimResponse])
+def _encode_cursor(claim: Claim) -> str:
+    raw = json.dumps([claim.created_at.isoformat(), str(claim.id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, claim_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), uuid.UUID(claim_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor") from None
+
+
+@router.get("/", response_model=ClaimPage)
 async def list_claims(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
     status: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_admin=Depends(get_current_admin_user),
 ) -> Any:
     """
-    List all claims (admin).
+    List claims (admin), newest first. Pass ``next_cursor`` from a page as
+    ``cursor`` to get the next one.
     """
     query = select(Claim).options(selectinload(Claim.photos))
     if status:
         query = query.where(Claim.status == status)
+    if cursor:
+        # Seek past the last row of the previous page instead of OFFSET, so
+        # deep pages cost the same as the first one
+        query = query.where(tuple_(Claim.created_at, Claim.id) < _decode_cursor(cursor))
 
-    query = query.offset(skip).limit(limit).order_by(Claim.created_at.desc())
+    # One extra row tells whether there is a next page
+    query = query.order_by(Claim.created_at.desc(), Claim.id.desc()).limit(limit + 1)
     result = await db.execute(query)
     claims = result.scalars().all()
-    return claims
+
+    next_cursor = _encode_cursor(claims[limit - 1]) if len(claims) > limit else None
+    return {"items": claims[:limit], "next_cursor": next_cursor}
 
 
 @router.get("/{claim_id}", response_model=ClaimResponse)
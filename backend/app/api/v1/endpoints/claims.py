@@ -1,12 +1,10 @@
-import asyncio
-import os
+import logging
 import secrets
 import uuid
 from datetime import datetime
 from typing import Any
 
-import magic
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.exc import IntegrityError  # pylint: disable=import-error
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -22,8 +20,12 @@ from app.schemas.claims import (
     ClaimPublicStatusResponse,
     ClaimResponse,
 )
+from app.services.ingest import StreamingUploadIngest
+from app.services.photo_index import band_columns, find_by_sha256, phash_columns
 from app.services.storage import storage_service
-from app.tasks import analyze_claim_task
+from app.tasks import analyze_claim_task, generate_photo_variants_task
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -112,48 +114,68 @@ async def lookup_claim(request: Request, claim_number: str, db: AsyncSession = D
     "/{claim_id}/photos",
     response_model=ClaimPhotoResponse,
     dependencies=[Depends(get_api_key)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                    }
+                }
+            },
+        }
+    },
 )
 async def upload_claim_photo(
     claim_id: uuid.UUID,
-    file: UploadFile = File(...),
+    request: Request,
     db: AsyncSession = Depends(get_db),
 ) -> Any:
     """
     Upload a photo for a claim.
+
+    The multipart body is streamed straight to storage: the MIME type is
+    sniffed from the first bytes, the size limit is enforced and a SHA-256 is
+    computed in the same pass. Byte-identical uploads share one stored file,
+    and the perceptual hash for near-duplicate checks is computed before the
+    photo is recorded.
     """
-    # 1. Validate File Content Type via magic bytes
-    file_content = await file.read(2048)
-    # Offload the synchronous python-magic call to a thread to prevent blocking the async event loop
-    actual_mime_type = await asyncio.to_thread(
-        magic.from_buffer, file_content, mime=True
+    upload = await StreamingUploadIngest(
+        request,
+        allowed_mime_types=ALLOWED_MIME_TYPES,
+        allowed_extensions=ALLOWED_EXTENSIONS,
+    ).ingest()
+    file_path = upload.path
+
+    existing = await find_by_sha256(db, upload.sha256)
+    shared_file = existing is not None and await storage_service.exists(
+        existing.photo_url
     )
-    await file.seek(0)
-
-    if actual_mime_type not in ALLOWED_MIME_TYPES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file content type: {actual_mime_type}. Allowed types: {', '.join(ALLOWED_MIME_TYPES)}",
-        )
-
-    # 2. Validate File Extension (Strict enforcement to prevent unrestricted file upload)
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Filename missing")
-
-    _, ext = os.path.splitext(file.filename)
-    if ext.lower() not in ALLOWED_EXTENSIONS:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Security Policy Violation: Invalid file extension: {ext}. Allowed extensions: {', '.join(ALLOWED_EXTENSIONS)}",
-        )
-
-    # Save file
-    file_path = await storage_service.upload_file(file)
+    fingerprint = {}
+    if shared_file:
+        # Same bytes are already stored: reuse that file and its fingerprint
+        await storage_service.delete_file(file_path)
+        file_path = existing.photo_url
+        fingerprint = band_columns(existing.phash)
+    if not fingerprint:
+        # Hashed here rather than only in the best-effort variants task, so
+        # duplicate checks never depend on that task having run
+        try:
+            data = await storage_service.read_bytes(file_path)
+            fingerprint = await phash_columns(data)
+        except Exception as e:
+            logger.error(f"Failed to hash uploaded photo {file_path}: {e}")
 
     # Create Photo Record
     new_photo = ClaimPhoto(
         claim_id=claim_id,
         photo_url=file_path,  # Storing local path as URL for now
-        photo_type=file.content_type,
+        photo_type=upload.content_type,
+        sha256=upload.sha256,
+        **fingerprint,
     )
 
     db.add(new_photo)
@@ -161,12 +183,20 @@ async def upload_claim_photo(
         await db.commit()
     except IntegrityError as exc:
         await db.rollback()
-        # Clean up the orphaned file
-        await storage_service.delete_file(file_path)
+        # Clean up the orphaned file, unless another photo still references it
+        if not shared_file:
+            await storage_service.delete_file(file_path)
         raise HTTPException(status_code=404, detail="Claim not found") from exc
 
     await db.refresh(new_photo)
 
+    # Derive thumbnail and inference-size variants off the request path. The
+    # photo is already stored, so a broker outage must not fail the upload.
+    try:
+        generate_photo_variants_task.delay(str(new_photo.id))
+    except Exception as e:
+        logger.error(f"Failed to queue photo variants for photo {new_photo.id}: {e}")
+
     return new_photo
 
 
@@ -1,8 +1,16 @@
+import logging
+
 from fastapi import APIRouter, Depends
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import get_redis_client
+from app.core.config import settings
 from app.core.database import get_db
+from app.core.metrics import metrics, process_id, published_snapshots
+from app.core.security import get_api_key
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -34,3 +42,19 @@ async def health_check(db: AsyncSession = Depends(get_db)):
         "database": db_status,
         "migrations": migration_status,
     }
+
+
+@router.get("/metrics", dependencies=[Depends(get_api_key)])
+async def get_metrics():
+    """
+    Counters and gauges (cache hit rates, queue depths, ...) of this API
+    process and of every worker that published recently.
+    """
+    workers = {}
+    try:
+        workers = await published_snapshots(
+            get_redis_client(), max_age=settings.METRICS_PUBLISH_INTERVAL_SECONDS * 4
+        )
+    except Exception as e:
+        logger.warning(f"Reading published metrics failed: {e}")
+    return {"api": {"process": process_id(), **metrics.snapshot()}, "workers": workers}
@@ -6,18 +6,27 @@ import stripe
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
 
-from app.core.config import settings
 from app.core.database import get_db
 from app.core.security import get_api_key
 from app.models.claims import Claim
 from app.schemas.claims import ClaimResponse
+from app.services.payout_service import payout_service
+from app.tasks import payout_run_task
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Configure Stripe API Key
-stripe.api_key = getattr(settings, "STRIPE_SECRET_KEY", None)
+
+@router.post("/payout-runs", status_code=202, dependencies=[Depends(get_api_key)])
+async def start_payout_run():
+    """
+    Queue a bulk payout run over all approved, unpaid claims. The run report
+    is the task's result and is also logged by the worker.
+    """
+    task = payout_run_task.delay()
+    return {"task_id": task.id, "status": "Payout run queued"}
 
 
 @router.post(
@@ -31,7 +40,13 @@ async def initiate_payout(
     """
     Initiate Stripe ACH/transfer payout for a claim.
     """
-    result = await db.execute(select(Claim).where(Claim.id == claim_id))
+    # Lock the claim so concurrent payout requests for it are serialized
+    result = await db.execute(
+        select(Claim)
+        .where(Claim.id == claim_id)
+        .options(selectinload(Claim.photos))
+        .with_for_update()
+    )
     claim = result.scalars().first()
 
     if not claim:
@@ -42,34 +57,8 @@ async def initiate_payout(
             status_code=400, detail="Only approved claims can be paid out"
         )
 
-    # The actual Stripe integration
     try:
-        # For an alpha MVP, if the Stripe Secret Key isn't provided, use a mock transfer ID.
-        if getattr(settings, "STRIPE_SECRET_KEY", None):
-            # We assume a dummy destination account since we don't capture this strictly in the FNOL form yet.
-            # In a production app, the claimant would link their bank account via Stripe Connect.
-            mock_destination = "acct_1032D82eZvKYlo2C"
-
-            # Amount is expected in cents
-            amount_in_cents = (
-                int(claim.approved_amount * 100) if claim.approved_amount else 0
-            )
-
-            if amount_in_cents > 0:
-                # Synchronous Stripe API calls. Depending on load, might wrap in asyncio.to_thread()
-                stripe.Transfer.create(
-                    amount=amount_in_cents,
-                    currency="usd",
-                    destination=mock_destination,
-                    description=f"Insurance claim payout: {claim.claim_number}",
-                )
-            else:
-                raise ValueError("Approved amount must be greater than zero.")
-        else:
-            import secrets
-            logger.info("STRIPE_SECRET_KEY not set. Mocking Stripe payout transfer.")
-            f"tr_{secrets.token_hex(12)}"
-
+        await payout_service.pay_claim(db, claim)
     except stripe.error.StripeError as e:
         logger.error(f"Stripe error during payout for claim {claim_id}: {str(e)}")
         raise HTTPException(
@@ -81,10 +70,6 @@ async def initiate_payout(
             status_code=500, detail="Internal server error during payout"
         ) from e
 
-    claim.status = "Paid"
-    # Note: A real implementation would store transfer_id in a new column on the Claim model
-
-    await db.commit()
     await db.refresh(claim)
 
     return claim
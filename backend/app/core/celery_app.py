@@ -1,6 +1,12 @@
+import gc
+
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 
 from app.core.config import settings
+from app.core.metrics import publish_periodically
+from app.core.worker_loop import worker_loop
 
 celery_app = Celery(
     "worker",
@@ -12,6 +18,9 @@ celery_app.conf.task_routes = {
     "app.tasks.adjudication_task": "main-queue",
     "app.tasks.ai_analysis_task": "main-queue",
     "app.tasks.email_task": "main-queue",
+    "app.tasks.fraud_rescore_task": "main-queue",
+    "app.tasks.payout_run_task": "main-queue",
+    "app.tasks.photo_variants_task": "main-queue",
 }
 
 celery_app.conf.update(
@@ -21,3 +30,67 @@ celery_app.conf.update(
     timezone="UTC",
     enable_utc=True,
 )
+
+celery_app.conf.beat_schedule = {}
+if settings.FRAUD_RESCORE_ENABLED:
+    celery_app.conf.beat_schedule["nightly-fraud-rescore"] = {
+        "task": "app.tasks.fraud_rescore_task",
+        "schedule": crontab(hour=settings.FRAUD_RESCORE_HOUR, minute=0),
+    }
+if settings.PAYOUT_RUN_SCHEDULE_ENABLED:
+    celery_app.conf.beat_schedule["end-of-day-payout-run"] = {
+        "task": "app.tasks.payout_run_task",
+        "schedule": crontab(hour=settings.PAYOUT_RUN_HOUR, minute=0),
+    }
+
+
+@worker_init.connect
+def preload_worker_models(**kwargs):
+    """
+    Load the models in the parent process before the pool is forked, so every
+    child starts warm and shares the weights copy-on-write instead of loading
+    its own copy on its first claim.
+    """
+    if not settings.PRELOAD_MODELS:
+        return
+
+    from app.services.model_preload import preload_models
+
+    preload_models()
+    # Move everything allocated so far out of the GC's reach: collections in
+    # the children would otherwise touch (and so copy) the shared pages.
+    gc.freeze()
+
+
+# Long-running coroutines started on each worker process's loop
+_background = {}
+
+
+@worker_process_init.connect
+def start_worker_loop(**kwargs):
+    """Give each forked worker process its own long-lived event loop."""
+    if not settings.CELERY_PERSISTENT_LOOP:
+        return
+
+    from app.core.database import engine
+
+    # Pooled connections inherited from the parent must not be shared after fork
+    engine.sync_engine.dispose(close=False)
+    worker_loop.start()
+    _background["metrics"] = worker_loop.submit(publish_periodically("celery-worker"))
+
+
+@worker_process_shutdown.connect
+def stop_worker_loop(**kwargs):
+    for future in _background.values():
+        future.cancel()
+    _background.clear()
+    worker_loop.stop(_close_async_resources())
+
+
+async def _close_async_resources():
+    from app.core.database import engine
+    from app.services.vision_batcher import vision_batcher
+
+    await vision_batcher.close()
+    await engine.dispose()
@@ -27,6 +27,122 @@ class Settings(BaseSettings):
     # Redis Cache
     REDIS_URL: str = "redis://localhost:6379"
 
+    # Maximum number of images fed to the YOLO model in a single forward pass
+    YOLO_MAX_BATCH_SIZE: int = 16
+
+    # Damage detector runtime: "torch" (ultralytics) or "onnx" (ONNX Runtime,
+    # using the model exported by scripts/train_yolo.py --export). ONNX falls
+    # back to torch when onnxruntime or the exported model is missing.
+    VISION_BACKEND: str = "torch"
+    ONNX_MODEL_PATH: Optional[str] = None
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = one per physical core
+    ONNX_EXECUTION_PROVIDER: str = "CPUExecutionProvider"
+
+    # Cross-claim micro-batching of vision inference
+    VISION_MICROBATCH_ENABLED: bool = True
+    VISION_BATCH_WINDOW_MS: int = 15
+
+    # Run Celery tasks on one long-lived event loop per worker process
+    CELERY_PERSISTENT_LOOP: bool = True
+
+    # Load the YOLO and fraud models when a worker starts, before it takes work
+    PRELOAD_MODELS: bool = True
+
+    # Workers publish their metrics to Redis this often, for GET /metrics
+    METRICS_PUBLISH_INTERVAL_SECONDS: int = 15
+
+    # Async-native analysis worker (python -m app.worker) stage limits
+    ASYNC_WORKER_CLAIM_CONCURRENCY: int = 50
+    ASYNC_WORKER_CPU_PROCESSES: int = 2
+    ASYNC_WORKER_LLM_CONCURRENCY: int = 20
+    # Consumers refresh a heartbeat this often (TTL is three intervals); the
+    # in-flight messages of a consumer whose heartbeat expired are requeued
+    ASYNC_WORKER_HEARTBEAT_SECONDS: int = 10
+    # Messages requeued more often than this (e.g. they crash the worker)
+    # go to the unhandled list instead
+    ASYNC_WORKER_MAX_REDELIVERIES: int = 3
+
+    # Adaptive (AIMD) cap on concurrent Claude calls per process, and retries
+    # with jittered exponential backoff on rate-limit/overload responses
+    LLM_MAX_CONCURRENCY: int = 20
+    LLM_MIN_CONCURRENCY: int = 1
+    LLM_MAX_RETRIES: int = 4
+    LLM_RETRY_BASE_DELAY: float = 1.0
+    LLM_RETRY_MAX_DELAY: float = 30.0
+    # Stream responses and stop reading once the assessment JSON is complete
+    LLM_STREAMING: bool = True
+
+    # Skip the Claude call for claims whose adjudication outcome is already
+    # fixed by the policy, YOLO detections or duplicate photos
+    TRIAGE_ENABLED: bool = True
+    TRIAGE_MIN_VISION_CONFIDENCE: float = 0.6
+
+    # Bulk re-analysis through the Message Batches API (scripts/reanalyze_claims.py)
+    ANTHROPIC_API_URL: str = "https://api.anthropic.com"
+    LLM_BATCH_MAX_REQUESTS: int = 200
+    # Serialized size cap per batch, below the API's 256 MB limit: requests
+    # carry several base64 images each
+    LLM_BATCH_MAX_BYTES: int = 200 * 1024 * 1024
+    LLM_BATCH_POLL_INTERVAL: float = 60.0
+
+    # Content-addressed cache of AI damage assessments (Redis + in-process LRU)
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    AI_CACHE_LOCAL_MAXSIZE: int = 256
+
+    # Downscale and re-encode photos before sending them to Claude
+    LLM_IMAGE_PREPROCESS: bool = True
+    LLM_IMAGE_MAX_EDGE: int = 1568
+    LLM_IMAGE_FORMAT: str = "JPEG"  # JPEG or WEBP
+    LLM_IMAGE_QUALITY: int = 85
+
+    # Variants generated at upload time for YOLO and the admin dashboard
+    YOLO_INFERENCE_IMAGE_SIZE: int = 640
+    THUMBNAIL_MAX_EDGE: int = 256
+
+    # Photo storage: "local" (uploads/ on disk) or "s3" (any S3-compatible
+    # service; point S3_ENDPOINT_URL at MinIO for local development)
+    STORAGE_BACKEND: str = "local"
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_MULTIPART_CHUNK_SIZE: int = 8 * 1024 * 1024
+    STORAGE_PRESIGNED_URL_EXPIRY: int = 3600
+
+    # Stripe payouts; without a secret key transfers are mocked. The SDK is
+    # synchronous, so calls run on a bounded thread pool of this size.
+    STRIPE_SECRET_KEY: Optional[str] = None
+    STRIPE_MAX_NETWORK_RETRIES: int = 2
+    PAYOUT_MAX_WORKERS: int = 8
+
+    # Bulk payout runs of approved claims (scripts/run_payouts.py, the
+    # payout-runs endpoint, or Celery beat at PAYOUT_RUN_HOUR UTC when enabled)
+    PAYOUT_RUN_SCHEDULE_ENABLED: bool = False
+    PAYOUT_RUN_HOUR: int = 22
+    PAYOUT_RUN_BATCH_SIZE: int = 100
+    PAYOUT_RUN_CONCURRENCY: int = 8
+    PAYOUT_MAX_ATTEMPTS: int = 5
+
+    # Nightly fraud re-scoring of the claims book (Celery beat, UTC)
+    FRAUD_RESCORE_ENABLED: bool = True
+    FRAUD_RESCORE_HOUR: int = 2
+    FRAUD_RESCORE_BATCH_SIZE: int = 5000
+
+    # In-process cache of per-policy/VIN claim history features
+    FEATURE_CACHE_TTL_SECONDS: int = 60
+    FEATURE_CACHE_MAXSIZE: int = 10000
+
+    # Policy lookups: in-process LRU in front of Redis (see app.services.policy_store)
+    POLICY_CACHE_TTL_SECONDS: int = 3600
+    POLICY_CACHE_LOCAL_TTL_SECONDS: int = 30
+    POLICY_CACHE_LOCAL_MAXSIZE: int = 10000
+    # Unknown policy numbers are cached too, for this long
+    POLICY_CACHE_NEGATIVE_TTL_SECONDS: int = 60
+    # Probabilistic early refresh (XFetch) weight; higher refreshes earlier, 0 disables
+    POLICY_CACHE_EARLY_REFRESH_BETA: float = 1.0
+
     @field_validator("BACKEND_CORS_ORIGINS", mode="before")
     @classmethod
     def assemble_cors_origins(cls, v: Union[str, List[str]]) -> Union[List[str], str]:
@@ -0,0 +1,35 @@
+import asyncio
+import functools
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Executor used for CPU-bound stages (YOLO inference, fraud scoring). When unset
+# they run on the default thread pool via asyncio.to_thread; the async worker
+# installs a bounded process pool so they stop competing with the event loop.
+_cpu_executor: Optional[Executor] = None
+
+
+def set_cpu_executor(executor: Optional[Executor]) -> None:
+    global _cpu_executor
+    _cpu_executor = executor
+
+
+def get_cpu_executor() -> Optional[Executor]:
+    return _cpu_executor
+
+
+async def run_cpu_bound(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a CPU-bound callable off the event loop.
+
+    Callables sent to a process pool must be picklable; service singletons
+    pickle as a reference to the copy already loaded in the child process.
+    """
+    if _cpu_executor is None:
+        return await asyncio.to_thread(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _cpu_executor, functools.partial(func, *args, **kwargs)
+    )
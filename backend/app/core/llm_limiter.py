@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Optional
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Process-wide cap on in-flight calls to a rate-limited upstream, with the
+    cap adjusted AIMD-style (as TCP congestion control does): every success
+    grows it by ``1 / limit`` (about one slot per round of calls, up to
+    ``max_limit``) and an overload response halves it (down to ``min_limit``).
+    Callers beyond the cap wait in FIFO order, so load converges on what the
+    provider accepts instead of bursting into 429s.
+
+    Like the other asyncio primitives it must only be used from one event
+    loop at a time; each worker process has its own instance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        decrease_factor: float = 0.5,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.decrease_factor = decrease_factor
+        self._limit = float(initial_limit or self.max_limit)
+        self._in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = float("-inf")
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def configure(self, max_limit: int) -> None:
+        """Change the ceiling (e.g. from the async worker's LLM concurrency)."""
+        self.max_limit = max(self.min_limit, max_limit)
+        self._limit = float(self.max_limit)
+        self._wake()
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold one slot for the duration of a call; yields its start time."""
+        await self._acquire()
+        try:
+            yield time.monotonic()
+        finally:
+            self._in_flight -= 1
+            self._wake()
+
+    def record_success(self) -> None:
+        self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+        self._wake()
+
+    def record_overload(self, started_at: float) -> None:
+        """
+        Back off after a 429/overloaded response. Calls that were already in
+        flight when the limit last dropped report the same congestion, so
+        they do not shrink it again.
+        """
+        metrics.increment(f"{self.name}.overloaded")
+        if started_at < self._last_decrease:
+            return
+        self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+        self._last_decrease = time.monotonic()
+        self._publish()
+
+    async def _acquire(self) -> None:
+        if not self._waiters and self._in_flight < self.limit:
+            self._in_flight += 1
+            self._publish()
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._in_flight -= 1
+                self._wake()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass  # _wake() already dropped it as done
+                self._publish()
+            raise
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set_gauge(f"{self.name}.concurrency_limit", self.limit)
+        metrics.set_gauge(f"{self.name}.in_flight", self._in_flight)
+        metrics.set_gauge(f"{self.name}.queue_depth", self.queue_depth)
+
+
+llm_limiter = AdaptiveConcurrencyLimiter(
+    "llm",
+    max_limit=settings.LLM_MAX_CONCURRENCY,
+    min_limit=settings.LLM_MIN_CONCURRENCY,
+)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Redis hash of the latest snapshot published by each process
+PUBLISHED_KEY = "metrics:processes"
+
+
+def process_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process counters and gauges.
+
+    Values are per process. Worker processes publish their snapshot to Redis
+    periodically (``publish_periodically``), and the ``/metrics`` endpoint
+    returns the serving API process's snapshot alongside the published ones.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def get(self, name: str) -> float:
+        with self._lock:
+            return self._gauges.get(name, self._counters.get(name, 0))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {"counters": dict(self._counters), "gauges": dict(self._gauges)}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+
+    async def publish(self, client, role: str) -> None:
+        entry = {"role": role, "published_at": time.time(), **self.snapshot()}
+        await client.hset(PUBLISHED_KEY, process_id(), json.dumps(entry))
+
+
+metrics = MetricsRegistry()
+
+
+async def published_snapshots(client, max_age: float) -> Dict[str, Any]:
+    """Snapshots published by other processes; stale ones are dropped."""
+    snapshots = {}
+    for process, raw in (await client.hgetall(PUBLISHED_KEY)).items():
+        entry = json.loads(raw)
+        if time.time() - entry["published_at"] > max_age:
+            # The process has stopped (or restarted under a new pid)
+            await client.hdel(PUBLISHED_KEY, process)
+        else:
+            snapshots[process] = entry
+    return snapshots
+
+
+async def publish_periodically(role: str, interval: Optional[float] = None) -> None:
+    """Publish this process's metrics to Redis until cancelled."""
+    from app.core.cache import get_redis_client
+    from app.core.config import settings
+
+    interval = interval or settings.METRICS_PUBLISH_INTERVAL_SECONDS
+    while True:
+        try:
+            await metrics.publish(get_redis_client(), role)
+        except Exception as e:
+            logger.warning(f"Publishing metrics failed: {e}")
+        await asyncio.sleep(interval)
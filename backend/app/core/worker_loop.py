@@ -0,0 +1,92 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerEventLoop:
+    """
+    A long-lived asyncio event loop owned by a worker process.
+
+    The loop runs in a daemon thread; synchronous callers (Celery tasks) submit
+    coroutines into it and block on the result. Because the loop survives
+    across tasks, the async DB engine's connection pool, the Anthropic HTTP
+    client's keep-alive connections and any other loop-bound state are reused
+    instead of being rebuilt by ``asyncio.run`` on every task.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._loop is not None and self._loop.is_running()
+
+    def start(self) -> None:
+        with self._lock:
+            if self.is_running:
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_forever():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+
+            self._thread = threading.Thread(
+                target=run_forever, name="worker-event-loop", daemon=True
+            )
+            self._loop = loop
+            self._thread.start()
+            ready.wait()
+            logger.info("Started persistent worker event loop")
+
+    def run(self, coro: Coroutine[Any, Any, Any], timeout: Optional[float] = None):
+        """
+        Run ``coro`` to completion on the persistent loop and return its result.
+        Falls back to a throwaway ``asyncio.run`` when the loop is not started
+        (e.g. tasks executed eagerly in tests or outside a worker).
+        """
+        if not self.is_running:
+            return asyncio.run(coro)
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """Schedule ``coro`` on the persistent loop without waiting for it."""
+        if not self.is_running:
+            coro.close()
+            raise RuntimeError("Worker event loop is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def stop(self, shutdown: Optional[Coroutine[Any, Any, Any]] = None) -> None:
+        """
+        Run an optional ``shutdown`` coroutine (e.g. disposing the DB engine)
+        on the loop, then stop it and join its thread.
+        """
+        with self._lock:
+            if not self.is_running:
+                if shutdown is not None:
+                    shutdown.close()
+                return
+            loop, thread = self._loop, self._thread
+            if shutdown is not None:
+                try:
+                    asyncio.run_coroutine_threadsafe(shutdown, loop).result(30)
+                except Exception as e:
+                    logger.error(f"Error during worker loop shutdown: {e}")
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=30)
+            loop.close()
+            self._loop = None
+            self._thread = None
+            logger.info("Stopped persistent worker event loop")
+
+
+worker_loop = WorkerEventLoop()
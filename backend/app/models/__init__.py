@@ -1,4 +1,14 @@
-from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
+from app.models.claims import Claim, ClaimAuditLog, ClaimHistoryFeatures, ClaimPhoto
+from app.models.payouts import Payout
+from app.models.policies import Policy
 from app.models.users import AdminUser
 
-__all__ = ["Claim", "ClaimPhoto", "ClaimAuditLog", "AdminUser"]
+__all__ = [
+    "Claim",
+    "ClaimPhoto",
+    "ClaimAuditLog",
+    "ClaimHistoryFeatures",
+    "Policy",
+    "Payout",
+    "AdminUser",
+]
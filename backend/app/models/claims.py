@@ -2,13 +2,16 @@ import uuid
 
 from sqlalchemy import (
     JSON,
+    BigInteger,
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
     String,
     Text,
+    UniqueConstraint,
     Uuid,
 )
 from sqlalchemy.orm import relationship
@@ -36,7 +39,14 @@ class Claim(Base):
     status = Column(String, default="pending", index=True)
     estimated_damage_cost = Column(Numeric(10, 2), nullable=True)
     approved_amount = Column(Numeric(10, 2), nullable=True)
-    created_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
+    # Latest fraud risk (0-100), from analysis or the nightly re-scoring job
+    fraud_score = Column(Integer, nullable=True)
+    fraud_scored_at = Column(DateTime, nullable=True)
+    created_at = Column(
+        DateTime,
+        nullable=False,
+        default=func.now(),  # pylint: disable=not-callable
+    )
     updated_at = Column(
         DateTime,
         default=func.now(),
@@ -50,6 +60,13 @@ class Claim(Base):
         "ClaimAuditLog", back_populates="claim", cascade="all, delete-orphan"
     )
 
+    # Keyset pagination of the admin claim list, newest first, with and
+    # without a status filter
+    __table_args__ = (
+        Index("ix_claims_created_at_id", "created_at", "id"),
+        Index("ix_claims_status_created_at_id", "status", "created_at", "id"),
+    )
+
 
 class ClaimPhoto(Base):
     __tablename__ = "claim_photos"
@@ -60,6 +77,17 @@ class ClaimPhoto(Base):
     )
     photo_url = Column(String, nullable=False)
     photo_type = Column(String, nullable=True)
+    # Derived variants produced after upload (see generate_photo_variants_task)
+    thumbnail_url = Column(String, nullable=True)
+    inference_url = Column(String, nullable=True)
+    llm_url = Column(String, nullable=True)
+    # Content fingerprints for duplicate detection (see app.services.photo_index)
+    sha256 = Column(String(64), nullable=True, index=True)
+    phash = Column(BigInteger, nullable=True)
+    phash_band0 = Column(Integer, nullable=True, index=True)
+    phash_band1 = Column(Integer, nullable=True, index=True)
+    phash_band2 = Column(Integer, nullable=True, index=True)
+    phash_band3 = Column(Integer, nullable=True, index=True)
     ai_analysis = Column(JSON, nullable=True)
     uploaded_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
 
@@ -79,3 +107,28 @@ class ClaimAuditLog(Base):
     created_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
 
     claim = relationship("Claim", back_populates="audit_logs")
+
+
+class ClaimHistoryFeatures(Base):
+    """
+    Claim history aggregated per policy or per vehicle, kept up to date as
+    claims are created and change status (see app.services.feature_store),
+    so fraud features are a single indexed lookup at analysis time.
+    """
+
+    __tablename__ = "claim_history_features"
+    __table_args__ = (UniqueConstraint("entity_type", "entity_key"),)
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entity_type = Column(String, nullable=False)  # "policy" or "vin"
+    entity_key = Column(String, nullable=False)
+    claim_count = Column(Integer, nullable=False, default=0)
+    # Claim dates inside the longest rolling window, for windowed counts
+    recent_claim_dates = Column(JSON, nullable=False, default=list)
+    total_paid = Column(Numeric(12, 2), nullable=False, default=0)
+    last_claim_date = Column(DateTime, nullable=True)
+    updated_at = Column(
+        DateTime,
+        default=func.now(),
+        onupdate=func.now(),  # pylint: disable=not-callable
+    )
@@ -0,0 +1,43 @@
+import uuid
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    Uuid,
+)
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Payout(Base):
+    """
+    One claim's payout and its Stripe transfer. The idempotency key is derived
+    from the claim, so retrying a payout never creates a second transfer.
+    """
+
+    __tablename__ = "payouts"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    claim_id = Column(
+        Uuid(as_uuid=True), ForeignKey("claims.id"), unique=True, nullable=False
+    )
+    idempotency_key = Column(String, unique=True, nullable=False)
+    amount = Column(Numeric(10, 2), nullable=False)
+    currency = Column(String(3), nullable=False, default="usd")
+    status = Column(String, nullable=False, default="pending")  # pending, paid, failed
+    transfer_id = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    paid_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
+    updated_at = Column(
+        DateTime,
+        default=func.now(),
+        onupdate=func.now(),  # pylint: disable=not-callable
+    )
@@ -0,0 +1,28 @@
+import uuid
+
+from sqlalchemy import Column, Date, DateTime, Numeric, String, Uuid
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class Policy(Base):
+    __tablename__ = "policies"
+
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    policy_number = Column(String, unique=True, nullable=False, index=True)
+    holder_name = Column(String, nullable=False)
+    # Active, Expired, Cancelled
+    status = Column(String, nullable=False, default="Active")
+    vehicle_vin = Column(String, nullable=True, index=True)
+    vehicle_info = Column(String, nullable=True)
+    coverage_limit = Column(Numeric(12, 2), nullable=False)
+    deductible = Column(Numeric(10, 2), nullable=False, default=0)
+    effective_date = Column(Date, nullable=False)
+    expiration_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=func.now())  # pylint: disable=not-callable
+    updated_at = Column(
+        DateTime,
+        default=func.now(),
+        onupdate=func.now(),  # pylint: disable=not-callable
+    )
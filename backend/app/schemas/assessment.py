@@ -0,0 +1,21 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+
+class DamageAssessment(BaseModel):
+    """The JSON object Claude is asked to return for a claim."""
+
+    severity: Literal["minor", "moderate", "major", "total_loss"]
+    damaged_parts: List[str]
+    estimated_cost: float = Field(..., ge=0)
+    confidence: float = Field(..., ge=0, le=1)
+    fraud_indicators: List[str] = []
+    reasoning: str = ""
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def normalize_severity(cls, v):
+        if isinstance(v, str):
+            return v.strip().lower().replace(" ", "_")
+        return v
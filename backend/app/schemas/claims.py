@@ -3,7 +3,17 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from pydantic import (
+    AliasChoices,
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_serializer,
+    field_validator,
+)
+
+from app.services.storage import storage_service
 
 
 class ClaimBase(BaseModel):
@@ -45,11 +55,20 @@ class ClaimCreate(ClaimBase):
 class ClaimPhotoResponse(BaseModel):
     id: UUID
     photo_url: str
+    thumbnail_url: Optional[str] = None
     description: Optional[str] = None
-    created_at: datetime
+    # Stored as ClaimPhoto.uploaded_at
+    created_at: datetime = Field(
+        validation_alias=AliasChoices("created_at", "uploaded_at")
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
+    @field_serializer("photo_url", "thumbnail_url")
+    def serialize_storage_key(self, key: Optional[str]) -> Optional[str]:
+        # Stored values are storage keys; clients get a URL they can load
+        return storage_service.download_url(key) if key else key
+
 
 class ClaimResponse(ClaimBase):
     id: UUID
@@ -62,6 +81,12 @@ class ClaimResponse(ClaimBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ClaimPage(BaseModel):
+    items: List[ClaimResponse]
+    # Opaque cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
 class ClaimPublicStatusResponse(BaseModel):
     claim_number: str
     status: str
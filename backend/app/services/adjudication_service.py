@@ -1,4 +1,5 @@
 import logging
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
@@ -17,14 +18,15 @@ class AdjudicationService:
 
     @classmethod
     def evaluate_claim(
-        cls, claim: dict, policy: dict, ai_analysis: dict, fraud_score: int
+        cls, claim: dict, policy: Optional[dict], ai_analysis: dict, fraud_score: int
     ) -> dict:
         """
         Evaluate a claim for auto-approval.
 
         Args:
             claim: Dictionary containing claim details (estimated_damage_cost, etc.)
-            policy: Dictionary containing policy details (status, coverage_limit, deductible)
+            policy: Dictionary containing policy details (status, coverage_limit, deductible),
+                or None if the policy does not exist
             ai_analysis: Dictionary containing AI results (confidence, red_flags)
             fraud_score: Integer representing risk score.
 
@@ -33,6 +35,10 @@ class AdjudicationService:
         """
         reasons = []
 
+        # 0. Claims against a policy missing from the policy store need a human
+        if policy is None:
+            return {"status": "Manual Review", "reason": "Policy not found."}
+
         # 1. Deterministic Rule: Policy must be Active
         policy_status = policy.get("status")
         if not policy_status or policy_status.upper() != "ACTIVE":
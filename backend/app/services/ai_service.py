@@ -1,19 +1,45 @@
 import asyncio
 import base64
-import json
+import hashlib
 import logging
 import os
+import random
 import re
 
-import aiofiles
+import anthropic
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import ValidationError
 
 from app.core.config import settings
-from app.services.vision_service import yolo_vision_service
+from app.core.llm_limiter import llm_limiter
+from app.core.metrics import metrics
+from app.schemas.assessment import DamageAssessment
+from app.services.assessment_cache import assessment_cache, make_assessment_key
+from app.services.image_processing import llm_image_profile, prepare_llm_image
+from app.services.storage import storage_service
+from app.services.structured_output import (
+    IncrementalJSONObjectParser,
+    parse_json_object,
+)
+from app.services.vision_batcher import vision_batcher
 
 logger = logging.getLogger(__name__)
 
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+# Shortest prefix the API will cache for Sonnet models
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# Rate limited (429) and overloaded (529): the provider is at capacity
+OVERLOAD_STATUS_CODES = {429, 529}
+RETRYABLE_STATUS_CODES = OVERLOAD_STATUS_CODES | {500, 502, 503, 504}
+
 
 def sanitize_input(text: str) -> str:
     """Sanitize user input to prevent prompt injection."""
@@ -21,32 +47,43 @@ def sanitize_input(text: str) -> str:
 
 
 class ClaudeAIService:
+    MODEL_NAME = "claude-3-5-sonnet-20241022"
+    MAX_TOKENS = 1024
+
     def __init__(self):
         api_key = getattr(settings, "ANTHROPIC_API_KEY", None)
         self.client = (
             ChatAnthropic(
-                model_name="claude-3-5-sonnet-20241022",
+                model_name=self.MODEL_NAME,
                 anthropic_api_key=api_key,
-                max_tokens=1024,
+                max_tokens=self.MAX_TOKENS,
+                # Retries go through _invoke_with_retries so the limiter sees them
+                max_retries=0,
             )
             if api_key
             else None
         )
+        self.llm_limiter = llm_limiter
 
     async def _encode_image(self, photo_path: str) -> dict | None:
-        """Read a local image file and encode it as base64 for Anthropic API."""
+        """Read an image from storage and encode it as base64 for Anthropic API."""
         try:
-            local_path = photo_path.lstrip("/")
+            key = photo_path
 
-            if not os.path.exists(local_path):
-                logger.warning(f"Image not found at path: {local_path}")
+            if not await storage_service.exists(key):
+                logger.warning(f"Image not found at path: {key}")
                 return None
 
-            async with aiofiles.open(local_path, "rb") as image_file:
-                image_data = await image_file.read()
-                base64_image = base64.b64encode(image_data).decode("utf-8")
+            if settings.LLM_IMAGE_PREPROCESS:
+                # Send a downscaled, EXIF-free copy instead of the full original
+                derived_key = await prepare_llm_image(key)
+                if derived_key:
+                    key = derived_key
+
+            image_data = await storage_service.read_bytes(key)
+            base64_image = base64.b64encode(image_data).decode("utf-8")
 
-            _, ext = os.path.splitext(local_path)
+            _, ext = os.path.splitext(key)
             media_type = f"image/{ext.lower().replace('.', '')}"
             if media_type == "image/jpg":
                 media_type = "image/jpeg"
@@ -60,7 +97,12 @@ class ClaudeAIService:
             return None
 
     async def assess_damage(
-        self, photo_urls: list[str], vehicle_info: dict, incident_info: dict
+        self,
+        photo_urls: list[str],
+        vehicle_info: dict,
+        incident_info: dict,
+        vision_result: dict | None = None,
+        photo_hashes: list[str | None] | None = None,
     ) -> dict:
         if not self.client:
             logger.warning("Anthropic API key not configured. Returning mock data.")
@@ -73,30 +115,107 @@ class ClaudeAIService:
                 "reasoning": "Mock analysis - implement Claude API",
             }
 
-        # Concurrently encode images and run YOLO inference
-        encode_tasks = [self._encode_image(url) for url in photo_urls]
-        image_blocks, vision_result = await asyncio.gather(
-            asyncio.gather(*encode_tasks),
-            asyncio.to_thread(yolo_vision_service.detect_damage, photo_urls),
-        )
+        cache_key = None
+        if settings.AI_CACHE_ENABLED:
+            cache_key = await self._assessment_cache_key(
+                photo_urls, vehicle_info, incident_info, photo_hashes
+            )
+            cached = await assessment_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Returning cached AI damage assessment")
+                return cached
+
+        # Concurrently encode images and run YOLO inference, unless the caller
+        # already has the vision result (e.g. from triage)
+        encode_tasks = asyncio.gather(*(self._encode_image(url) for url in photo_urls))
+        if vision_result is None:
+            image_blocks, vision_result = await asyncio.gather(
+                encode_tasks, vision_batcher.detect_damage(photo_urls)
+            )
+        else:
+            image_blocks = await encode_tasks
 
         try:
             messages = self._build_messages(
                 image_blocks, vehicle_info, incident_info, vision_result
             )
-            response = await self.client.ainvoke(messages)
-            return self._parse_json_response(response.content)
+            if settings.LLM_STREAMING:
+                raw = await self._invoke_with_retries(messages, stream=True)
+            else:
+                response = await self._invoke_with_retries(messages)
+                self._record_usage(self._usage(response))
+                raw = self._try_parse_json_response(response.content)
+            analysis = self._validate_assessment(raw)
+            if analysis is None:
+                return self._parse_failure_result()
+            if cache_key:
+                await assessment_cache.set(cache_key, analysis)
+            return analysis
         except Exception as e:
             logger.error(f"Error calling Claude API: {e}")
+            metrics.increment("llm.failures")
+            # Zero confidence so adjudication always routes it to manual review
             return {
                 "severity": "moderate",
-                "damaged_parts": ["front_bumper", "hood"],
-                "estimated_cost": 2500.00,
-                "confidence": 0.85,
+                "damaged_parts": ["unknown"],
+                "estimated_cost": 0.0,
+                "confidence": 0.0,
                 "fraud_indicators": [],
                 "reasoning": f"Error occurred during analysis: {str(e)}",
             }
 
+    async def _invoke_with_retries(self, messages: list, stream: bool = False):
+        """
+        Call Claude through the adaptive limiter. Rate-limit/overload and
+        transient server errors are retried with full-jitter exponential
+        backoff (honouring Retry-After), so bursts queue up instead of
+        degrading into fallback results.
+
+        With ``stream`` the response is consumed through _stream_assessment
+        and the parsed JSON object (or None) is returned instead.
+        """
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            async with self.llm_limiter.slot() as started_at:
+                try:
+                    if stream:
+                        response = await self._stream_assessment(messages)
+                    else:
+                        response = await self.client.ainvoke(messages)
+                except Exception as e:
+                    status = getattr(e, "status_code", None)
+                    if status in OVERLOAD_STATUS_CODES:
+                        self.llm_limiter.record_overload(started_at)
+                    retryable = status in RETRYABLE_STATUS_CODES or isinstance(
+                        e, anthropic.APIConnectionError
+                    )
+                    if not retryable or attempt == settings.LLM_MAX_RETRIES:
+                        raise
+                    error, delay = e, self._retry_delay(e, attempt)
+                else:
+                    self.llm_limiter.record_success()
+                    return response
+
+            # Back off outside the slot so other calls can use it meanwhile
+            metrics.increment("llm.retries")
+            logger.warning(
+                f"Claude call failed ({error}), retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{settings.LLM_MAX_RETRIES})"
+            )
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        backoff = min(
+            settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2**attempt
+        )
+        delay = random.uniform(0, backoff)
+        response = getattr(error, "response", None)
+        try:
+            retry_after = float(response.headers.get("retry-after"))
+        except (AttributeError, TypeError, ValueError):
+            return delay
+        return max(delay, min(retry_after, settings.LLM_RETRY_MAX_DELAY))
+
     def _build_messages(
         self, image_blocks, vehicle_info, incident_info, vision_result
     ) -> list:
@@ -107,10 +226,138 @@ class ClaudeAIService:
         content.append({"type": "text", "text": text_prompt})
 
         return [
-            SystemMessage(content=self._get_system_prompt()),
+            SystemMessage(content=self._system_blocks()),
             HumanMessage(content=content),
         ]
 
+    async def _stream_assessment(self, messages: list) -> dict | None:
+        """
+        Stream the response through an incremental JSON parser and stop
+        reading as soon as the assessment object is complete (or every
+        required field has arrived), ignoring whatever the model appends.
+        """
+        # Done once every schema field has arrived; members the model adds
+        # after them are not needed
+        parser = IncrementalJSONObjectParser(DamageAssessment.model_fields)
+        usage = dict.fromkeys(USAGE_FIELDS, 0)
+        stream = self.client.astream(messages)
+        try:
+            async for chunk in stream:
+                chunk_usage = self._usage(chunk)
+                for field in usage:
+                    usage[field] += chunk_usage.get(field) or 0
+                if parser.feed(self._chunk_text(chunk.content)):
+                    metrics.increment("llm.stream_early_stops")
+                    break
+        finally:
+            # Closes the HTTP stream when we stop before the model does
+            await stream.aclose()
+
+        self._record_usage(usage)
+        if parser.result is None:
+            logger.error("No complete JSON object in streamed Claude response")
+        return parser.result
+
+    @staticmethod
+    def _chunk_text(content: str | list) -> str:
+        if isinstance(content, str):
+            return content
+        return "".join(
+            block.get("text", "") for block in content if isinstance(block, dict)
+        )
+
+    @staticmethod
+    def _usage(message) -> dict:
+        """
+        Token usage reported on a response or stream chunk, in the Messages
+        API's shape: input_tokens excludes tokens read from or written to the
+        prompt cache, which are counted separately.
+        """
+        # Older langchain-anthropic releases only pass the raw API usage through
+        # response_metadata; newer ones normalize it into usage_metadata
+        usage = (getattr(message, "response_metadata", None) or {}).get("usage")
+        if usage:
+            return {field: usage.get(field) or 0 for field in USAGE_FIELDS}
+        usage = getattr(message, "usage_metadata", None) or {}
+        details = usage.get("input_token_details") or {}
+        cache_read = details.get("cache_read") or 0
+        cache_write = details.get("cache_creation") or 0
+        return {
+            "input_tokens": max(
+                (usage.get("input_tokens") or 0) - cache_read - cache_write, 0
+            ),
+            "output_tokens": usage.get("output_tokens") or 0,
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_write,
+        }
+
+    def _system_blocks(self) -> list[dict]:
+        # The instructions are identical for every claim and sent ahead of the
+        # per-claim images and context, so the cache breakpoint on this block
+        # lets the API reuse the processed prefix across requests. It is only
+        # honoured for prefixes of at least PROMPT_CACHE_MIN_TOKENS.
+        return [
+            {
+                "type": "text",
+                "text": self._get_system_prompt(),
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+
+    def _record_usage(self, usage: dict) -> None:
+        """Log and count token usage and prompt cache reads/writes for a call."""
+        for field in USAGE_FIELDS:
+            metrics.increment(f"llm.{field}", usage.get(field) or 0)
+        cache_read = usage.get("cache_read_input_tokens") or 0
+        cache_write = usage.get("cache_creation_input_tokens") or 0
+        metrics.increment(
+            "llm.prompt_cache_hits" if cache_read else "llm.prompt_cache_misses"
+        )
+        logger.info(
+            f"Claude usage: {usage.get('input_tokens') or 0} uncached input tokens, "
+            f"{cache_read} read from prompt cache, {cache_write} written to it, "
+            f"{usage.get('output_tokens') or 0} output tokens"
+        )
+
+    async def build_batch_params(
+        self, photo_urls: list[str], vehicle_info: dict, incident_info: dict
+    ) -> dict:
+        """
+        Messages API parameters for one claim, with the same prompt and images
+        as assess_damage, for submission through the Message Batches API.
+        """
+        image_blocks, vision_result = await asyncio.gather(
+            asyncio.gather(*(self._encode_image(url) for url in photo_urls)),
+            vision_batcher.detect_damage(photo_urls),
+        )
+        content = [
+            self._to_api_image_block(block) for block in image_blocks if block is not None
+        ]
+        content.append(
+            {
+                "type": "text",
+                "text": self._build_damage_assessment_prompt(
+                    vehicle_info, incident_info, vision_result
+                ),
+            }
+        )
+        return {
+            "model": self.MODEL_NAME,
+            "max_tokens": self.MAX_TOKENS,
+            "system": self._system_blocks(),
+            "messages": [{"role": "user", "content": content}],
+        }
+
+    @staticmethod
+    def _to_api_image_block(block: dict) -> dict:
+        # LangChain takes data URLs; the raw API wants the base64 source form
+        header, data = block["image_url"]["url"].split(",", 1)
+        media_type = header.removeprefix("data:").removesuffix(";base64")
+        return {
+            "type": "image",
+            "source": {"type": "base64", "media_type": media_type, "data": data},
+        }
+
     def _get_system_prompt(self) -> str:
         return """You are an auto insurance claims adjuster. Analyze the vehicle damage photo provided.
 Provide your analysis based on the photo and the provided context.
@@ -123,28 +370,204 @@ You must return the result EXACTLY as a valid JSON object matching this schema:
     "fraud_indicators": ["any", "red", "flags"],
     "reasoning": "Detailed explanation of your analysis..."
 }
-Do not include any other text before or after the JSON."""
+Do not include any other text before or after the JSON.
+
+Be conservative in your estimates. If unsure, flag for human review.
+When a <computer_vision_analysis> block is provided, use that computer vision data
+to inform your cost estimation and final adjudication, but ultimately rely on your
+own visual assessment of the photos provided.
+
+<field_guidelines>
+severity: the overall severity of the damage visible across all photos, using the
+scale in <severity_scale>. When parts of the vehicle fall into different levels,
+report the highest level that you can see clearly, not an average.
+
+damaged_parts: every exterior or visible structural part that shows damage, one
+entry per part, in lower snake_case using the names in <part_names> where one fits
+(for example "front_bumper" or "left_headlight"). Use "left" and "right" from the
+driver's seat. List each part once even if it appears in several photos. Do not
+list parts that are only hidden from view; mention suspected hidden damage in
+reasoning instead.
+
+estimated_cost: the estimated repair cost in US dollars as a plain number with no
+currency symbol or thousands separator, before any deductible. Follow
+<cost_guidelines>. For total_loss, estimate the cost of the repairs that would be
+needed, not the value of the vehicle.
+
+confidence: a number between 0 and 1 for how sure you are of the severity and the
+cost together. Follow <confidence_guidelines>.
+
+fraud_indicators: short, specific descriptions of anything in the photos or the
+context that suggests the claim may not be genuine, using <fraud_indicators> as a
+guide. Use an empty list when nothing stands out. Do not list ordinary wear.
+
+reasoning: two to five sentences covering what damage you see, which photo shows
+it, how you arrived at the cost, and why your confidence is what it is. Mention
+anything a human reviewer should check.
+</field_guidelines>
+
+<severity_scale>
+minor: cosmetic damage only. Scratches, scuffs, small dents with intact paint,
+chipped glass, or cracked trim or mirror covers. The vehicle is safe to drive and
+repair is mostly refinishing or small part replacement.
+moderate: panels that need repair or replacement but no structural damage. Deep
+dents, cracked or detached bumper covers, broken lamps, a damaged door, fender or
+hood, or airbags that did not deploy. The vehicle is usually still drivable.
+major: damage that reaches structural or mechanical components or affects safety.
+Crumpled crumple zones, frame rails or pillars, deployed airbags, visible
+suspension, wheel or steering damage, leaking fluids, or several adjacent panels
+that need replacement. The vehicle is usually not safe to drive.
+total_loss: damage so extensive that repair is unlikely to be economical, such as
+a bent or buckled frame, severe roof crush, fire damage, flood damage above the
+floor line, or damage across most of the vehicle.
+</severity_scale>
+
+<part_names>
+front_bumper, rear_bumper, grille, hood, trunk_lid, tailgate, roof, windshield,
+rear_window, left_front_door, right_front_door, left_rear_door, right_rear_door,
+left_front_fender, right_front_fender, left_rear_quarter_panel,
+right_rear_quarter_panel, left_headlight, right_headlight, left_taillight,
+right_taillight, left_mirror, right_mirror, left_side_window, right_side_window,
+left_rocker_panel, right_rocker_panel, wheel, tire, radiator_support,
+frame_rail, pillar, airbag, suspension, undercarriage
+</part_names>
+
+<cost_guidelines>
+Build the estimate part by part from typical US independent body shop prices for
+the vehicle's make, model and year, then add them up:
+- Paintless dent repair of a small dent: 75 to 250 per dent.
+- Refinishing a panel with blending into adjacent panels: 300 to 800 per panel.
+- Repairing and refinishing a dented panel: 400 to 1200 per panel.
+- Replacing a bumper cover, painted and fitted: 500 to 1500.
+- Replacing a door, fender or hood, painted and fitted: 800 to 2500.
+- Headlight or taillight assembly: 150 to 1500, more for LED or adaptive units.
+- Windshield replacement: 250 to 1000, more with driver assistance cameras that
+  need recalibration.
+- Structural and frame work, airbag replacement or suspension repair: several
+  thousand dollars per area.
+Luxury, electric and recent model year vehicles cost more to repair than older
+economy vehicles. When the photos do not show the full extent of the damage, base
+the estimate on what you can see, note the uncertainty in reasoning and lower your
+confidence rather than inflating the cost.
+</cost_guidelines>
+
+<confidence_guidelines>
+0.90 or above: the damage is clearly visible from more than one angle, the photos
+are sharp and well lit, and the damage matches the incident description.
+0.70 to 0.89: the damage is clear but some of it is only visible from one angle,
+or hidden damage is possible behind the visible panels.
+0.40 to 0.69: the photos are blurry, dark, cropped or taken from too far away, or
+the damage only partly matches the incident description.
+Below 0.40: the photos do not show a vehicle, do not show any damage, or the
+damage cannot be assessed at all. Use severity "minor", estimated_cost 0 and
+explain why in reasoning.
+Claims at or above 0.90 may be approved without a human, so only use that range
+when you would be comfortable paying the claim on your own assessment.
+</confidence_guidelines>
+
+<fraud_indicators>
+Look for, among others:
+- Damage that does not match the incident description, for example rear damage
+  for a claimed head-on collision.
+- Rust, dirt or weathering inside the damaged area, which suggests old damage.
+- Different vehicles, colours, license plates or backgrounds across the photos.
+- Photos that look like screenshots, stock images or pictures of a screen.
+- Signs of digital editing, such as inconsistent lighting or shadows around the
+  damage.
+- Damage that looks deliberately caused, such as even scratches along a panel
+  with no impact point.
+- An incident date or location that conflicts with what the photos show, such
+  as snow in photos of a summer incident.
+Report only what you can point to in the photos or the context.
+</fraud_indicators>
+
+<computer_vision_guidelines>
+The computer vision block, when present, comes from an automated detector that
+classifies regions as minor, moderate or major damage and names the parts it
+found. It is usually right about where the damage is but can under or over rate
+severity, and it does not see hidden or structural damage. If your assessment
+differs from the detector, use your own assessment and say why in reasoning.
+</computer_vision_guidelines>"""
+
+    async def _assessment_cache_key(
+        self,
+        photo_urls: list[str],
+        vehicle_info: dict,
+        incident_info: dict,
+        photo_hashes: list[str | None] | None = None,
+    ) -> str:
+        """
+        Content address of an assessment request (see make_assessment_key).
+        Photos are keyed by the SHA-256 stored at upload; only photos
+        without one are read and hashed here.
+        """
+
+        async def digest(url: str, stored: str | None) -> str:
+            if stored:
+                return stored
+            try:
+                data = await storage_service.read_bytes(url)
+            except FileNotFoundError:
+                return f"missing:{url}"
+            return (await asyncio.to_thread(hashlib.sha256, data)).hexdigest()
+
+        stored_hashes = photo_hashes or [None] * len(photo_urls)
+        image_digests = await asyncio.gather(
+            *(
+                digest(url, stored)
+                for url, stored in zip(photo_urls, stored_hashes, strict=True)
+            )
+        )
+        image_digests.append(llm_image_profile())
+        # The YOLO context is derived from the images themselves, so the prompt is
+        # keyed without it and a cache hit can skip vision inference as well.
+        prompt = self._get_system_prompt() + self._build_damage_assessment_prompt(
+            vehicle_info, incident_info, {}
+        )
+        return make_assessment_key(self.MODEL_NAME, prompt, image_digests)
+
+    def parse_assessment(self, response_text: str | list) -> dict | None:
+        """
+        The validated assessment in a model response's content (text or
+        content blocks), or None if it has no JSON object matching the schema.
+        """
+        return self._validate_assessment(self._try_parse_json_response(response_text))
 
     def _parse_json_response(self, response_text: str | list) -> dict:
+        parsed = self.parse_assessment(response_text)
+        if parsed is None:
+            return self._parse_failure_result()
+        return parsed
+
+    def _try_parse_json_response(self, response_text: str | list) -> dict | None:
         if isinstance(response_text, list):
-            response_text = response_text[0].get("text", "")
+            response_text = self._chunk_text(response_text)
+
+        # Takes the first balanced object, so markdown fences or text around
+        # it do not matter
+        parsed = parse_json_object(response_text)
+        if parsed is None:
+            logger.error(f"No JSON object in Claude response. Raw response: {response_text}")
+        return parsed
 
+    def _validate_assessment(self, raw: dict | None) -> dict | None:
+        if raw is None:
+            return None
         try:
-            # Extract JSON block if surrounded by markdown formatting
-            match = re.search(r'```(?:json)?\s*({.*?})\s*```', response_text, re.DOTALL)
-            if match:
-                response_text = match.group(1)
-            return json.loads(response_text)
-        except Exception as e:
-            logger.error(f"Error parsing JSON from Claude response: {e}. Raw response: {response_text}")
-            return {
-                "severity": "moderate",
-                "damaged_parts": ["unknown"],
-                "estimated_cost": 0.0,
-                "confidence": 0.0,
-                "fraud_indicators": [],
-                "reasoning": "Failed to parse AI response.",
-            }
+            return DamageAssessment.model_validate(raw).model_dump()
+        except ValidationError as e:
+            logger.error(f"Claude response does not match the assessment schema: {e}")
+            return None
+
+    def _parse_failure_result(self) -> dict:
+        return {
+            "severity": "moderate",
+            "damaged_parts": ["unknown"],
+            "estimated_cost": 0.0,
+            "confidence": 0.0,
+            "fraud_indicators": [],
+            "reasoning": "Failed to parse AI response.",
+        }
 
     def _build_damage_assessment_prompt(
         self, vehicle_info, incident_info, vision_result
@@ -163,8 +586,6 @@ The initial automated computer vision system (YOLOv8) detected the following:
 - Highest Severity Detected: {sanitize_input(vision_result.get("highest_severity", "unknown"))}
 - Damaged Parts Detected: {", ".join([sanitize_input(p) for p in vision_result.get("damaged_parts", [])])}
 </computer_vision_analysis>
-Use this computer vision data to inform your cost estimation and final adjudication,
-but ultimately rely on your own visual assessment of the photos provided.
 """
 
         return f"""Here is the context for the claim:
@@ -177,9 +598,7 @@ but ultimately rely on your own visual assessment of the photos provided.
 <date>{sanitize_input(incident_info.get("date", ""))}</date>
 <description>{sanitize_input(incident_info.get("description", ""))}</description>
 </incident_context>
-{vision_context}
-Be conservative in your estimates. If unsure, flag for human review.
-"""
+{vision_context}"""
 
 
 ai_service = ClaudeAIService()
@@ -0,0 +1,73 @@
+import copy
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.cache import TTLCache, get_redis_client
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ai_assessment:"
+
+
+def make_assessment_key(
+    model_name: str, prompt: str, image_digests: Iterable[str]
+) -> str:
+    """
+    Content address of an assessment: the model, the exact (sanitized) prompt
+    and the SHA-256 of every image, in order. Any change to photos, claim
+    context, prompt template or model yields a new key.
+    """
+    hasher = hashlib.sha256()
+    for part in (model_name, prompt, *image_digests):
+        hasher.update(part.encode("utf-8"))
+        hasher.update(b"\0")
+    return KEY_PREFIX + hasher.hexdigest()
+
+
+class AssessmentCache:
+    """
+    Two-level cache of AI damage assessments: a process-local LRU in front of
+    Redis. Redis entries expire after ``AI_CACHE_TTL_SECONDS``; Redis-side size
+    eviction is left to the server's ``maxmemory-policy``.
+    """
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[int] = None):
+        self.ttl = ttl or settings.AI_CACHE_TTL_SECONDS
+        self.local = TTLCache(
+            maxsize=maxsize or settings.AI_CACHE_LOCAL_MAXSIZE, ttl=self.ttl
+        )
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.local.get(key)
+        if value is not None:
+            metrics.increment("ai_cache.hits.local")
+            return copy.deepcopy(value)
+
+        try:
+            cached = await get_redis_client().get(key)
+        except Exception as e:
+            logger.warning(f"Redis get failed for assessment cache: {e}")
+            cached = None
+
+        if cached:
+            value = json.loads(cached)
+            self.local.set(key, copy.deepcopy(value))
+            metrics.increment("ai_cache.hits.redis")
+            return value
+
+        metrics.increment("ai_cache.misses")
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any]) -> None:
+        self.local.set(key, copy.deepcopy(value))
+        try:
+            await get_redis_client().setex(key, self.ttl, json.dumps(value))
+        except Exception as e:
+            logger.warning(f"Redis set failed for assessment cache: {e}")
+
+
+assessment_cache = AssessmentCache()
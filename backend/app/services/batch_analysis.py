@@ -0,0 +1,327 @@
+"""
+Bulk re-analysis of claims through the Anthropic Message Batches API.
+
+For non-urgent work (backfilling ``ai_analysis`` on old photos, or
+re-running the book after a prompt change) claims are packed into message
+batches instead of going through the live ``assess_damage`` path: batches
+are billed at a discount and have their own rate limits, so they never
+compete with live claims. Results are written back with bulk UPDATEs.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import httpx
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
+from app.services.ai_service import ai_service
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = "2023-06-01"
+# Results are applied to the database in chunks of this many claims
+WRITE_CHUNK_SIZE = 500
+
+
+class MessageBatchClient:
+    """Minimal async client for the Message Batches endpoints."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=base_url or settings.ANTHROPIC_API_URL,
+            headers={
+                "x-api-key": api_key or settings.ANTHROPIC_API_KEY or "",
+                "anthropic-version": ANTHROPIC_VERSION,
+            },
+            timeout=httpx.Timeout(60.0),
+            transport=transport,
+        )
+
+    async def create(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
+        response = await self._client.post(
+            "/v1/messages/batches", json={"requests": requests}
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def retrieve(self, batch_id: str) -> Dict[str, Any]:
+        response = await self._client.get(f"/v1/messages/batches/{batch_id}")
+        response.raise_for_status()
+        return response.json()
+
+    async def wait(
+        self, batch_id: str, poll_interval: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Poll until the batch has ended (batches finish within 24 hours)."""
+        poll_interval = poll_interval or settings.LLM_BATCH_POLL_INTERVAL
+        while True:
+            batch = await self.retrieve(batch_id)
+            if batch["processing_status"] == "ended":
+                return batch
+            logger.info(
+                f"Message batch {batch_id} {batch['processing_status']}: "
+                f"{batch.get('request_counts', {})}"
+            )
+            await asyncio.sleep(poll_interval)
+
+    async def results(self, batch: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream an ended batch's JSONL results one entry at a time."""
+        async with self._client.stream("GET", batch["results_url"]) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+@dataclass
+class ReanalysisReport:
+    batch_ids: List[str] = field(default_factory=list)
+    submitted: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    elapsed_seconds: float = 0.0
+
+
+def _claims_page_query(
+    after_id, batch_size: int, claim_ids: Optional[Sequence], only_missing: bool
+):
+    stmt = (
+        select(Claim)
+        .where(Claim.photos.any())
+        .options(selectinload(Claim.photos))
+        .order_by(Claim.id)
+        .limit(batch_size)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Claim.id > after_id)
+    if claim_ids is not None:
+        stmt = stmt.where(Claim.id.in_(claim_ids))
+    if only_missing:
+        stmt = stmt.where(Claim.photos.any(ClaimPhoto.ai_analysis.is_(None)))
+    return stmt
+
+
+async def _batch_request(claim: Claim) -> Dict[str, Any]:
+    params = await ai_service.build_batch_params(
+        photo_urls=[photo.photo_url for photo in claim.photos],
+        vehicle_info={
+            "make": claim.vehicle_make,
+            "model": claim.vehicle_model,
+            "year": claim.vehicle_year,
+        },
+        incident_info={
+            "description": claim.incident_description,
+            "date": str(claim.incident_date) if claim.incident_date else "",
+        },
+    )
+    return {"custom_id": str(claim.id), "params": params}
+
+
+def split_by_size(
+    requests: Sequence[Dict[str, Any]], max_bytes: int
+) -> List[List[Dict[str, Any]]]:
+    """
+    Group requests, in order, into chunks whose serialized size stays under
+    ``max_bytes``. A request larger than that on its own gets its own chunk.
+    """
+    chunks: List[List[Dict[str, Any]]] = []
+    current: List[Dict[str, Any]] = []
+    size = 0
+    for request in requests:
+        # ASCII-only JSON (images are base64), so characters are bytes
+        request_size = len(json.dumps(request)) + 1
+        if current and size + request_size > max_bytes:
+            chunks.append(current)
+            current, size = [], 0
+        if request_size > max_bytes:
+            logger.warning(
+                f"Batch request {request['custom_id']} is {request_size} bytes, "
+                f"over the {max_bytes}-byte batch cap"
+            )
+        current.append(request)
+        size += request_size
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def submit_reanalysis(
+    client: MessageBatchClient,
+    claim_ids: Optional[Sequence] = None,
+    only_missing: bool = False,
+    batch_size: Optional[int] = None,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    max_bytes: Optional[int] = None,
+) -> ReanalysisReport:
+    """
+    Submit the selected claims (all claims with photos by default) as
+    message batches of up to ``batch_size`` requests and ``max_bytes``
+    serialized bytes, paging through claims by id so only one page's payload
+    is in memory at a time.
+    """
+    batch_size = batch_size or settings.LLM_BATCH_MAX_REQUESTS
+    max_bytes = max_bytes or settings.LLM_BATCH_MAX_BYTES
+    report = ReanalysisReport()
+    after_id = None
+
+    async with session_factory() as db:
+        while True:
+            result = await db.execute(
+                _claims_page_query(after_id, batch_size, claim_ids, only_missing)
+            )
+            claims = result.scalars().all()
+            if not claims:
+                break
+
+            requests = await asyncio.gather(*(_batch_request(c) for c in claims))
+            for chunk in split_by_size(requests, max_bytes):
+                batch = await client.create(chunk)
+                report.batch_ids.append(batch["id"])
+                report.submitted += len(chunk)
+                logger.info(
+                    f"Submitted message batch {batch['id']} ({len(chunk)} claims)"
+                )
+
+            after_id = claims[-1].id
+            # Keep only one page of claims and photos in memory
+            db.expunge_all()
+            if len(claims) < batch_size:
+                break
+
+    metrics.increment("llm_batch.submitted", report.submitted)
+    return report
+
+
+def _parse_result(entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    result = entry.get("result", {})
+    if result.get("type") != "succeeded":
+        logger.warning(
+            f"Batch request {entry.get('custom_id')} {result.get('type')}: "
+            f"{result.get('error')}"
+        )
+        return None
+    return ai_service.parse_assessment(result["message"]["content"])
+
+
+async def _write_results(
+    db: AsyncSession, analyses: Dict[uuid.UUID, Dict[str, Any]], batch_id: str
+) -> None:
+    photos = ClaimPhoto.__table__
+    await db.execute(
+        update(photos)
+        .where(photos.c.claim_id == bindparam("target_claim_id"))
+        .values(ai_analysis=bindparam("analysis")),
+        [
+            {"target_claim_id": claim_id, "analysis": analysis}
+            for claim_id, analysis in analyses.items()
+        ],
+    )
+    await db.execute(
+        insert(ClaimAuditLog),
+        [
+            {
+                "id": uuid.uuid4(),
+                "claim_id": claim_id,
+                "action": "ai_batch_reanalysis",
+                "performed_by": "system",
+                "details": {
+                    "batch_id": batch_id,
+                    "model": ai_service.MODEL_NAME,
+                    "severity": analysis.get("severity"),
+                    "estimated_cost": analysis.get("estimated_cost"),
+                },
+            }
+            for claim_id, analysis in analyses.items()
+        ],
+    )
+    await db.commit()
+
+
+async def apply_batch_results(
+    client: MessageBatchClient,
+    batch_id: str,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    poll_interval: Optional[float] = None,
+) -> ReanalysisReport:
+    """
+    Wait for a submitted batch to end and write its parsed assessments to the
+    photos of each claim. Can also be run on its own to resume after the
+    submitting process was stopped.
+    """
+    report = ReanalysisReport(batch_ids=[batch_id])
+    batch = await client.wait(batch_id, poll_interval)
+
+    async with session_factory() as db:
+        pending: Dict[uuid.UUID, Dict[str, Any]] = {}
+        async for entry in client.results(batch):
+            analysis = _parse_result(entry)
+            if analysis is None:
+                report.failed += 1
+                continue
+            pending[uuid.UUID(entry["custom_id"])] = analysis
+            if len(pending) >= WRITE_CHUNK_SIZE:
+                await _write_results(db, pending, batch_id)
+                report.succeeded += len(pending)
+                pending = {}
+        if pending:
+            await _write_results(db, pending, batch_id)
+            report.succeeded += len(pending)
+
+    metrics.increment("llm_batch.succeeded", report.succeeded)
+    metrics.increment("llm_batch.failed", report.failed)
+    return report
+
+
+async def reanalyze_claims(
+    claim_ids: Optional[Sequence] = None,
+    only_missing: bool = False,
+    batch_size: Optional[int] = None,
+    client: Optional[MessageBatchClient] = None,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    poll_interval: Optional[float] = None,
+) -> ReanalysisReport:
+    """Submit the selected claims, wait for every batch and apply the results."""
+    owns_client = client is None
+    client = client or MessageBatchClient()
+    started = time.perf_counter()
+    try:
+        report = await submit_reanalysis(
+            client, claim_ids, only_missing, batch_size, session_factory
+        )
+        for batch_id in report.batch_ids:
+            applied = await apply_batch_results(
+                client, batch_id, session_factory, poll_interval
+            )
+            report.succeeded += applied.succeeded
+            report.failed += applied.failed
+    finally:
+        if owns_client:
+            await client.aclose()
+
+    report.elapsed_seconds = time.perf_counter() - started
+    logger.info(
+        f"Batch re-analysis: {report.succeeded}/{report.submitted} claims updated "
+        f"({report.failed} failed) across {len(report.batch_ids)} batches "
+        f"in {report.elapsed_seconds:.0f}s"
+    )
+    return report
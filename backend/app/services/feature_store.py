@@ -0,0 +1,298 @@
+"""
+Claim history features for fraud scoring.
+
+``ClaimHistoryFeatures`` rows (one per policy and one per VIN) are maintained
+incrementally in the same transaction that creates a claim or moves it in or
+out of "Paid", via a ``before_flush`` hook, so every write path (API, admin
+actions, payouts, the analysis pipeline) keeps them current. Reads are one
+indexed row per entity, a constant-time lookup regardless of the size of the
+claims book, and can be served from a short-lived in-process cache.
+Adjudication reads fresh rows, because only the committing process drops
+its cached entries.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.claims import Claim, ClaimHistoryFeatures
+
+logger = logging.getLogger(__name__)
+
+# Rolling windows (in days) exposed as claims_<n>d features
+FEATURE_WINDOWS_DAYS = (30, 90, 365)
+PAID_STATUS = "Paid"
+
+EntityKey = Tuple[str, str]
+_TOUCHED_KEY = "claim_history_features_touched"
+
+
+def entity_keys(
+    policy_number: Optional[str], vehicle_vin: Optional[str]
+) -> List[EntityKey]:
+    keys = []
+    if policy_number:
+        keys.append(("policy", policy_number))
+    if vehicle_vin and vehicle_vin.strip():
+        keys.append(("vin", vehicle_vin.strip().upper()))
+    return keys
+
+
+def _claim_date(claim: Claim, now: datetime) -> datetime:
+    moment = claim.incident_date or claim.created_at
+    if not isinstance(moment, datetime):
+        return now
+    return moment.replace(tzinfo=None)
+
+
+def _insert_if_missing(session: Session, entity_type: str, entity_key: str):
+    values = {
+        "id": uuid.uuid4(),
+        "entity_type": entity_type,
+        "entity_key": entity_key,
+        "claim_count": 0,
+        "recent_claim_dates": [],
+        "total_paid": 0,
+    }
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(ClaimHistoryFeatures).values(**values)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(ClaimHistoryFeatures).values(**values)
+    else:
+        return insert(ClaimHistoryFeatures).values(**values)
+    # A concurrent transaction may create the same row first
+    return stmt.on_conflict_do_nothing(index_elements=["entity_type", "entity_key"])
+
+
+def _locked_features(
+    session: Session, entity_type: str, entity_key: str
+) -> ClaimHistoryFeatures:
+    stmt = (
+        select(ClaimHistoryFeatures)
+        .where(
+            ClaimHistoryFeatures.entity_type == entity_type,
+            ClaimHistoryFeatures.entity_key == entity_key,
+        )
+        # Serializes concurrent updates of the same policy/VIN on Postgres
+        .with_for_update()
+    )
+    row = session.execute(stmt).scalar_one_or_none()
+    if row is None:
+        session.execute(_insert_if_missing(session, entity_type, entity_key))
+        row = session.execute(stmt).scalar_one()
+    return row
+
+
+def _record_claim(
+    row: ClaimHistoryFeatures, claim_date: datetime, now: datetime
+) -> None:
+    cutoff = now - timedelta(days=max(FEATURE_WINDOWS_DAYS))
+    dates = [
+        d for d in row.recent_claim_dates or [] if datetime.fromisoformat(d) >= cutoff
+    ]
+    if claim_date >= cutoff:
+        dates.append(claim_date.isoformat())
+    # Reassign rather than mutate so the JSON column is flagged as changed
+    row.recent_claim_dates = sorted(dates)
+    row.claim_count = (row.claim_count or 0) + 1
+    if row.last_claim_date is None or claim_date > row.last_claim_date:
+        row.last_claim_date = claim_date
+
+
+def _record_status_change(
+    row: ClaimHistoryFeatures, claim: Claim, old_status: Optional[str]
+) -> None:
+    was_paid, is_paid = old_status == PAID_STATUS, claim.status == PAID_STATUS
+    if was_paid == is_paid:
+        return
+    amount = Decimal(str(claim.approved_amount or 0))
+    row.total_paid = Decimal(str(row.total_paid or 0)) + (
+        amount if is_paid else -amount
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _maintain_claim_history_features(session, flush_context, instances):
+    touched = session.info.setdefault(_TOUCHED_KEY, set())
+    now = datetime.utcnow()
+
+    for claim in [obj for obj in session.new if isinstance(obj, Claim)]:
+        for key in entity_keys(claim.policy_number, claim.vehicle_vin):
+            row = _locked_features(session, *key)
+            _record_claim(row, _claim_date(claim, now), now)
+            _record_status_change(row, claim, None)
+            touched.add(key)
+
+    for claim in [obj for obj in session.dirty if isinstance(obj, Claim)]:
+        history = inspect(claim).attrs.status.history
+        if not history.has_changes():
+            continue
+        old_status = history.deleted[0] if history.deleted else None
+        if (old_status == PAID_STATUS) == (claim.status == PAID_STATUS):
+            continue
+        for key in entity_keys(claim.policy_number, claim.vehicle_vin):
+            _record_status_change(_locked_features(session, *key), claim, old_status)
+            touched.add(key)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_features(session):
+    for key in session.info.pop(_TOUCHED_KEY, ()):
+        feature_store.invalidate(*key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_features(session):
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+def _snapshot(row: Optional[ClaimHistoryFeatures], now: datetime) -> Dict[str, Any]:
+    dates = [datetime.fromisoformat(d) for d in (row.recent_claim_dates if row else [])]
+    snapshot = {
+        "claim_count": row.claim_count if row else 0,
+        "total_paid": float(row.total_paid) if row else 0.0,
+        "last_claim_date": row.last_claim_date.isoformat()
+        if row and row.last_claim_date
+        else None,
+    }
+    for days in FEATURE_WINDOWS_DAYS:
+        cutoff = now - timedelta(days=days)
+        snapshot[f"claims_{days}d"] = sum(1 for d in dates if d >= cutoff)
+    return snapshot
+
+
+class ClaimFeatureStore:
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None):
+        self._cache = TTLCache(
+            maxsize=maxsize or settings.FEATURE_CACHE_MAXSIZE,
+            ttl=ttl or settings.FEATURE_CACHE_TTL_SECONDS,
+        )
+
+    async def get_features(
+        self,
+        db: AsyncSession,
+        policy_number: Optional[str],
+        vehicle_vin: Optional[str] = None,
+        fresh: bool = False,
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        History features for a policy and vehicle, as
+        ``{"policy": {...}, "vin": {...}}`` (``None`` when the key is absent).
+        Served from the in-process cache; misses are one indexed query.
+
+        Only the committing process drops its cached entries, so other
+        processes may serve counts up to ``FEATURE_CACHE_TTL_SECONDS`` old.
+        Pass ``fresh=True`` where that matters (adjudication) to read the
+        rows and refresh the cache.
+        """
+        keys = entity_keys(policy_number, vehicle_vin)
+        features = {key: None if fresh else self._cache.get(key) for key in keys}
+        missing = [key for key, value in features.items() if value is None]
+
+        if missing:
+            result = await db.execute(
+                select(ClaimHistoryFeatures).where(
+                    or_(
+                        *(
+                            and_(
+                                ClaimHistoryFeatures.entity_type == entity_type,
+                                ClaimHistoryFeatures.entity_key == entity_key,
+                            )
+                            for entity_type, entity_key in missing
+                        )
+                    )
+                )
+            )
+            rows = {
+                (row.entity_type, row.entity_key): row for row in result.scalars().all()
+            }
+            now = datetime.utcnow()
+            for key in missing:
+                # Entities without history are cached too, as zero counts
+                features[key] = _snapshot(rows.get(key), now)
+                self._cache.set(key, features[key])
+
+        by_type = {
+            entity_type: dict(value) for (entity_type, _), value in features.items()
+        }
+        return {"policy": by_type.get("policy"), "vin": by_type.get("vin")}
+
+    def invalidate(self, entity_type: str, entity_key: str) -> None:
+        self._cache.pop((entity_type, entity_key))
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+async def rebuild_claim_history_features(db: AsyncSession) -> int:
+    """
+    Recompute every feature row from the claims table, e.g. to backfill after
+    the migration. Aggregates are computed in SQL; run it while no claims are
+    being written. Returns the number of rows written.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=max(FEATURE_WINDOWS_DAYS))
+    claim_date = func.coalesce(Claim.incident_date, Claim.created_at)
+    paid_amount = case((Claim.status == PAID_STATUS, Claim.approved_amount), else_=0)
+
+    await db.execute(delete(ClaimHistoryFeatures))
+    written = 0
+    for entity_type, column in (
+        ("policy", Claim.policy_number),
+        ("vin", func.upper(func.trim(Claim.vehicle_vin))),
+    ):
+        recent = defaultdict(list)
+        result = await db.stream(
+            select(column, claim_date).where(
+                column.is_not(None), column != "", claim_date >= cutoff
+            )
+        )
+        async for key, moment in result:
+            recent[key].append(moment.replace(tzinfo=None).isoformat())
+
+        aggregates = await db.execute(
+            select(
+                column,
+                func.count(Claim.id),
+                func.coalesce(func.sum(paid_amount), 0),
+                func.max(claim_date),
+            )
+            .where(column.is_not(None), column != "")
+            .group_by(column)
+        )
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "entity_type": entity_type,
+                "entity_key": key,
+                "claim_count": count,
+                "recent_claim_dates": sorted(recent.get(key, [])),
+                "total_paid": total_paid,
+                "last_claim_date": last_date.replace(tzinfo=None)
+                if last_date
+                else None,
+            }
+            for key, count, total_paid, last_date in aggregates.all()
+        ]
+        if rows:
+            await db.execute(insert(ClaimHistoryFeatures), rows)
+        written += len(rows)
+
+    await db.commit()
+    feature_store.clear()
+    return written
+
+
+feature_store = ClaimFeatureStore()
@@ -1,70 +1,140 @@
 import logging
 import os
-from typing import Any, Dict
+import threading
+import warnings
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 
 import joblib
-import pandas as pd
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# Added to the risk score when a claim reuses photos from other claims
+DUPLICATE_PHOTO_RISK = 40
+
+
+def reporting_delay_days(
+    created_at: Optional[datetime], incident_date: Optional[datetime]
+) -> int:
+    """
+    The model's days_since_incident feature: whole days between the incident
+    and the claim being filed. It does not change as the claim ages, so a
+    claim scores the same at analysis time and in nightly re-scoring (which
+    computes it in SQL).
+    """
+    if not created_at or not incident_date:
+        return 0
+    delay = created_at.replace(tzinfo=None) - incident_date.replace(tzinfo=None)
+    return max(0, delay.days)
+
+
 class MLFraudDetectionService:
     def __init__(self):
-        self.model = None
+        self._model = None
+        self._model_loaded = False
+        self._load_lock = threading.Lock()
 
-        # Try to load the trained model
-        try:
-            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            model_path = os.path.join(base_dir, "scripts", "models", "fraud_isolation_forest.joblib")
-
-            if os.path.exists(model_path):
-                self.model = joblib.load(model_path)
-                logger.info("Loaded ML Fraud Detection Model.")
-            else:
-                logger.warning("ML Fraud Model not found. Will fallback to basic heuristics.")
-        except Exception as e:
-            logger.error(f"Failed to load ML Fraud Model: {e}")
+    @property
+    def model(self):
+        """The trained Isolation Forest, loaded on first use; None if unavailable."""
+        if not self._model_loaded:
+            self.load()
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_loaded = True
+
+    def load(self):
+        """Load the model if that has not happened yet and return it."""
+        with self._load_lock:
+            if self._model_loaded:
+                return self._model
+            # Do not retry a failed load on every call
+            self._model_loaded = True
+
+            # Try to load the trained model
+            try:
+                # __file__ is in backend/app/services; the model lives in backend/scripts
+                base_dir = os.path.dirname(
+                    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                )
+                model_path = os.path.join(base_dir, "scripts", "models", "fraud_isolation_forest.joblib")
+
+                if os.path.exists(model_path):
+                    self._model = joblib.load(model_path)
+                    logger.info("Loaded ML Fraud Detection Model.")
+                else:
+                    logger.warning("ML Fraud Model not found. Will fallback to basic heuristics.")
+            except Exception as e:
+                logger.error(f"Failed to load ML Fraud Model: {e}")
+            return self._model
+
+    def __reduce__(self):
+        # Pickle as a reference to the process-local singleton so bound methods
+        # can be sent to a process pool without shipping the model.
+        return (_get_fraud_detection_service, ())
 
     def analyze_fraud_risk(self, estimated_cost: float, days_since_incident: int, claim_history_count: int) -> Dict[str, Any]:
         """
         Analyze fraud risk using the trained Isolation Forest anomaly detection model.
         Returns a dict with 'is_anomaly' (bool) and 'risk_score' (0-100).
         """
+        scores = self.analyze_fraud_risk_batch(
+            [estimated_cost], [days_since_incident], [claim_history_count]
+        )
+        return {
+            "is_anomaly": bool(scores["is_anomaly"][0]),
+            "risk_score": int(scores["risk_score"][0]),
+            "method": scores["method"],
+        }
+
+    def analyze_fraud_risk_batch(self, estimated_costs: Sequence[float], days_since_incident: Sequence[int], claim_history_counts: Sequence[int]) -> Dict[str, Any]:
+        """
+        Score many claims at once. Takes one array per feature and returns
+        'is_anomaly' and 'risk_score' as NumPy arrays aligned with the input,
+        plus the 'method' used for the whole batch.
+
+        The model is evaluated with a single ``score_samples`` call; the label
+        and risk score are both derived from it, since IsolationForest's
+        ``decision_function`` is ``score_samples - offset_`` and ``predict``
+        flags samples whose decision value is negative.
+        """
+        features = np.column_stack(
+            [
+                np.asarray(estimated_costs, dtype=float),
+                np.asarray(days_since_incident, dtype=float),
+                np.asarray(claim_history_counts, dtype=float),
+            ]
+        )
+
         if not self.model:
             # Fallback heuristic
-            score = 0
-            if estimated_cost > 10000:
-                score += 15
-            if days_since_incident > 30:
-                score += 20
-            if claim_history_count > 1:
-                score += 25
-
+            score = (
+                np.where(features[:, 0] > 10000, 15, 0)
+                + np.where(features[:, 1] > 30, 20, 0)
+                + np.where(features[:, 2] > 1, 25, 0)
+            )
             return {
                 "is_anomaly": score > 40,
-                "risk_score": min(score, 100),
+                "risk_score": np.minimum(score, 100),
                 "method": "heuristic"
             }
 
         try:
-            # Predict using the model
-            df = pd.DataFrame([{
-                "estimated_cost": estimated_cost,
-                "days_since_incident": days_since_incident,
-                "claim_history_count": claim_history_count
-            }])
-
-            # Output is 1 for normal, -1 for anomaly
-            prediction = self.model.predict(df)[0]
-
-            # Decision function gives a continuous anomaly score (lower is more anomalous)
-            anomaly_score_raw = self.model.decision_function(df)[0]
+            with warnings.catch_warnings():
+                # The model was fitted on a DataFrame; plain arrays are fine
+                warnings.filterwarnings("ignore", message="X does not have valid feature names")
+                decision = self.model.score_samples(features) - self.model.offset_
 
             # Normalize score to 0-100 risk score (heuristic normalization)
-            # If anomaly_score_raw is ~0, risk is ~50. If deeply negative, risk approaches 100.
-            risk_score = max(0, min(100, int(50 - (anomaly_score_raw * 100))))
+            # If the decision value is ~0, risk is ~50. If deeply negative, risk approaches 100.
+            risk_score = np.clip(np.trunc(50 - decision * 100), 0, 100).astype(int)
 
             return {
-                "is_anomaly": bool(prediction == -1),
+                "is_anomaly": decision < 0,
                 "risk_score": risk_score,
                 "method": "ml_isolation_forest"
             }
@@ -72,9 +142,29 @@ class MLFraudDetectionService:
         except Exception as e:
             logger.error(f"ML Fraud Prediction error: {e}")
             return {
-                "is_anomaly": False,
-                "risk_score": 0,
+                "is_anomaly": np.zeros(len(features), dtype=bool),
+                "risk_score": np.zeros(len(features), dtype=int),
                 "method": "error_fallback"
             }
 
+    def apply_duplicate_photo_risk(self, fraud_result: Dict[str, Any], duplicate_photos: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Raise the risk of a claim whose photos (near-)duplicate photos submitted
+        on other claims. Photo reuse is a strong signal on its own, so such
+        claims are always flagged as anomalous.
+        """
+        if not duplicate_photos:
+            return fraud_result
+
+        return {
+            **fraud_result,
+            "is_anomaly": True,
+            "risk_score": min(100, fraud_result["risk_score"] + DUPLICATE_PHOTO_RISK),
+            "duplicate_photos": duplicate_photos,
+        }
+
+def _get_fraud_detection_service() -> MLFraudDetectionService:
+    return fraud_detection_service
+
+
 fraud_detection_service = MLFraudDetectionService()
@@ -0,0 +1,134 @@
+import io
+import logging
+import os
+from typing import Optional
+
+from app.core.config import settings
+from app.core.executors import run_cpu_bound
+from app.services.storage import storage_service
+
+try:
+    from PIL import Image, ImageOps
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "WEBP": ".webp", "PNG": ".png"}
+
+
+def derived_path(original_path: str, variant: str, max_edge: int, fmt: str) -> str:
+    """
+    Location of a derived image, stored next to the original, e.g.
+    ``uploads/<uuid>.jpg`` -> ``uploads/<uuid>.llm-1568.jpg``.
+    """
+    root, _ = os.path.splitext(original_path)
+    return f"{root}.{variant}-{max_edge}{FORMAT_EXTENSIONS[fmt.upper()]}"
+
+
+def resize_and_encode(
+    data: bytes, max_edge: int, fmt: str = "JPEG", quality: int = 85
+) -> bytes:
+    """
+    Downscale an image so its long edge is at most ``max_edge`` and re-encode it.
+    EXIF orientation is applied to the pixels first and the metadata dropped.
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge))
+        fmt = fmt.upper()
+        if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        # No exif= argument, so the re-encoded file carries no EXIF block
+        image.save(output, format=fmt, quality=quality)
+        return output.getvalue()
+
+
+async def prepare_variant(
+    original_path: str,
+    variant: str,
+    max_edge: int,
+    fmt: str,
+    quality: int,
+    data: Optional[bytes] = None,
+) -> Optional[str]:
+    """
+    Create the derived image in storage unless it already exists, and return
+    its key. Uploaded objects are never overwritten, so an existing variant is
+    always up to date. ``data`` may carry the original's bytes when the caller
+    has already read them. Returns None if the original cannot be processed.
+    """
+    if not HAS_PIL:
+        return None
+
+    target = derived_path(original_path, variant, max_edge, fmt)
+    try:
+        if await storage_service.exists(target):
+            return target
+        if data is None:
+            data = await storage_service.read_bytes(original_path)
+
+        encoded = await run_cpu_bound(resize_and_encode, data, max_edge, fmt, quality)
+        await storage_service.write_bytes(target, encoded)
+        return target
+    except Exception as e:
+        logger.error(f"Failed to derive {variant} image from {original_path}: {e}")
+        return None
+
+
+async def prepare_llm_image(
+    original_path: str, data: Optional[bytes] = None
+) -> Optional[str]:
+    """Derived image sized and encoded for the Claude vision input."""
+    return await prepare_variant(
+        original_path,
+        "llm",
+        settings.LLM_IMAGE_MAX_EDGE,
+        settings.LLM_IMAGE_FORMAT,
+        settings.LLM_IMAGE_QUALITY,
+        data,
+    )
+
+
+async def prepare_inference_image(
+    original_path: str, data: Optional[bytes] = None
+) -> Optional[str]:
+    """Derived image at the YOLO input size, so detection skips the full decode."""
+    return await prepare_variant(
+        original_path,
+        "inference",
+        settings.YOLO_INFERENCE_IMAGE_SIZE,
+        "JPEG",
+        90,
+        data,
+    )
+
+
+async def prepare_thumbnail(
+    original_path: str, data: Optional[bytes] = None
+) -> Optional[str]:
+    """Small preview for claim lists in the admin dashboard."""
+    return await prepare_variant(
+        original_path, "thumb", settings.THUMBNAIL_MAX_EDGE, "WEBP", 75, data
+    )
+
+
+def inference_image_path(original_path: str) -> str:
+    """Key of the inference-size variant generated at upload time."""
+    return derived_path(
+        original_path, "inference", settings.YOLO_INFERENCE_IMAGE_SIZE, "JPEG"
+    )
+
+
+def llm_image_profile() -> str:
+    """Identifies the LLM preprocessing settings, for cache keys."""
+    if not settings.LLM_IMAGE_PREPROCESS or not HAS_PIL:
+        return "original"
+    return (
+        f"{settings.LLM_IMAGE_FORMAT.lower()}:"
+        f"{settings.LLM_IMAGE_MAX_EDGE}:{settings.LLM_IMAGE_QUALITY}"
+    )
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, List, Optional
+
+import magic
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.services.storage import storage_service
+
+# Bytes handed to libmagic, matching what the endpoint used to read up front
+SNIFF_BYTES = 2048
+# Chunks buffered between the request reader and the disk writer
+WRITE_QUEUE_SIZE = 8
+
+
+@dataclass
+class IngestedUpload:
+    path: str
+    filename: str
+    content_type: Optional[str]
+    mime_type: str
+    size: int
+    sha256: str
+
+
+class StreamingUploadIngest:
+    """
+    Single-pass ingest of a ``multipart/form-data`` photo upload.
+
+    The request body is parsed as it arrives instead of being spooled to a
+    temporary file by Starlette first. The first chunk of the file part is
+    sniffed with libmagic before anything touches disk; the remaining bytes are
+    counted against ``MAX_UPLOAD_SIZE``, hashed with SHA-256 and handed to a
+    concurrent disk writer, so each byte is read from the socket and written
+    to storage exactly once.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        allowed_mime_types: Iterable[str],
+        allowed_extensions: Iterable[str],
+        field_name: str = "file",
+        max_size: Optional[int] = None,
+    ):
+        self.request = request
+        self.allowed_mime_types = set(allowed_mime_types)
+        self.allowed_extensions = set(allowed_extensions)
+        self.field_name = field_name
+        self.max_size = max_size if max_size is not None else settings.MAX_UPLOAD_SIZE
+
+        self._stream = request.stream()
+        self._parser: Optional[MultipartParser] = None
+        self._pending: List[bytes] = []
+        self._stream_done = False
+
+        # Per-part parser state
+        self._header_name = b""
+        self._header_value = b""
+        self._part_headers: dict[bytes, bytes] = {}
+        self._in_file_part = False
+        self._file_seen = False
+        self._file_done = False
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+
+    async def ingest(self) -> IngestedUpload:
+        self._parser = self._create_parser()
+
+        # Read until the file part's headers and first bytes are available
+        head = bytearray()
+        while len(head) < SNIFF_BYTES and not (self._file_done or self._stream_done):
+            await self._feed()
+            head.extend(self._take_pending())
+        head.extend(self._take_pending())
+
+        if not self._file_seen:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Missing file field '{self.field_name}'",
+            )
+
+        # 1. Validate File Content Type via magic bytes
+        # Offload the synchronous python-magic call to a thread to prevent blocking the async event loop
+        actual_mime_type = await asyncio.to_thread(
+            magic.from_buffer, bytes(head[:SNIFF_BYTES]), mime=True
+        )
+        if actual_mime_type not in self.allowed_mime_types:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid file content type: {actual_mime_type}. Allowed types: {', '.join(self.allowed_mime_types)}",
+            )
+
+        # 2. Validate File Extension (Strict enforcement to prevent unrestricted file upload)
+        if not self.filename:
+            raise HTTPException(status_code=400, detail="Filename missing")
+
+        _, ext = os.path.splitext(self.filename)
+        if ext.lower() not in self.allowed_extensions:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Security Policy Violation: Invalid file extension: {ext}. Allowed extensions: {', '.join(self.allowed_extensions)}",
+            )
+
+        # 3. Stream to storage while hashing and enforcing the size limit
+        hasher = hashlib.sha256()
+        size = 0
+        queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+
+        async def queued_chunks() -> AsyncIterator[bytes]:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+
+        writer = asyncio.create_task(
+            storage_service.upload_stream(queued_chunks(), ext)
+        )
+        try:
+            async for chunk in self._file_chunks(bytes(head)):
+                size += len(chunk)
+                if size > self.max_size:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"File exceeds limit: {self.max_size} bytes.",
+                    )
+                hasher.update(chunk)
+                # Waits only when the writer falls WRITE_QUEUE_SIZE chunks behind
+                await queue.put(chunk)
+            await queue.put(None)
+            path = await writer
+        except BaseException:
+            writer.cancel()
+            try:
+                await writer
+            except BaseException:
+                pass
+            raise
+
+        return IngestedUpload(
+            path=path,
+            filename=self.filename,
+            content_type=self.content_type,
+            mime_type=actual_mime_type,
+            size=size,
+            sha256=hasher.hexdigest(),
+        )
+
+    async def _file_chunks(self, head: bytes) -> AsyncIterator[bytes]:
+        if head:
+            yield head
+        while not (self._file_done or self._stream_done):
+            await self._feed()
+            data = self._take_pending()
+            if data:
+                yield data
+        data = self._take_pending()
+        if data:
+            yield data
+        if not self._file_done:
+            raise HTTPException(status_code=400, detail="Incomplete file upload")
+
+    async def _feed(self) -> None:
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            self._stream_done = True
+            chunk = None
+        try:
+            if chunk is None:
+                self._parser.finalize()
+            else:
+                self._parser.write(chunk)
+        except MultipartParseError as exc:
+            raise HTTPException(
+                status_code=400, detail="Malformed multipart body"
+            ) from exc
+
+    def _take_pending(self) -> bytes:
+        data = b"".join(self._pending)
+        self._pending.clear()
+        return data
+
+    def _create_parser(self) -> MultipartParser:
+        content_type, params = parse_options_header(
+            self.request.headers.get("content-type", "")
+        )
+        boundary = params.get(b"boundary")
+        if content_type != b"multipart/form-data" or not boundary:
+            raise HTTPException(
+                status_code=400, detail="Expected a multipart/form-data upload"
+            )
+
+        return MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._on_part_begin,
+                "on_part_data": self._on_part_data,
+                "on_part_end": self._on_part_end,
+                "on_header_field": self._on_header_field,
+                "on_header_value": self._on_header_value,
+                "on_header_end": self._on_header_end,
+                "on_headers_finished": self._on_headers_finished,
+            },
+        )
+
+    def _on_part_begin(self) -> None:
+        self._part_headers = {}
+        self._in_file_part = False
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._part_headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(
+            self._part_headers.get(b"content-disposition", b"")
+        )
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        # Only the first part carrying the expected file field is stored;
+        # any other form fields are parsed and discarded.
+        if name == self.field_name and b"filename" in options and not self._file_seen:
+            self._file_seen = True
+            self._in_file_part = True
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            declared_type = self._part_headers.get(b"content-type")
+            self.content_type = (
+                declared_type.decode("latin-1") if declared_type else None
+            )
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file_part:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        if self._in_file_part:
+            self._in_file_part = False
+            self._file_done = True
@@ -0,0 +1,29 @@
+"""
+Warm-loading of the ML models used by the analysis pipeline.
+
+Both models load lazily on first use, which would otherwise make the first
+claim handled by each worker process pay for reading the weights from disk.
+Workers call ``preload_models`` before accepting work instead: the Celery
+parent process loads them once before forking its pool (so the children
+share the memory pages copy-on-write), and the async worker loads them in
+each CPU pool process as it starts.
+"""
+
+import logging
+import time
+
+from app.services.fraud_service import fraud_detection_service
+from app.services.vision_service import yolo_vision_service
+
+logger = logging.getLogger(__name__)
+
+
+def preload_models() -> None:
+    started = time.perf_counter()
+    vision_model = yolo_vision_service.load()
+    fraud_model = fraud_detection_service.load()
+    logger.info(
+        f"Preloaded models in {time.perf_counter() - started:.2f}s "
+        f"(yolo={'ready' if vision_model is not None else 'unavailable'}, "
+        f"fraud={'ready' if fraud_model is not None else 'unavailable'})"
+    )
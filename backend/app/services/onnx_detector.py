@@ -0,0 +1,241 @@
+"""
+ONNX Runtime backend for the YOLO damage detector.
+
+Runs the model exported by ``scripts/train_yolo.py --export`` without
+PyTorch: letterboxing, output decoding and NMS are done here in numpy, and
+the session uses a fixed intra-op thread pool so several worker processes
+can share a CPU-only host without oversubscribing it.
+"""
+
+import ast
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import cv2
+    import onnxruntime as ort
+
+    HAS_ONNXRUNTIME = True
+except ImportError:
+    HAS_ONNXRUNTIME = False
+
+logger = logging.getLogger(__name__)
+
+# Same defaults as ultralytics' predictor
+CONFIDENCE_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+LETTERBOX_FILL = 114
+
+
+@dataclass
+class OnnxBox:
+    # Shaped like ultralytics' Boxes entries: cls/conf of shape (1,), xyxy (1, 4)
+    cls: np.ndarray
+    conf: np.ndarray
+    xyxy: np.ndarray
+
+
+@dataclass
+class OnnxResult:
+    boxes: List[OnnxBox]
+
+
+def letterbox(
+    image: np.ndarray, size: Tuple[int, int]
+) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    Resize ``image`` to fit ``size`` (height, width) keeping its aspect ratio
+    and pad the remainder, as ultralytics does. Returns the padded image, the
+    scale factor and the (x, y) padding so boxes can be mapped back.
+    """
+    height, width = image.shape[:2]
+    gain = min(size[0] / height, size[1] / width)
+    new_width, new_height = round(width * gain), round(height * gain)
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(
+            image, (new_width, new_height), interpolation=cv2.INTER_LINEAR
+        )
+
+    pad_x, pad_y = (size[1] - new_width) / 2, (size[0] - new_height) / 2
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    image = cv2.copyMakeBorder(
+        image,
+        top,
+        bottom,
+        left,
+        right,
+        cv2.BORDER_CONSTANT,
+        value=(LETTERBOX_FILL,) * 3,
+    )
+    return image, gain, (left, top)
+
+
+def non_max_suppression(
+    boxes: np.ndarray, scores: np.ndarray, iou_threshold: float
+) -> np.ndarray:
+    """Greedy NMS over xyxy ``boxes``; returns the kept indices by descending score."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        inter_w = np.clip(
+            np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None
+        )
+        inter_h = np.clip(
+            np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None
+        )
+        inter = inter_w * inter_h
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=int)
+
+
+def decode_predictions(
+    predictions: np.ndarray,
+    gain: float,
+    pad: Tuple[float, float],
+    image_shape: Sequence[int],
+    conf_threshold: float = CONFIDENCE_THRESHOLD,
+    iou_threshold: float = IOU_THRESHOLD,
+) -> OnnxResult:
+    """
+    Turn one image's raw YOLOv8 output, shaped (4 + classes, anchors) with
+    boxes as centre/size in letterboxed pixels, into detections in the
+    original image's coordinates.
+    """
+    predictions = predictions.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    confidences = class_scores[np.arange(len(class_ids)), class_ids]
+
+    mask = confidences >= conf_threshold
+    centres, class_ids, confidences = (
+        predictions[mask, :4],
+        class_ids[mask],
+        confidences[mask],
+    )
+    if not len(confidences):
+        return OnnxResult(boxes=[])
+
+    boxes = np.empty_like(centres)
+    boxes[:, :2] = centres[:, :2] - centres[:, 2:4] / 2
+    boxes[:, 2:] = centres[:, :2] + centres[:, 2:4] / 2
+
+    # Offset boxes per class so NMS never suppresses across classes
+    offsets = class_ids[:, None].astype(boxes.dtype) * 4096
+    keep = non_max_suppression(boxes + offsets, confidences, iou_threshold)[
+        :MAX_DETECTIONS
+    ]
+
+    boxes = (boxes[keep] - np.array([pad[0], pad[1], pad[0], pad[1]])) / gain
+    height, width = image_shape[:2]
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+    return OnnxResult(
+        boxes=[
+            OnnxBox(
+                cls=np.array([class_id], dtype=float),
+                conf=np.array([confidence], dtype=float),
+                xyxy=box[None, :].astype(float),
+            )
+            for class_id, confidence, box in zip(
+                class_ids[keep], confidences[keep], boxes, strict=True
+            )
+        ]
+    )
+
+
+class OnnxYoloDetector:
+    """
+    Callable like an ultralytics ``YOLO`` model (one image or a list of
+    images in, one result per image out) so ``YoloVisionService`` can use
+    either interchangeably.
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        names: Optional[Dict[int, str]] = None,
+        imgsz: Tuple[int, int] = (640, 640),
+    ):
+        self.session = session
+        self.names = names or {}
+        model_input = session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = np.float16 if "float16" in model_input.type else np.float32
+
+        # Static exports fix the batch and image size; dynamic ones use names
+        batch, _, height, width = model_input.shape
+        self.max_batch_size = batch if isinstance(batch, int) else None
+        if isinstance(height, int) and isinstance(width, int):
+            imgsz = (height, width)
+        self.imgsz = tuple(imgsz)
+
+    @classmethod
+    def from_path(
+        cls,
+        model_path: str,
+        intra_op_threads: int = 0,
+        execution_provider: str = "CPUExecutionProvider",
+    ) -> "OnnxYoloDetector":
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # 0 lets ONNX Runtime use one thread per physical core
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+
+        available = ort.get_available_providers()
+        providers = [
+            p for p in (execution_provider, "CPUExecutionProvider") if p in available
+        ]
+        session = ort.InferenceSession(
+            model_path, sess_options=options, providers=list(dict.fromkeys(providers))
+        )
+
+        # ultralytics stores these as Python literals in the model metadata
+        metadata = session.get_modelmeta().custom_metadata_map
+        names = ast.literal_eval(metadata["names"]) if "names" in metadata else None
+        imgsz = (
+            ast.literal_eval(metadata["imgsz"]) if "imgsz" in metadata else (640, 640)
+        )
+        logger.info(
+            f"Loaded ONNX damage detector from {model_path} ({session.get_providers()[0]})"
+        )
+        return cls(session, names=names, imgsz=imgsz)
+
+    def __call__(self, images) -> List[OnnxResult]:
+        if isinstance(images, np.ndarray):
+            images = [images]
+
+        batch_size = self.max_batch_size or len(images)
+        results: List[OnnxResult] = []
+        for start in range(0, len(images), batch_size):
+            results.extend(self._predict(images[start : start + batch_size]))
+        return results
+
+    def _predict(self, images: Sequence[np.ndarray]) -> List[OnnxResult]:
+        prepared = [letterbox(image, self.imgsz) for image in images]
+        # BGR HWC uint8 -> RGB CHW float in [0, 1]
+        batch = np.stack(
+            [padded[..., ::-1].transpose(2, 0, 1) for padded, _, _ in prepared]
+        )
+        batch = np.ascontiguousarray(batch, dtype=self.input_dtype) / self.input_dtype(
+            255
+        )
+
+        outputs = self.session.run(None, {self.input_name: batch})[0]
+        return [
+            decode_predictions(output.astype(np.float32), gain, pad, image.shape)
+            for output, image, (_, gain, pad) in zip(
+                outputs, images, prepared, strict=True
+            )
+        ]
@@ -0,0 +1,148 @@
+"""
+Bulk payout runs: pay every approved, unpaid claim in one job.
+
+Claims are taken in keyset pages ordered by id. Each page is locked with
+``FOR UPDATE SKIP LOCKED`` (Postgres), so concurrent runs and single-claim
+payouts never pick up the same claim; its Stripe transfers are sent with
+bounded concurrency and all status transitions of the page are committed
+together. Transfers use the claim's idempotency key, so a claim whose page
+was interrupted after Stripe accepted it is not paid twice by the next run.
+Failed payouts are retried by later runs until ``PAYOUT_MAX_ATTEMPTS``.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.claims import Claim
+from app.models.payouts import Payout
+from app.services.payout_service import amount_in_cents, payout_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PayoutRunReport:
+    claims_selected: int = 0
+    paid: int = 0
+    failed: int = 0
+    batches: int = 0
+    amount_paid: float = 0.0
+    elapsed_seconds: float = 0.0
+    failures: List[Dict[str, str]] = field(default_factory=list)
+
+
+def _payable_claims_query(after_id, batch_size: int, max_attempts: int):
+    stmt = (
+        select(Claim)
+        .outerjoin(Payout, Payout.claim_id == Claim.id)
+        .where(
+            Claim.status == "Approved",
+            Claim.approved_amount > 0,
+            or_(
+                Payout.id.is_(None),
+                Payout.status == "paid",
+                Payout.attempts < max_attempts,
+            ),
+        )
+        .order_by(Claim.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True, of=Claim)
+    )
+    if after_id is not None:
+        stmt = stmt.where(Claim.id > after_id)
+    return stmt
+
+
+async def _payouts_for(db: AsyncSession, claims: List[Claim]) -> Dict[Any, Payout]:
+    result = await db.execute(
+        select(Payout).where(Payout.claim_id.in_([claim.id for claim in claims]))
+    )
+    payouts = {payout.claim_id: payout for payout in result.scalars().all()}
+    for claim in claims:
+        if claim.id not in payouts:
+            payouts[claim.id] = payout_service.new_payout(claim)
+            db.add(payouts[claim.id])
+    return payouts
+
+
+async def run_payouts(
+    batch_size: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    max_attempts: Optional[int] = None,
+    session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+) -> PayoutRunReport:
+    """Pay out all approved claims; each claim is attempted at most once per run."""
+    batch_size = batch_size or settings.PAYOUT_RUN_BATCH_SIZE
+    max_attempts = max_attempts or settings.PAYOUT_MAX_ATTEMPTS
+    semaphore = asyncio.Semaphore(concurrency or settings.PAYOUT_RUN_CONCURRENCY)
+    report = PayoutRunReport()
+    started = time.perf_counter()
+    after_id = None
+
+    async def transfer(claim: Claim):
+        async with semaphore:
+            try:
+                return await payout_service.create_transfer(claim), None
+            except Exception as e:
+                return None, e
+
+    while True:
+        async with session_factory() as db:
+            result = await db.execute(
+                _payable_claims_query(after_id, batch_size, max_attempts)
+            )
+            claims = result.scalars().all()
+            if not claims:
+                break
+
+            payouts = await _payouts_for(db, claims)
+            # Transferred before (e.g. moved back to Approved): only fix the status
+            pending = []
+            for claim in claims:
+                if payouts[claim.id].status == "paid":
+                    claim.status = "Paid"
+                else:
+                    pending.append(claim)
+
+            outcomes = await asyncio.gather(*(transfer(claim) for claim in pending))
+            for claim, (transfer_id, error) in zip(pending, outcomes, strict=True):
+                payout = payouts[claim.id]
+                payout.attempts += 1
+                if error is None:
+                    payout_service.record_success(db, payout, claim, transfer_id)
+                    report.paid += 1
+                    report.amount_paid += amount_in_cents(claim.approved_amount) / 100
+                else:
+                    logger.warning(f"Payout for claim {claim.id} failed: {error}")
+                    payout_service.record_failure(payout, error)
+                    report.failed += 1
+                    report.failures.append(
+                        {"claim_id": str(claim.id), "error": str(error)}
+                    )
+
+            await db.commit()
+
+        after_id = claims[-1].id
+        report.batches += 1
+        report.claims_selected += len(claims)
+        if len(claims) < batch_size:
+            break
+
+    report.elapsed_seconds = time.perf_counter() - started
+    metrics.increment("payout_runs.completed")
+    logger.info(
+        f"Payout run: {report.paid} paid (${report.amount_paid:,.2f}), "
+        f"{report.failed} failed, {report.claims_selected} claims in "
+        f"{report.batches} batches ({report.elapsed_seconds:.1f}s)"
+    )
+    return report
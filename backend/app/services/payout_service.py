@@ -0,0 +1,153 @@
+"""
+Claim payouts through Stripe.
+
+The Stripe SDK is synchronous, so transfers run on a small dedicated thread
+pool and never block the event loop. Every transfer carries an idempotency
+key derived from the claim, and its outcome is stored as a ``Payout`` row:
+a payout retried after a timeout, a crash or a double submit reuses the same
+key and record, so a claim cannot be paid twice.
+"""
+
+import asyncio
+import functools
+import logging
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+
+import stripe
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.claims import Claim, ClaimAuditLog
+from app.models.payouts import Payout
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+# Network errors are retried by the SDK, reusing the request's idempotency key
+stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+
+# Claimants do not link bank accounts through Stripe Connect yet, so every
+# transfer goes to this placeholder connected account.
+MOCK_DESTINATION = "acct_1032D82eZvKYlo2C"
+
+
+def payout_idempotency_key(claim_id) -> str:
+    return f"claim-payout-{claim_id}"
+
+
+def amount_in_cents(amount) -> int:
+    cents = (Decimal(str(amount or 0)) * 100).quantize(
+        Decimal("1"), rounding=ROUND_HALF_UP
+    )
+    return int(cents)
+
+
+class PayoutService:
+    def __init__(self, max_workers: Optional[int] = None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.PAYOUT_MAX_WORKERS,
+            thread_name_prefix="stripe-payout",
+        )
+
+    async def create_transfer(self, claim: Claim) -> str:
+        """Transfer a claim's approved amount; returns the Stripe transfer id."""
+        cents = amount_in_cents(claim.approved_amount)
+        if cents <= 0:
+            raise ValueError("Approved amount must be greater than zero.")
+
+        if not settings.STRIPE_SECRET_KEY:
+            logger.info("STRIPE_SECRET_KEY not set. Mocking Stripe payout transfer.")
+            return f"tr_mock_{secrets.token_hex(12)}"
+
+        loop = asyncio.get_running_loop()
+        transfer = await loop.run_in_executor(
+            self._executor,
+            functools.partial(
+                stripe.Transfer.create,
+                amount=cents,
+                currency="usd",
+                destination=MOCK_DESTINATION,
+                description=f"Insurance claim payout: {claim.claim_number}",
+                idempotency_key=payout_idempotency_key(claim.id),
+            ),
+        )
+        return transfer.id
+
+    @staticmethod
+    def new_payout(claim: Claim) -> Payout:
+        return Payout(
+            claim_id=claim.id,
+            idempotency_key=payout_idempotency_key(claim.id),
+            amount=claim.approved_amount,
+            currency="usd",
+            status="pending",
+            attempts=0,
+        )
+
+    async def get_or_create_payout(self, db: AsyncSession, claim: Claim) -> Payout:
+        result = await db.execute(select(Payout).where(Payout.claim_id == claim.id))
+        payout = result.scalars().first()
+        if payout is None:
+            payout = self.new_payout(claim)
+            db.add(payout)
+        return payout
+
+    def record_success(
+        self, db: AsyncSession, payout: Payout, claim: Claim, transfer_id: str
+    ) -> None:
+        payout.status = "paid"
+        payout.transfer_id = transfer_id
+        payout.paid_at = datetime.utcnow()
+        payout.last_error = None
+        claim.status = "Paid"
+        db.add(
+            ClaimAuditLog(
+                claim_id=claim.id,
+                action="payout",
+                performed_by="system",
+                details={
+                    "transfer_id": transfer_id,
+                    "amount": float(payout.amount),
+                    "idempotency_key": payout.idempotency_key,
+                },
+            )
+        )
+        metrics.increment("payouts.paid")
+
+    def record_failure(self, payout: Payout, error: Exception) -> None:
+        payout.status = "failed"
+        payout.last_error = str(error)
+        metrics.increment("payouts.failed")
+
+    async def pay_claim(self, db: AsyncSession, claim: Claim) -> Payout:
+        """
+        Pay out an approved claim and commit the result. A failed Stripe
+        call is recorded on the payout (and committed) before re-raising.
+        """
+        payout = await self.get_or_create_payout(db, claim)
+        if payout.status == "paid":
+            # Already transferred (e.g. the claim was moved back to Approved)
+            claim.status = "Paid"
+            await db.commit()
+            return payout
+
+        payout.attempts += 1
+        try:
+            transfer_id = await self.create_transfer(claim)
+        except stripe.error.StripeError as e:
+            self.record_failure(payout, e)
+            await db.commit()
+            raise
+
+        self.record_success(db, payout, claim, transfer_id)
+        await db.commit()
+        return payout
+
+
+payout_service = PayoutService()
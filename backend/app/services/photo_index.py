@@ -0,0 +1,295 @@
+import hashlib
+import io
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.executors import run_cpu_bound
+from app.core.metrics import metrics
+from app.models.claims import ClaimPhoto
+from app.services.storage import storage_service
+
+try:
+    from PIL import Image, ImageOps
+
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = HASH_BITS // BAND_COUNT
+# Multi-index hashing: two hashes within distance < BAND_COUNT must agree
+# exactly on at least one band, so band lookups find every such neighbour.
+MAX_INDEXED_DISTANCE = BAND_COUNT - 1
+
+
+def compute_phash(data: bytes) -> Optional[int]:
+    """
+    64-bit difference hash (dHash) of an encoded image, robust to resizing,
+    re-encoding and small edits. Runs synchronously; call it through
+    ``run_cpu_bound``.
+    """
+    if not HAS_PIL:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Let the JPEG decoder downscale while decoding; we only need 9x8
+            image.draft("L", (64, 64))
+            image = (
+                ImageOps.exif_transpose(image)
+                .convert("L")
+                .resize((9, 8), Image.Resampling.LANCZOS)
+            )
+            pixels = image.tobytes()
+    except Exception as e:
+        logger.error(f"Failed to compute perceptual hash: {e}")
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return to_signed64(value)
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned 64-bit hash onto the signed range of a BIGINT column."""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return ((a ^ b) & ((1 << 64) - 1)).bit_count()
+
+
+def phash_bands(phash: int) -> List[int]:
+    unsigned = phash & ((1 << 64) - 1)
+    mask = (1 << BAND_BITS) - 1
+    return [(unsigned >> (BAND_BITS * i)) & mask for i in range(BAND_COUNT)]
+
+
+def band_columns(phash: Optional[int]) -> dict:
+    """Column values for the phash and its indexed bands."""
+    if phash is None:
+        return {}
+    bands = phash_bands(phash)
+    return {"phash": phash, **{f"phash_band{i}": bands[i] for i in range(BAND_COUNT)}}
+
+
+async def phash_columns(data: bytes) -> dict:
+    """``band_columns`` of an encoded image's perceptual hash, hashed off the loop."""
+    return band_columns(await run_cpu_bound(compute_phash, data))
+
+
+async def fill_missing_phashes(db: AsyncSession, photos: Sequence[ClaimPhoto]) -> None:
+    """
+    Hash photos stored without a perceptual hash (e.g. when the variants task
+    has not run yet), so duplicate lookups do not silently skip them. Photos
+    that still cannot be hashed are logged and counted.
+    """
+    for photo in photos:
+        if photo.phash is not None:
+            continue
+        try:
+            data = await storage_service.read_bytes(photo.photo_url)
+        except Exception as e:
+            logger.warning(f"Cannot read photo {photo.id} to hash it: {e}")
+            data = None
+        fingerprint = await phash_columns(data) if data else {}
+        if not fingerprint:
+            logger.warning(
+                f"Photo {photo.id} has no perceptual hash; duplicate check skips it"
+            )
+            metrics.increment("photo_index.unhashed_photos")
+            continue
+        await db.execute(
+            update(ClaimPhoto).where(ClaimPhoto.id == photo.id).values(**fingerprint)
+        )
+        for column, value in fingerprint.items():
+            setattr(photo, column, value)
+    await db.commit()
+
+
+async def backfill_fingerprints(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Compute the SHA-256 and perceptual hash of stored photos missing either,
+    in keyset pages by id. Photos whose file is missing or undecodable are
+    logged and left as they are. Returns the number of photos updated.
+    """
+    updated = 0
+    after_id = None
+    while True:
+        stmt = (
+            select(ClaimPhoto)
+            .where(or_(ClaimPhoto.sha256.is_(None), ClaimPhoto.phash.is_(None)))
+            .order_by(ClaimPhoto.id)
+            .limit(batch_size)
+        )
+        if after_id is not None:
+            stmt = stmt.where(ClaimPhoto.id > after_id)
+        photos = (await db.execute(stmt)).scalars().all()
+        if not photos:
+            break
+
+        for photo in photos:
+            try:
+                data = await storage_service.read_bytes(photo.photo_url)
+            except Exception as e:
+                logger.warning(f"Skipping photo {photo.id}: {e}")
+                continue
+            fingerprint = {}
+            if photo.sha256 is None:
+                fingerprint["sha256"] = hashlib.sha256(data).hexdigest()
+            if photo.phash is None:
+                fingerprint.update(await phash_columns(data))
+                if "phash" not in fingerprint:
+                    logger.warning(f"Photo {photo.id} could not be perceptually hashed")
+            for column, value in fingerprint.items():
+                setattr(photo, column, value)
+            updated += bool(fingerprint)
+        await db.commit()
+
+        after_id = photos[-1].id
+        if len(photos) < batch_size:
+            break
+    return updated
+
+
+async def find_by_sha256(db: AsyncSession, sha256: str) -> Optional[ClaimPhoto]:
+    """Exact-content lookup through the indexed sha256 column."""
+    result = await db.execute(
+        select(ClaimPhoto).where(ClaimPhoto.sha256 == sha256).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def find_near_duplicates(
+    db: AsyncSession,
+    phash: int,
+    exclude_claim_id=None,
+    max_distance: int = MAX_INDEXED_DISTANCE,
+) -> List[Tuple[ClaimPhoto, int]]:
+    """
+    Photos whose perceptual hash is within ``max_distance`` bits of ``phash``.
+
+    Candidates come from the four indexed band columns (sub-linear in the
+    number of stored photos) and are verified with an exact Hamming distance.
+    """
+    if max_distance > MAX_INDEXED_DISTANCE:
+        raise ValueError(
+            f"Band index only guarantees recall up to distance {MAX_INDEXED_DISTANCE}"
+        )
+
+    bands = phash_bands(phash)
+    stmt = select(ClaimPhoto).where(
+        or_(
+            *(
+                getattr(ClaimPhoto, f"phash_band{i}") == bands[i]
+                for i in range(BAND_COUNT)
+            )
+        )
+    )
+    if exclude_claim_id is not None:
+        stmt = stmt.where(ClaimPhoto.claim_id != exclude_claim_id)
+
+    result = await db.execute(stmt)
+    matches = []
+    for photo in result.scalars().all():
+        distance = hamming_distance(phash, photo.phash)
+        if distance <= max_distance:
+            matches.append((photo, distance))
+    return sorted(matches, key=lambda match: match[1])
+
+
+async def find_cross_claim_duplicates(
+    db: AsyncSession, claim_id, photos: Sequence[ClaimPhoto]
+) -> List[dict]:
+    """
+    Near-duplicates of a claim's photos that belong to other claims, as
+    plain dicts for the fraud service and audit log.
+    """
+    duplicates = []
+    for photo in photos:
+        if photo.phash is None:
+            continue
+        for match, distance in await find_near_duplicates(
+            db, photo.phash, exclude_claim_id=claim_id
+        ):
+            duplicates.append(
+                {
+                    "photo_id": str(photo.id),
+                    "matched_photo_id": str(match.id),
+                    "matched_claim_id": str(match.claim_id),
+                    "distance": distance,
+                }
+            )
+    return duplicates
+
+
+async def find_cross_claim_duplicates_batch(
+    db: AsyncSession, claim_ids: Sequence[Any]
+) -> Dict[Any, List[dict]]:
+    """
+    ``find_cross_claim_duplicates`` for the photos of many claims at once,
+    keyed by claim id (claims without duplicates are omitted). Uses one
+    query for the claims' photos and one band-index query for candidates,
+    however many claims there are.
+    """
+    photos = (
+        await db.execute(
+            select(ClaimPhoto.id, ClaimPhoto.claim_id, ClaimPhoto.phash).where(
+                ClaimPhoto.claim_id.in_(claim_ids), ClaimPhoto.phash.isnot(None)
+            )
+        )
+    ).all()
+    if not photos:
+        return {}
+
+    photo_bands = {photo.id: phash_bands(photo.phash) for photo in photos}
+    wanted = [
+        sorted({bands[i] for bands in photo_bands.values()}) for i in range(BAND_COUNT)
+    ]
+    candidates = (
+        await db.execute(
+            select(ClaimPhoto.id, ClaimPhoto.claim_id, ClaimPhoto.phash).where(
+                or_(
+                    *(
+                        getattr(ClaimPhoto, f"phash_band{i}").in_(wanted[i])
+                        for i in range(BAND_COUNT)
+                    )
+                )
+            )
+        )
+    ).all()
+    by_band: Dict[Tuple[int, int], list] = {}
+    for candidate in candidates:
+        for i, band in enumerate(phash_bands(candidate.phash)):
+            by_band.setdefault((i, band), []).append(candidate)
+
+    duplicates: Dict[Any, List[dict]] = {}
+    for photo in photos:
+        matches = {}
+        for i, band in enumerate(photo_bands[photo.id]):
+            for candidate in by_band.get((i, band), []):
+                if candidate.claim_id == photo.claim_id or candidate.id in matches:
+                    continue
+                distance = hamming_distance(photo.phash, candidate.phash)
+                if distance <= MAX_INDEXED_DISTANCE:
+                    matches[candidate.id] = (candidate, distance)
+        for candidate, distance in sorted(matches.values(), key=lambda m: m[1]):
+            duplicates.setdefault(photo.claim_id, []).append(
+                {
+                    "photo_id": str(photo.id),
+                    "matched_photo_id": str(candidate.id),
+                    "matched_claim_id": str(candidate.claim_id),
+                    "distance": distance,
+                }
+            )
+    return duplicates
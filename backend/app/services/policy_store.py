@@ -0,0 +1,220 @@
+"""
+Policy repository used by the policies API and claim adjudication.
+
+Policies are read on every lookup and every adjudication but change rarely,
+so reads go through two cache tiers: a short-lived in-process LRU, which
+serves hot policies without a network round trip, in front of Redis, with
+the ``policies`` table behind both. ``PolicyStore.save`` drops the policy
+from both tiers once the write is committed; other processes see the change
+when their local entry expires (``POLICY_CACHE_LOCAL_TTL_SECONDS``).
+
+Misses are protected against stampedes when a popular entry expires:
+concurrent misses for the same policy share one load per process, Redis
+entries are refreshed early with a probability that rises as they near
+expiry (XFetch), and unknown policy numbers are cached as absent for
+``POLICY_CACHE_NEGATIVE_TTL_SECONDS``.
+"""
+
+import json
+import logging
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.cache import SingleFlight, TTLCache, get_redis_client
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.policies import Policy
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "policy:"
+# Local-tier marker for a policy number known not to exist
+_UNKNOWN = object()
+
+
+def normalize_vin(vin: Optional[str]) -> Optional[str]:
+    if not vin or not vin.strip():
+        return None
+    return vin.strip().upper()
+
+
+def policy_to_dict(policy: Policy) -> Dict[str, Any]:
+    return {
+        "policy_number": policy.policy_number,
+        "holder_name": policy.holder_name,
+        "status": policy.status,
+        "vehicle_vin": policy.vehicle_vin,
+        "vehicle_info": policy.vehicle_info or "",
+        "coverage_limit": float(policy.coverage_limit),
+        "deductible": float(policy.deductible or 0),
+        "effective_date": policy.effective_date.isoformat(),
+        "expiration_date": policy.expiration_date.isoformat(),
+    }
+
+
+class PolicyStore:
+    def __init__(
+        self,
+        maxsize: Optional[int] = None,
+        local_ttl: Optional[float] = None,
+        ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = None,
+        early_refresh_beta: Optional[float] = None,
+        session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+    ):
+        self.ttl = ttl or settings.POLICY_CACHE_TTL_SECONDS
+        self.negative_ttl = negative_ttl or settings.POLICY_CACHE_NEGATIVE_TTL_SECONDS
+        self.early_refresh_beta = (
+            settings.POLICY_CACHE_EARLY_REFRESH_BETA
+            if early_refresh_beta is None
+            else early_refresh_beta
+        )
+        self.local = TTLCache(
+            maxsize=maxsize or settings.POLICY_CACHE_LOCAL_MAXSIZE,
+            ttl=local_ttl or settings.POLICY_CACHE_LOCAL_TTL_SECONDS,
+        )
+        self.session_factory = session_factory
+        self._flights = SingleFlight("policy_cache")
+        # Bumped by every invalidation, so loads that raced a write are not cached
+        self._generation = 0
+
+    async def get(self, policy_number: str) -> Optional[Dict[str, Any]]:
+        """
+        The policy as a dict, or ``None`` if it does not exist. Hot policies
+        (and recently seen unknown numbers) are answered from process memory;
+        otherwise one load per policy is in flight at a time, with its own
+        database session.
+        """
+        key = KEY_PREFIX + policy_number
+        value = self.local.get(key)
+        if value is None:
+            value = await self._flights.do(key, lambda: self._fetch(key, policy_number))
+        else:
+            metrics.increment("policy_cache.hits.local")
+        return None if value is _UNKNOWN else dict(value)
+
+    async def find_by_vin(self, db: AsyncSession, vin: str) -> List[Dict[str, Any]]:
+        """Policies covering a vehicle (uncached; uses the VIN index)."""
+        vin = normalize_vin(vin)
+        if vin is None:
+            return []
+        result = await db.execute(
+            select(Policy)
+            .where(Policy.vehicle_vin == vin)
+            .order_by(Policy.effective_date.desc())
+        )
+        return [policy_to_dict(policy) for policy in result.scalars().all()]
+
+    async def save(
+        self, db: AsyncSession, policy_number: str, **fields
+    ) -> Dict[str, Any]:
+        """
+        Create or update a policy, commit, and invalidate its cache entries.
+        """
+        if "vehicle_vin" in fields:
+            fields["vehicle_vin"] = normalize_vin(fields["vehicle_vin"])
+
+        result = await db.execute(
+            select(Policy).where(Policy.policy_number == policy_number)
+        )
+        policy = result.scalars().first()
+        if policy is None:
+            policy = Policy(policy_number=policy_number)
+            db.add(policy)
+        for name, value in fields.items():
+            setattr(policy, name, value)
+        await db.flush()
+        value = policy_to_dict(policy)
+
+        await db.commit()
+        await self.invalidate(policy_number)
+        return value
+
+    async def invalidate(self, policy_number: str) -> None:
+        key = KEY_PREFIX + policy_number
+        self._generation += 1
+        self.local.pop(key)
+        try:
+            await get_redis_client().delete(key)
+        except Exception as e:
+            logger.warning(f"Redis delete failed for policy cache: {e}")
+
+    def clear(self) -> None:
+        self.local.clear()
+
+    async def _fetch(self, key: str, policy_number: str) -> Any:
+        generation = self._generation
+        entry = await self._redis_get(key)
+        if entry is not None and not self._refresh_early(entry):
+            metrics.increment("policy_cache.hits.redis")
+            value = entry["policy"]
+        else:
+            metrics.increment(
+                "policy_cache.early_refreshes" if entry else "policy_cache.misses"
+            )
+            started = time.monotonic()
+            async with self.session_factory() as db:
+                value = await self._load(db, policy_number)
+            if generation == self._generation:
+                await self._redis_set(key, value, time.monotonic() - started)
+
+        if generation == self._generation:
+            if value is None:
+                self.local.set(
+                    key, _UNKNOWN, ttl=min(self.local.ttl, self.negative_ttl)
+                )
+            else:
+                self.local.set(key, value)
+        return _UNKNOWN if value is None else value
+
+    def _refresh_early(self, entry: Dict[str, Any]) -> bool:
+        """
+        XFetch: recompute before expiry with a probability that grows as the
+        expiry nears and with how long the last recompute took, so one
+        caller refreshes a hot entry instead of all of them at expiry.
+        """
+        if self.early_refresh_beta <= 0:
+            return False
+        # 1 - random() is in (0, 1], so the log is defined and <= 0
+        gap = -entry["delta"] * self.early_refresh_beta * math.log(1 - random.random())
+        return time.time() + gap >= entry["expiry"]
+
+    async def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            cached = await get_redis_client().get(key)
+        except Exception as e:
+            logger.warning(f"Redis get failed for policy cache: {e}")
+            return None
+        if not cached:
+            return None
+        entry = json.loads(cached)
+        # Entries in the older plain-policy format are treated as misses
+        return entry if isinstance(entry, dict) and "expiry" in entry else None
+
+    async def _redis_set(
+        self, key: str, value: Optional[Dict[str, Any]], delta: float
+    ) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        entry = {"policy": value, "delta": delta, "expiry": time.time() + ttl}
+        try:
+            await get_redis_client().setex(key, ttl, json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"Redis set failed for policy cache: {e}")
+
+    async def _load(
+        self, db: AsyncSession, policy_number: str
+    ) -> Optional[Dict[str, Any]]:
+        result = await db.execute(
+            select(Policy).where(Policy.policy_number == policy_number)
+        )
+        policy = result.scalars().first()
+        return policy_to_dict(policy) if policy else None
+
+
+policy_store = PolicyStore()
@@ -1,78 +1,311 @@
 import asyncio
 import os
-import shutil
+from typing import AsyncIterator, Optional
 from uuid import uuid4
 
 import aiofiles
-from fastapi import HTTPException, UploadFile, status
 
 from app.core.config import settings
 
+try:
+    import boto3
+
+    HAS_BOTO3 = True
+except ImportError:
+    HAS_BOTO3 = False
+
 UPLOAD_DIR = "uploads"
 
+# S3 rejects multipart parts smaller than this, except for the last one
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
 
-class StorageService:
-    def __init__(self):
-        if not os.path.exists(UPLOAD_DIR):
-            os.makedirs(UPLOAD_DIR)
 
-    async def upload_file(self, file: UploadFile) -> str:
-        """
-        Saves a file to local disk and returns the file path.
-        """
-        # Early check for file size to prevent processing oversized files
-        if file.size and file.size > settings.MAX_UPLOAD_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail=f"File exceeds limit: {settings.MAX_UPLOAD_SIZE} bytes.",
-            )
+class StorageBackend:
+    """
+    Where uploaded photos and their derived variants live.
+
+    Objects are addressed by keys such as ``uploads/<uuid>.jpg``; the key is
+    what gets stored in ``ClaimPhoto.photo_url``. The blocking methods are safe
+    to call from worker processes; the async service wraps them in threads.
+    Missing objects raise ``FileNotFoundError`` on every backend.
+    """
+
+    async def save_stream(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        raise NotImplementedError
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes ``[start, end)`` of an object (the whole object by default)."""
+        raise NotImplementedError
 
-        file_extension = os.path.splitext(file.filename)[1]
-        file_name = f"{uuid4()}{file_extension}"
-        file_path = os.path.join(UPLOAD_DIR, file_name)
+    def write(self, key: str, data: bytes) -> None:
+        raise NotImplementedError
 
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def presigned_url(self, key: str, expires_in: int) -> Optional[str]:
+        """A time-limited URL clients can fetch directly, if the backend has one."""
+        return None
+
+
+class LocalStorageBackend(StorageBackend):
+    """Objects stored as files below ``root`` (the working directory by default)."""
+
+    def __init__(self, root: str = ""):
+        self.root = root
+        upload_dir = os.path.join(root, UPLOAD_DIR)
+        if not os.path.exists(upload_dir):
+            os.makedirs(upload_dir)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key.lstrip("/"))
+
+    async def save_stream(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        file_path = self.path(key)
         try:
-            if file.size:
-                # Use efficient system-level copy when size is known and pre-validated
-                await asyncio.to_thread(self._save_file_sync, file, file_path)
-            else:
-                # Fallback to chunked read if size is unknown
-                await self._save_file_async_with_limit(file, file_path)
-        except Exception:
-            # Clean up partial file on failure
+            async with aiofiles.open(file_path, "wb") as buffer:
+                async for chunk in chunks:
+                    await buffer.write(chunk)
+        except BaseException:
+            # Clean up partial file on failure or cancellation
             if os.path.exists(file_path):
                 os.remove(file_path)
             raise
 
-        return file_path
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        with open(self.path(key), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(max(0, end - start))
+
+    def write(self, key: str, data: bytes) -> None:
+        file_path = self.path(key)
+        tmp_path = f"{file_path}.{uuid4().hex}.tmp"
+        try:
+            # Write then rename so concurrent readers never see a partial file
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def delete(self, key: str) -> None:
+        file_path = self.path(key)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+def _is_not_found(error: Exception) -> bool:
+    code = (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+    return code in ("404", "NoSuchKey", "NotFound")
+
+
+class S3StorageBackend(StorageBackend):
+    """
+    Objects stored in an S3-compatible bucket (AWS S3, or MinIO locally via
+    ``S3_ENDPOINT_URL``), so API and worker nodes need no shared volume.
+    """
 
-    def _save_file_sync(self, file: UploadFile, dest_path: str) -> None:
-        """Helper to perform synchronous file copy."""
-        with open(dest_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    def __init__(
+        self,
+        bucket: str,
+        client=None,
+        part_size: Optional[int] = None,
+    ):
+        if client is None:
+            if not HAS_BOTO3:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 to be installed")
+            client = boto3.client(
+                "s3",
+                endpoint_url=settings.S3_ENDPOINT_URL,
+                region_name=settings.S3_REGION,
+                aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            )
+        self.client = client
+        self.bucket = bucket
+        self.part_size = max(
+            part_size or settings.S3_MULTIPART_CHUNK_SIZE, S3_MIN_PART_SIZE
+        )
+
+    async def save_stream(self, key: str, chunks: AsyncIterator[bytes]) -> None:
+        """
+        Stream an upload into the bucket. Small objects are sent with a single
+        PUT; larger ones as a multipart upload, one part per ``part_size``
+        bytes, so memory stays bounded regardless of the object size.
+        """
+        buffer = bytearray()
+        parts: list[dict] = []
+        upload_id = None
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                if len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        response = await asyncio.to_thread(
+                            self.client.create_multipart_upload,
+                            Bucket=self.bucket,
+                            Key=key,
+                        )
+                        upload_id = response["UploadId"]
+                    await self._upload_part(key, upload_id, parts, bytes(buffer))
+                    buffer.clear()
+
+            if upload_id is None:
+                await asyncio.to_thread(
+                    self.client.put_object,
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                )
+                return
+
+            if buffer:
+                await self._upload_part(key, upload_id, parts, bytes(buffer))
+            await asyncio.to_thread(
+                self.client.complete_multipart_upload,
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            # Drop the parts already uploaded so they are not billed as orphans
+            if upload_id is not None:
+                await asyncio.to_thread(
+                    self.client.abort_multipart_upload,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                )
+            raise
 
-    async def _save_file_async_with_limit(
-        self, file: UploadFile, dest_path: str
+    async def _upload_part(
+        self, key: str, upload_id: str, parts: list[dict], data: bytes
     ) -> None:
-        """Fallback chunked upload with size validation when size is unknown."""
-        accumulated_size = 0
-        async with aiofiles.open(dest_path, "wb") as buffer:
-            # Using smaller 64KB chunks for better memory efficiency
-            while content := await file.read(64 * 1024):
-                accumulated_size += len(content)
-                if accumulated_size > settings.MAX_UPLOAD_SIZE:
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"File exceeds limit: {settings.MAX_UPLOAD_SIZE} bytes.",
-                    )
-                await buffer.write(content)
+        part_number = len(parts) + 1
+        response = await asyncio.to_thread(
+            self.client.upload_part,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=data,
+        )
+        parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+
+    def read(self, key: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        kwargs = {"Bucket": self.bucket, "Key": key}
+        if start or end is not None:
+            # HTTP ranges are inclusive of the last byte
+            last = "" if end is None else str(end - 1)
+            kwargs["Range"] = f"bytes={start}-{last}"
+        try:
+            response = self.client.get_object(**kwargs)
+        except Exception as e:
+            if _is_not_found(e):
+                raise FileNotFoundError(key) from e
+            raise
+        return response["Body"].read()
+
+    def write(self, key: str, data: bytes) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except Exception as e:
+            if _is_not_found(e):
+                return False
+            raise
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def presigned_url(self, key: str, expires_in: int) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires_in,
+        )
+
+
+def create_storage_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3StorageBackend(bucket=settings.S3_BUCKET)
+    return LocalStorageBackend()
+
+
+class StorageService:
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or create_storage_backend()
+
+    async def upload_stream(
+        self, chunks: AsyncIterator[bytes], file_extension: str
+    ) -> str:
+        """
+        Writes an async stream of chunks to storage and returns the new key.
+        Size limits and validation are the caller's responsibility.
+        """
+        key = os.path.join(UPLOAD_DIR, f"{uuid4()}{file_extension}")
+        await self.backend.save_stream(key, chunks)
+        return key
+
+    async def read_bytes(
+        self, key: str, start: int = 0, end: Optional[int] = None
+    ) -> bytes:
+        """
+        Reads an object, or the byte range ``[start, end)`` of it.
+        Raises FileNotFoundError if it does not exist.
+        """
+        return await asyncio.to_thread(self.backend.read, key, start, end)
+
+    def read_bytes_sync(self, key: str) -> bytes:
+        """Blocking read for code already running in a worker thread or process."""
+        return self.backend.read(key)
+
+    async def write_bytes(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self.backend.write, key, data)
+
+    async def exists(self, file_path: str) -> bool:
+        """
+        Whether a stored object is still present.
+        """
+        return await asyncio.to_thread(self.backend.exists, file_path)
+
+    async def presigned_url(
+        self, key: str, expires_in: Optional[int] = None
+    ) -> Optional[str]:
+        """
+        Time-limited download URL, or None for backends that cannot issue one.
+        """
+        return await asyncio.to_thread(
+            self.backend.presigned_url,
+            key,
+            expires_in or settings.STORAGE_PRESIGNED_URL_EXPIRY,
+        )
+
+    def download_url(self, key: str) -> str:
+        """
+        What clients should load an object from: a presigned URL where the
+        backend issues them, otherwise the key itself (served by the API).
+        Signing is local computation, so this is safe to call inline.
+        """
+        url = self.backend.presigned_url(key, settings.STORAGE_PRESIGNED_URL_EXPIRY)
+        return url or key
 
     async def delete_file(self, file_path: str) -> None:
         """
-        Deletes a file from local disk.
+        Deletes an object from storage.
         """
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        await asyncio.to_thread(self.backend.delete, file_path)
 
 
 storage_service = StorageService()
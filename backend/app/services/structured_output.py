@@ -0,0 +1,83 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class IncrementalJSONObjectParser:
+    """
+    Extracts the first complete top-level JSON object from text that arrives
+    in chunks, e.g. a streamed model response.
+
+    Anything before the opening brace (prose, a markdown fence) and after the
+    closing one is ignored. With ``required_fields`` it also finishes as soon
+    as every required member has been seen, without waiting for the rest of
+    the object, so the caller can stop consuming the stream early.
+    """
+
+    def __init__(self, required_fields: Iterable[str] = ()):
+        self.required_fields = set(required_fields)
+        self.result: Optional[Dict[str, Any]] = None
+        self._reset()
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, text: str) -> bool:
+        """Consume the next chunk; returns True once an object is complete."""
+        for char in text:
+            if self.done:
+                break
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._buffer = ["{"]
+                continue
+
+            self._buffer.append(char)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete("".join(self._buffer), final=True)
+            elif char == "," and self._depth == 1 and self.required_fields:
+                # Every member before a top-level comma is complete
+                self._complete("".join(self._buffer[:-1]) + "}", final=False)
+        return self.done
+
+    def _complete(self, candidate: str, final: bool) -> None:
+        try:
+            parsed = json.loads(candidate)
+        except ValueError:
+            parsed = None
+
+        if isinstance(parsed, dict):
+            if final or self.required_fields <= parsed.keys():
+                self.result = parsed
+        elif final:
+            # Not valid JSON after all (e.g. braces in prose); keep looking
+            self._reset()
+
+    def _reset(self) -> None:
+        self._buffer: List[str] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+
+def parse_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """The first complete JSON object in ``text``, or None."""
+    parser = IncrementalJSONObjectParser()
+    parser.feed(text)
+    return parser.result
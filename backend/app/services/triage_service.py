@@ -0,0 +1,115 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.adjudication_service import AdjudicationService
+from app.services.fraud_service import DUPLICATE_PHOTO_RISK
+
+logger = logging.getLogger(__name__)
+
+
+class TriageService:
+    """
+    Runs ahead of the Claude call and short-circuits claims whose
+    adjudication outcome is already fixed by signals available without it
+    (policy state, YOLO detections, duplicate photos). Every rule mirrors a
+    guardrail in AdjudicationService that no AI assessment could lift, so
+    skipping the LLM never changes the outcome, only its cost and latency.
+    """
+
+    # YOLO severities whose repairs always exceed the auto-approval amount
+    MANUAL_REVIEW_SEVERITIES = ("major", "total_loss")
+
+    @classmethod
+    def evaluate(
+        cls,
+        policy: Optional[dict],
+        vision_result: dict,
+        duplicate_photos: Optional[List[Dict[str, Any]]] = None,
+        min_vision_confidence: Optional[float] = None,
+    ) -> Optional[dict]:
+        """
+        Returns None when the claim needs the LLM, otherwise
+        { "status": "Rejected" | "Manual Review", "reason": str, "rule": str }.
+        """
+        # Adjudication sends claims on unknown policies to review, and rejects
+        # inactive ones, before looking at anything else
+        if policy is None:
+            return {
+                "status": "Manual Review",
+                "reason": "Policy not found.",
+                "rule": "unknown_policy",
+            }
+        policy_status = policy.get("status")
+        if not policy_status or policy_status.upper() != "ACTIVE":
+            return {
+                "status": "Rejected",
+                "reason": "Policy is not active.",
+                "rule": "inactive_policy",
+            }
+
+        # Reused photos alone push the fraud score past the review threshold
+        if (
+            duplicate_photos
+            and DUPLICATE_PHOTO_RISK > AdjudicationService.MAX_FRAUD_SCORE
+        ):
+            return {
+                "status": "Manual Review",
+                "reason": (
+                    f"{len(duplicate_photos)} photo(s) reused from other claims; "
+                    f"fraud score is at least {DUPLICATE_PHOTO_RISK}."
+                ),
+                "rule": "duplicate_photos",
+            }
+
+        try:
+            available = float(policy.get("coverage_limit") or 0) - float(
+                policy.get("deductible") or 0
+            )
+        except (TypeError, ValueError):
+            available = 0.0
+        if available <= 0:
+            return {
+                "status": "Manual Review",
+                "reason": "Policy has no coverage left after the deductible.",
+                "rule": "no_available_coverage",
+            }
+
+        severe = cls._confident_severe_detections(
+            vision_result,
+            settings.TRIAGE_MIN_VISION_CONFIDENCE
+            if min_vision_confidence is None
+            else min_vision_confidence,
+        )
+        if severe:
+            best = max(severe, key=lambda d: d.get("confidence", 0))
+            return {
+                "status": "Manual Review",
+                "reason": (
+                    f"Computer vision detected {best['class']} "
+                    f"(confidence {best.get('confidence')}); repairs will exceed the "
+                    f"auto-approval limit (${AdjudicationService.MAX_AUTO_APPROVE_AMOUNT})."
+                ),
+                "rule": "severe_damage_detected",
+            }
+
+        return None
+
+    @classmethod
+    def _confident_severe_detections(
+        cls, vision_result: dict, min_confidence: float
+    ) -> List[Dict[str, Any]]:
+        if vision_result.get("status") != "success":
+            return []
+        return [
+            detection
+            for detection in vision_result.get("detections", [])
+            if any(
+                s in str(detection.get("class", ""))
+                for s in cls.MANUAL_REVIEW_SEVERITIES
+            )
+            and (detection.get("confidence") or 0) >= min_confidence
+        ]
+
+
+triage_service = TriageService()
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executors import run_cpu_bound
+from app.services.vision_service import YoloVisionService, yolo_vision_service
+
+logger = logging.getLogger(__name__)
+
+
+class VisionBatchScheduler:
+    """
+    Long-lived in-process scheduler that coalesces photo inference jobs from
+    many concurrent claims into shared YOLO forward passes.
+
+    Callers enqueue one job per photo and await its future. A single consumer
+    task waits for the first job, keeps collecting until either the batching
+    window elapses or the batch is full, runs the batch off the event loop and
+    fans the per-image detections back out to the awaiting coroutines. Only one
+    batch runs at a time, so bursts share the model instead of fighting over
+    the same cores from many threads.
+    """
+
+    def __init__(
+        self,
+        vision_service: YoloVisionService,
+        window_ms: Optional[int] = None,
+        max_batch_size: Optional[int] = None,
+    ):
+        self.vision_service = vision_service
+        self.window = (
+            window_ms if window_ms is not None else settings.VISION_BATCH_WINDOW_MS
+        ) / 1000
+        self.max_batch_size = max(1, max_batch_size or settings.YOLO_MAX_BATCH_SIZE)
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumer: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def detect_damage(self, photo_urls: List[str]) -> Dict[str, Any]:
+        """Batched, awaitable equivalent of ``YoloVisionService.detect_damage``."""
+        # available() rather than model: the scheduler runs on the event loop,
+        # and inference (with the loaded model) lives in the CPU pool
+        if (
+            not settings.VISION_MICROBATCH_ENABLED
+            or not self.vision_service.available()
+        ):
+            return await run_cpu_bound(self.vision_service.detect_damage, photo_urls)
+
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for url in photo_urls:
+            future = loop.create_future()
+            self._queue.put_nowait((url, future))
+            futures.append(future)
+
+        per_image = await asyncio.gather(*futures)
+        return self.vision_service.summarize_detections(per_image)
+
+    async def close(self) -> None:
+        """Stop the consumer task, failing any jobs still waiting in the queue."""
+        if self._consumer and not self._consumer.done():
+            self._consumer.cancel()
+            try:
+                await self._consumer
+            except asyncio.CancelledError:
+                pass
+        if self._queue:
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Vision scheduler closed"))
+        self._queue = None
+        self._consumer = None
+        self._loop = None
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Queues and tasks are bound to a loop; start afresh when the caller
+        # runs on a different loop (e.g. one asyncio.run() per Celery task).
+        if self._loop is not loop or self._consumer is None or self._consumer.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._consumer = loop.create_task(self._consume())
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Drop jobs whose callers have already given up
+        return [(url, future) for url, future in batch if not future.done()]
+
+    async def _consume(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+
+            urls = [url for url, _ in batch]
+            try:
+                per_image = await run_cpu_bound(
+                    self.vision_service.predict_batch, urls, self.max_batch_size
+                )
+            except Exception as e:
+                logger.error(f"Micro-batched YOLO inference failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), detections in zip(batch, per_image, strict=True):
+                if not future.done():
+                    future.set_result(detections)
+
+
+vision_batcher = VisionBatchScheduler(yolo_vision_service)
@@ -1,20 +1,41 @@
+import importlib.util
 import logging
 import os
-from typing import Any, Dict, List
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.image_processing import inference_image_path
+from app.services.storage import storage_service
 
 try:
-    from ultralytics import YOLO
+    import cv2
+    import numpy as np
 
-    HAS_YOLO = True
+    # ultralytics pulls in torch, so it is only imported when the model loads
+    HAS_YOLO = importlib.util.find_spec("ultralytics") is not None
 except ImportError:
     HAS_YOLO = False
 
 logger = logging.getLogger(__name__)
 
+SEVERITY_LEVELS = {"minor": 1, "moderate": 2, "major": 3, "total_loss": 4}
+
+# Fine-tuned weights written by scripts/train_yolo.py (backend/scripts/runs/...)
+WEIGHTS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "scripts",
+    "runs",
+    "damage_assessment",
+    "weights",
+)
+
 
 class YoloVisionService:
     def __init__(self):
-        self.model = None
+        self._model = None
+        self._model_loaded = False
+        self._load_lock = threading.Lock()
         self.classes = {
             0: "minor_damage",
             1: "moderate_damage",
@@ -22,38 +43,126 @@ class YoloVisionService:
             3: "front_bumper",
         }
 
-        # Load the best weights if they exist (produced by train_yolo.py)
-        # Fall back to base yolov8n.pt if not available
-        if HAS_YOLO:
-            try:
-                # __file__ is in backend/app/services
-                # We need to go up to backend/
-                base_dir = os.path.dirname(
-                    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                )
-                best_weights_path = os.path.join(
-                    base_dir,
-                    "scripts",
-                    "runs",
-                    "damage_assessment",
-                    "weights",
-                    "best.pt",
+    @property
+    def model(self):
+        """The YOLO model, loaded on first use; None if it is unavailable."""
+        if not self._model_loaded:
+            self.load()
+        return self._model
+
+    @model.setter
+    def model(self, value):
+        self._model = value
+        self._model_loaded = True
+
+    def available(self) -> bool:
+        """
+        Whether a model can be used, without loading it. Processes that only
+        hand inference to a pool (and code on the event loop) check this
+        instead of ``model``, which would load the weights in place.
+        """
+        if self._model_loaded:
+            return self._model is not None
+        if settings.VISION_BACKEND == "onnx" and self._onnx_available():
+            return True
+        return HAS_YOLO
+
+    def load(self):
+        """
+        Load the weights if that has not happened yet and return the model.
+        Processes that never run inference (e.g. the API) never pay for it;
+        workers call this up front through ``preload_models``.
+        """
+        with self._load_lock:
+            if self._model_loaded:
+                return self._model
+            # Do not retry a failed load on every call
+            self._model_loaded = True
+
+            if settings.VISION_BACKEND == "onnx":
+                self._model = self._load_onnx()
+                if self._model is not None:
+                    return self._model
+                logger.warning(
+                    "ONNX damage detector unavailable, falling back to PyTorch"
                 )
 
-                if os.path.exists(best_weights_path):
-                    logger.info(
-                        f"Loading fine-tuned YOLO model from {best_weights_path}"
-                    )
-                    self.model = YOLO(best_weights_path)
-                else:
-                    logger.info("Fine-tuned weights not found, using base yolov8n.pt")
-                    self.model = YOLO("yolov8n.pt")
+            # Load the best weights if they exist (produced by train_yolo.py)
+            # Fall back to base yolov8n.pt if not available
+            if HAS_YOLO:
+                try:
+                    from ultralytics import YOLO
+
+                    best_weights_path = os.path.join(WEIGHTS_DIR, "best.pt")
+
+                    if os.path.exists(best_weights_path):
+                        logger.info(
+                            f"Loading fine-tuned YOLO model from {best_weights_path}"
+                        )
+                        self._model = YOLO(best_weights_path)
+                    else:
+                        logger.info(
+                            "Fine-tuned weights not found, using base yolov8n.pt"
+                        )
+                        self._model = YOLO("yolov8n.pt")
+                except Exception as e:
+                    logger.error(f"Failed to load YOLO model: {e}")
+            return self._model
+
+    def _load_onnx(self):
+        """The exported ONNX model, preferring the INT8 one; None if unusable."""
+        try:
+            from app.services.onnx_detector import HAS_ONNXRUNTIME, OnnxYoloDetector
+        except ImportError:
+            return None
+        if not HAS_ONNXRUNTIME:
+            return None
+
+        for model_path in self._onnx_model_paths():
+            try:
+                return OnnxYoloDetector.from_path(
+                    model_path,
+                    intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                    execution_provider=settings.ONNX_EXECUTION_PROVIDER,
+                )
             except Exception as e:
-                logger.error(f"Failed to load YOLO model: {e}")
+                logger.error(f"Failed to load ONNX model {model_path}: {e}")
+        return None
+
+    def _onnx_model_paths(self) -> List[str]:
+        """Existing ONNX model files, in order of preference."""
+        candidates = (
+            [settings.ONNX_MODEL_PATH]
+            if settings.ONNX_MODEL_PATH
+            else [
+                os.path.join(WEIGHTS_DIR, "best.int8.onnx"),
+                os.path.join(WEIGHTS_DIR, "best.onnx"),
+            ]
+        )
+        return [path for path in candidates if os.path.exists(path)]
+
+    def _onnx_available(self) -> bool:
+        return (
+            importlib.util.find_spec("onnxruntime") is not None
+            and importlib.util.find_spec("cv2") is not None
+            and bool(self._onnx_model_paths())
+        )
+
+    def __reduce__(self):
+        # Pickle as a reference to the process-local singleton so bound methods
+        # can be sent to a process pool without shipping the model weights.
+        return (_get_yolo_vision_service, ())
 
-    def detect_damage(self, photo_urls: List[str]) -> Dict[str, Any]:
+    def detect_damage(
+        self, photo_urls: List[str], max_batch_size: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Run the YOLO model on a list of images to detect damage and parts.
+
+        All images are decoded up front and fed to the model in batches of at
+        most ``max_batch_size`` (defaults to ``settings.YOLO_MAX_BATCH_SIZE``),
+        so a claim pays for one preprocessing/forward pass per batch instead of
+        one per photo.
         """
         if not self.model:
             return {
@@ -62,58 +171,81 @@ class YoloVisionService:
                 "detections": [],
             }
 
-        all_detections = []
-        highest_severity_detected = "minor"
-        severity_levels = {"minor": 1, "moderate": 2, "major": 3, "total_loss": 4}
+        per_image_detections = self.predict_batch(photo_urls, max_batch_size)
+        return self.summarize_detections(per_image_detections)
 
-        damaged_parts = set()
+    def predict_batch(
+        self, photo_urls: List[str], max_batch_size: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run batched inference and return the raw detections for each image,
+        in the same order as ``photo_urls``. Missing or undecodable images
+        yield an empty detection list.
+        """
+        if not self.model:
+            raise RuntimeError("YOLO model not loaded")
+        batch_size = max(1, max_batch_size or settings.YOLO_MAX_BATCH_SIZE)
+        per_image: List[List[Dict[str, Any]]] = [[] for _ in photo_urls]
 
-        for url in photo_urls:
-            local_path = url.lstrip("/")
-            if not os.path.exists(local_path):
-                continue
+        decoded = []
+        for index, url in enumerate(photo_urls):
+            image = self._decode_image(url)
+            if image is not None:
+                decoded.append((index, url, image))
 
+        for start in range(0, len(decoded), batch_size):
+            chunk = decoded[start : start + batch_size]
             try:
-                results = self.model(local_path)
-
-                for r in results:
-                    boxes = r.boxes
-                    for box in boxes:
-                        cls_id = int(box.cls[0].item())
-                        conf = float(box.conf[0].item())
-
-                        # Map custom dataset class ID if possible, otherwise use model's names
-                        class_name = self.classes.get(cls_id)
-                        if not class_name and hasattr(self.model, "names"):
-                            class_name = self.model.names.get(cls_id, f"class_{cls_id}")
-
-                        # Extremely basic heuristic mapping for the mock model
-                        if "minor" in class_name:
-                            severity = "minor"
-                        elif "moderate" in class_name:
-                            severity = "moderate"
-                        elif "major" in class_name:
-                            severity = "major"
-                        else:
-                            # Might be a part like "front_bumper"
-                            damaged_parts.add(class_name)
-                            severity = "minor"
-
-                        if (
-                            severity_levels[severity]
-                            > severity_levels[highest_severity_detected]
-                        ):
-                            highest_severity_detected = severity
-
-                        all_detections.append(
-                            {
-                                "class": class_name,
-                                "confidence": round(conf, 2),
-                                "box": box.xyxy[0].tolist(),
-                            }
-                        )
+                results = self.model([image for _, _, image in chunk])
             except Exception as e:
-                logger.error(f"Error during YOLO inference on {local_path}: {e}")
+                # A single bad image must not cost the whole claim its detections,
+                # so retry the chunk one image at a time.
+                logger.error(f"Batched YOLO inference failed, retrying per image: {e}")
+                results = []
+                for _, url, image in chunk:
+                    try:
+                        results.extend(self.model(image))
+                    except Exception as inner:
+                        logger.error(f"Error during YOLO inference on {url}: {inner}")
+                        results.append(None)
+
+            for (index, _, _), result in zip(chunk, results, strict=False):
+                if result is not None:
+                    per_image[index] = self._extract_detections(result)
+
+        return per_image
+
+    def summarize_detections(
+        self, per_image_detections: List[List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """Aggregate per-image detections into the claim-level result dict."""
+        all_detections = []
+        highest_severity_detected = "minor"
+        damaged_parts = set()
+
+        for detections in per_image_detections:
+            for detection in detections:
+                class_name = detection["class"]
+
+                # Extremely basic heuristic mapping for the mock model
+                if "minor" in class_name:
+                    severity = "minor"
+                elif "moderate" in class_name:
+                    severity = "moderate"
+                elif "major" in class_name:
+                    severity = "major"
+                else:
+                    # Might be a part like "front_bumper"
+                    damaged_parts.add(class_name)
+                    severity = "minor"
+
+                if (
+                    SEVERITY_LEVELS[severity]
+                    > SEVERITY_LEVELS[highest_severity_detected]
+                ):
+                    highest_severity_detected = severity
+
+                all_detections.append(detection)
 
         return {
             "status": "success",
@@ -122,5 +254,49 @@ class YoloVisionService:
             "detections": all_detections,
         }
 
+    def _decode_image(self, url: str):
+        # Prefer the 640px variant generated at upload time when available
+        for key in (inference_image_path(url), url):
+            try:
+                data = storage_service.read_bytes_sync(key)
+                break
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                # Storage errors (S3, timeouts) cost this image, not the claim
+                logger.error(f"Could not read image at {key}: {e}")
+                continue
+        else:
+            return None
+
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            logger.error(f"Could not decode image at {key}")
+        return image
+
+    def _extract_detections(self, result) -> List[Dict[str, Any]]:
+        detections = []
+        for box in result.boxes:
+            cls_id = int(box.cls[0].item())
+            conf = float(box.conf[0].item())
+
+            # Map custom dataset class ID if possible, otherwise use model's names
+            class_name = self.classes.get(cls_id)
+            if not class_name and hasattr(self.model, "names"):
+                class_name = self.model.names.get(cls_id, f"class_{cls_id}")
+
+            detections.append(
+                {
+                    "class": class_name,
+                    "confidence": round(conf, 2),
+                    "box": box.xyxy[0].tolist(),
+                }
+            )
+        return detections
+
+
+def _get_yolo_vision_service() -> YoloVisionService:
+    return yolo_vision_service
+
 
 yolo_vision_service = YoloVisionService()
@@ -1,21 +1,93 @@
 import asyncio
 import logging
+from dataclasses import asdict
+from datetime import datetime
 
 from sqlalchemy import update
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
 from app.core.celery_app import celery_app
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.executors import run_cpu_bound
+from app.core.metrics import metrics
+from app.core.worker_loop import worker_loop
 from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
 from app.services.adjudication_service import adjudication_service
 from app.services.ai_service import ai_service
 from app.services.email import email_service
+from app.services.feature_store import feature_store
+from app.services.fraud_rescoring import rescore_claims
+from app.services.fraud_service import (
+    fraud_detection_service,
+    reporting_delay_days,
+)
+from app.services.image_processing import (
+    prepare_inference_image,
+    prepare_llm_image,
+    prepare_thumbnail,
+)
+from app.services.payout_runs import run_payouts
+from app.services.photo_index import (
+    fill_missing_phashes,
+    find_cross_claim_duplicates,
+    phash_columns,
+)
+from app.services.policy_store import policy_store
+from app.services.storage import storage_service
+from app.services.triage_service import triage_service
+from app.services.vision_batcher import vision_batcher
 
 logger = logging.getLogger(__name__)
 
 
+async def _claim_history_count(policy_number: str, vehicle_vin: str | None) -> int:
+    async with AsyncSessionLocal() as db:
+        # Fresh: the claim may have been created by another process moments ago
+        history = await feature_store.get_features(
+            db, policy_number, vehicle_vin, fresh=True
+        )
+    # Other claims on the same policy; the count includes this claim
+    return max(history["policy"]["claim_count"] - 1, 0)
+
+
+async def _duplicate_photos(claim_id, photos) -> list:
+    async with AsyncSessionLocal() as db:
+        # Photos uploaded before hashing moved to the upload path, or whose
+        # hash failed there, are hashed now rather than skipped
+        await fill_missing_phashes(db, photos)
+        return await find_cross_claim_duplicates(db, claim_id, photos)
+
+
+def _notification_email(claim: Claim, status: str) -> dict | None:
+    if status == "Approved":
+        return {
+            "to": claim.claimant_email,
+            "subject": "Claim Approved",
+            "body": f"Your claim {claim.claim_number} has been automatically approved for ${claim.approved_amount}!",
+        }
+    if status == "Manual Review":
+        return {
+            "to": claim.claimant_email,
+            "subject": "Claim Under Review",
+            "body": f"Your claim {claim.claim_number} is currently under manual review.",
+        }
+    return None
+
+
 async def process_claim_analysis_async(claim_id: str):
+    """
+    Analyze and auto-adjudicate a claim as a staged pipeline.
+
+    Database sessions are only held for the short read at the start, the
+    concurrent lookups (duplicate photos, claim history) and the final
+    write, never across the YOLO/Claude stages, so a worker's concurrency is
+    not capped by the connection pool. The claim history and policy are
+    fetched while vision and the LLM run, and the notification email is
+    queued as its own task once the decision is committed.
+    """
+    # Stage 1: load the claim
     async with AsyncSessionLocal() as db:
         stmt = (
             select(Claim)
@@ -23,102 +95,218 @@ async def process_claim_analysis_async(claim_id: str):
             .options(selectinload(Claim.photos))
         )
         result = await db.execute(stmt)
-        claim_with_photos = result.scalars().first()
-
-        if not claim_with_photos or not claim_with_photos.photos:
-            logger.error(f"Claim {claim_id} not found or has no photos")
-            return
+        claim = result.scalars().first()
 
-        photo_urls = [photo.photo_url for photo in claim_with_photos.photos]
-
-        # Call AI service
-        analysis = await ai_service.assess_damage(
-            photo_urls=photo_urls,
-            vehicle_info={
-                "make": claim_with_photos.vehicle_make,
-                "model": claim_with_photos.vehicle_model,
-                "year": claim_with_photos.vehicle_year,
-            },
-            incident_info={
-                "description": claim_with_photos.incident_description,
-                "date": str(claim_with_photos.incident_date)
-                if claim_with_photos.incident_date
-                else "",
-            },
-        )
+    if not claim or not claim.photos:
+        logger.error(f"Claim {claim_id} not found or has no photos")
+        return
 
-        claim_with_photos.estimated_damage_cost = analysis.get("estimated_cost")
+    photo_urls = [photo.photo_url for photo in claim.photos]
 
-        # Store AI analysis in photos efficiently
-        # synchronize_session="auto" is used by default, which keeps in-memory objects updated
-        stmt_update = (
-            update(ClaimPhoto)
-            .where(ClaimPhoto.claim_id == claim_id)
-            .values(ai_analysis=analysis)
+    # Stage 2: lookups that do not depend on the analysis run alongside it
+    history_task = asyncio.create_task(
+        _claim_history_count(claim.policy_number, claim.vehicle_vin)
+    )
+    policy_task = asyncio.create_task(policy_store.get(claim.policy_number))
+    try:
+        vision_result, duplicate_photos = await asyncio.gather(
+            vision_batcher.detect_damage(photo_urls),
+            _duplicate_photos(claim.id, claim.photos),
         )
-        await db.execute(stmt_update)
-
-        # Mock Policy
-        mock_policy = {
-            "status": "Active",
-            "coverage_limit": 50000.0,
-            "deductible": 500.0,
-        }
+        if duplicate_photos:
+            logger.warning(
+                f"Claim {claim_id} reuses {len(duplicate_photos)} photo(s) from other claims"
+            )
+        policy = await policy_task
 
-        mock_fraud_score = 0
-        if (
-            claim_with_photos.estimated_damage_cost
-            and float(claim_with_photos.estimated_damage_cost) > 10000
-        ):
-            mock_fraud_score += 15
+        # Stage 3: triage, then the LLM only if the outcome can still change
+        triage = (
+            triage_service.evaluate(policy, vision_result, duplicate_photos)
+            if settings.TRIAGE_ENABLED
+            else None
+        )
+        if triage:
+            logger.info(f"Claim {claim_id} triaged to {triage['status']}, skipping LLM")
+            metrics.increment("triage.llm_skipped")
+            analysis = {
+                "llm_skipped": True,
+                "triage_rule": triage["rule"],
+                "vision": {
+                    "highest_severity": vision_result.get("highest_severity"),
+                    "damaged_parts": vision_result.get("damaged_parts", []),
+                },
+            }
+        else:
+            analysis = await ai_service.assess_damage(
+                photo_urls=photo_urls,
+                vehicle_info={
+                    "make": claim.vehicle_make,
+                    "model": claim.vehicle_model,
+                    "year": claim.vehicle_year,
+                },
+                incident_info={
+                    "description": claim.incident_description,
+                    "date": str(claim.incident_date) if claim.incident_date else "",
+                },
+                vision_result=vision_result,
+                photo_hashes=[photo.sha256 for photo in claim.photos],
+            )
+        claim_history_count = await history_task
+    finally:
+        for task in (history_task, policy_task):
+            task.cancel()
 
-        # Trigger Auto-Adjudication
-        claim_dict = {"estimated_damage_cost": claim_with_photos.estimated_damage_cost}
+    # Stage 4: fraud scoring and adjudication (no I/O)
+    if triage:
+        # Outcome was already fixed before the LLM; see llm_triage_skip. There
+        # is no cost estimate to score, so no fraud score is recorded either
+        adjudication_result = triage
+        fraud_result = {"risk_score": None, "method": "not_computed"}
+    else:
+        estimated_cost = analysis.get("estimated_cost")
+        fraud_result = await run_cpu_bound(
+            fraud_detection_service.analyze_fraud_risk,
+            float(estimated_cost or 0),
+            reporting_delay_days(claim.created_at, claim.incident_date),
+            claim_history_count,
+        )
+        fraud_result = fraud_detection_service.apply_duplicate_photo_risk(
+            fraud_result, duplicate_photos
+        )
         adjudication_result = adjudication_service.evaluate_claim(
-            claim=claim_dict,
-            policy=mock_policy,
+            claim={"estimated_damage_cost": estimated_cost},
+            policy=policy,
             ai_analysis=analysis,
-            fraud_score=mock_fraud_score,
+            fraud_score=fraud_result["risk_score"],
         )
+    fraud_score = fraud_result["risk_score"]
+    new_status = adjudication_result["status"]
+
+    # Stage 5: write everything back in one short transaction
+    async with AsyncSessionLocal() as db:
+        claim = await db.get(Claim, claim.id)
+        if claim is None:
+            logger.error(f"Claim {claim_id} was deleted during analysis")
+            return
 
-        new_status = adjudication_result["status"]
-        claim_with_photos.status = new_status
+        if not triage:
+            claim.estimated_damage_cost = estimated_cost
+            claim.fraud_score = fraud_score
+            claim.fraud_scored_at = datetime.utcnow()
+            if new_status == "Approved":
+                claim.approved_amount = estimated_cost
+        claim.status = new_status
 
-        if new_status == "Approved":
-            claim_with_photos.approved_amount = claim_with_photos.estimated_damage_cost
-            email_body = f"Your claim {claim_with_photos.claim_number} has been automatically approved for ${claim_with_photos.approved_amount}!"
-            await email_service.send_email(
-                to=claim_with_photos.claimant_email,
-                subject="Claim Approved",
-                body=email_body,
-            )
-        elif new_status == "Manual Review":
-            email_body = f"Your claim {claim_with_photos.claim_number} is currently under manual review."
-            await email_service.send_email(
-                to=claim_with_photos.claimant_email,
-                subject="Claim Under Review",
-                body=email_body,
+        # Store AI analysis in photos efficiently
+        await db.execute(
+            update(ClaimPhoto)
+            .where(ClaimPhoto.claim_id == claim.id)
+            .values(ai_analysis=analysis)
+        )
+
+        if triage:
+            db.add(
+                ClaimAuditLog(
+                    claim_id=claim.id,
+                    action="llm_triage_skip",
+                    performed_by="system",
+                    details=triage,
+                )
             )
 
         # Append SOC2 Audit Log for auto-adjudication decision
-        audit_log = ClaimAuditLog(
-            claim_id=claim_with_photos.id,
-            action="auto_adjudication",
-            performed_by="system",
-            details={
-                "result_status": new_status,
-                "reason": adjudication_result.get("reason", ""),
-                "fraud_score": mock_fraud_score,
-                "ml_method": "none"
-            }
+        db.add(
+            ClaimAuditLog(
+                claim_id=claim.id,
+                action="auto_adjudication",
+                performed_by="system",
+                details={
+                    "result_status": new_status,
+                    "reason": adjudication_result.get("reason", ""),
+                    "fraud_score": fraud_score,
+                    "ml_method": fraud_result.get("method", "none"),
+                    "claim_history_count": claim_history_count,
+                    "duplicate_photos": duplicate_photos,
+                    "llm_skipped": bool(triage),
+                },
+            )
         )
-        db.add(audit_log)
 
         await db.commit()
+        email = _notification_email(claim, new_status)
+
+    # Stage 6: notify outside the analysis task
+    if email and email["to"]:
+        try:
+            email_task.delay(**email)
+        except Exception as e:
+            logger.error(f"Failed to queue notification email for claim {claim_id}: {e}")
 
 
 @celery_app.task(name="app.tasks.ai_analysis_task")
 def analyze_claim_task(claim_id: str):
     """Background task to analyze a claim using AI and auto-adjudicate."""
-    asyncio.run(process_claim_analysis_async(claim_id))
+    worker_loop.run(process_claim_analysis_async(claim_id))
     return {"status": "Analysis completed", "claim_id": claim_id}
+
+
+@celery_app.task(name="app.tasks.email_task")
+def email_task(to: str, subject: str, body: str):
+    """Background task sending a claimant notification email."""
+    worker_loop.run(email_service.send_email(to=to, subject=subject, body=body))
+    return {"status": "Email sent", "to": to}
+
+
+async def generate_photo_variants_async(photo_id: str):
+    """
+    Derive the inference, LLM and thumbnail variants of an uploaded photo and
+    its perceptual hash, reading the original from storage once.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(ClaimPhoto).where(ClaimPhoto.id == photo_id))
+        photo = result.scalars().first()
+        if not photo:
+            logger.error(f"Claim photo {photo_id} not found")
+            return
+
+        original_path = photo.photo_url
+        try:
+            data = await storage_service.read_bytes(original_path)
+        except FileNotFoundError:
+            logger.error(f"Original image {original_path} missing from storage")
+            return
+
+        if photo.phash is None:
+            for column, value in (await phash_columns(data)).items():
+                setattr(photo, column, value)
+
+        photo.inference_url = await prepare_inference_image(original_path, data)
+        photo.llm_url = await prepare_llm_image(original_path, data)
+        photo.thumbnail_url = await prepare_thumbnail(original_path, data)
+
+        await db.commit()
+
+
+@celery_app.task(name="app.tasks.photo_variants_task")
+def generate_photo_variants_task(photo_id: str):
+    """Background task to generate derived image variants after upload."""
+    worker_loop.run(generate_photo_variants_async(photo_id))
+    return {"status": "Variants generated", "photo_id": photo_id}
+
+
+@celery_app.task(name="app.tasks.fraud_rescore_task")
+def fraud_rescore_task(include_closed: bool = False):
+    """Scheduled task re-scoring existing claims with the current fraud model."""
+    report = worker_loop.run(rescore_claims(include_closed=include_closed))
+    return {
+        "status": "Re-scoring completed",
+        "claims_scored": report.claims_scored,
+        "claims_per_second": round(report.claims_per_second, 1),
+    }
+
+
+@celery_app.task(name="app.tasks.payout_run_task")
+def payout_run_task():
+    """Bulk payout of every approved claim, on demand or at end of day."""
+    report = worker_loop.run(run_payouts())
+    return {"status": "Payout run completed", **asdict(report)}
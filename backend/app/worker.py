@@ -0,0 +1,280 @@
+"""
+Async-native claim analysis worker.
+
+An alternative to the Celery prefork pool for the analysis pipeline. It consumes
+the same Redis queue the API publishes to (``main-queue``), decodes the Celery
+task messages and runs many claims concurrently on a single event loop, while
+the CPU-bound stages (YOLO inference, fraud scoring) are offloaded to a bounded
+process pool.
+
+Each worker process is a consumer with its own in-flight list and a heartbeat
+key. Messages are moved to the in-flight list while they run; when a
+consumer's heartbeat expires (it crashed or was killed), any live consumer
+moves its in-flight messages back to the queue. A message redelivered more
+than ``ASYNC_WORKER_MAX_REDELIVERIES`` times goes to the unhandled list.
+
+Usage:
+    python -m app.worker
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.executors import set_cpu_executor
+from app.core.llm_limiter import llm_limiter
+from app.core.log_config import setup_logging
+from app.core.metrics import publish_periodically
+from app.services.email import email_service
+from app.services.fraud_rescoring import rescore_claims
+from app.services.model_preload import preload_models
+from app.services.payout_runs import run_payouts
+from app.services.vision_batcher import vision_batcher
+from app.tasks import generate_photo_variants_async, process_claim_analysis_async
+
+logger = logging.getLogger(__name__)
+
+# Celery task name -> coroutine function handling its positional/keyword args
+TASK_HANDLERS: Dict[str, Callable[..., Awaitable[Any]]] = {
+    "app.tasks.ai_analysis_task": process_claim_analysis_async,
+    "app.tasks.email_task": email_service.send_email,
+    "app.tasks.photo_variants_task": generate_photo_variants_async,
+    "app.tasks.fraud_rescore_task": rescore_claims,
+    "app.tasks.payout_run_task": run_payouts,
+}
+
+
+def decode_celery_message(raw: bytes | str) -> tuple[str, str, list, dict]:
+    """
+    Decode a Celery protocol v2 message as stored by kombu's Redis transport.
+
+    Returns ``(task_name, task_id, args, kwargs)``.
+    """
+    envelope = json.loads(raw)
+    headers = envelope.get("headers") or {}
+    body = envelope["body"]
+    if (envelope.get("properties") or {}).get("body_encoding") == "base64":
+        body = base64.b64decode(body)
+    args, kwargs, _embed = json.loads(body)
+    return headers.get("task", ""), headers.get("id", ""), args, kwargs
+
+
+def message_id(raw: bytes | str) -> str:
+    """The Celery task id of a message, or a digest for undecodable ones."""
+    try:
+        task_id = (json.loads(raw).get("headers") or {}).get("id")
+    except Exception:
+        task_id = None
+    if task_id:
+        return task_id
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+class AsyncClaimWorker:
+    def __init__(
+        self,
+        queue: str = "main-queue",
+        claim_concurrency: Optional[int] = None,
+        cpu_processes: Optional[int] = None,
+        llm_concurrency: Optional[int] = None,
+    ):
+        self.queue = queue
+        # Unique per process, so consumers on one host never share a list
+        self.consumer_id = (
+            f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        )
+        self.inflight_key = self._inflight_key(self.consumer_id)
+        self.heartbeat_key = f"{queue}:consumer:{self.consumer_id}"
+        self.unhandled_key = f"{queue}:unhandled"
+        self.redeliveries_key = f"{queue}:redeliveries"
+        self.heartbeat_interval = settings.ASYNC_WORKER_HEARTBEAT_SECONDS
+        self.max_redeliveries = settings.ASYNC_WORKER_MAX_REDELIVERIES
+        self.claim_concurrency = (
+            claim_concurrency or settings.ASYNC_WORKER_CLAIM_CONCURRENCY
+        )
+        self.cpu_processes = cpu_processes or settings.ASYNC_WORKER_CPU_PROCESSES
+        self.llm_concurrency = llm_concurrency or settings.ASYNC_WORKER_LLM_CONCURRENCY
+        self._stopping = asyncio.Event()
+        self._tasks: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _inflight_key(self, consumer_id: str) -> str:
+        return f"{self.queue}:inflight:{consumer_id}"
+
+    async def run(self) -> None:
+        client = redis.from_url(settings.REDIS_URL)
+        # Spawn instead of fork: the parent already runs an event loop and holds
+        # sockets that must not be duplicated into the pool processes.
+        executor = ProcessPoolExecutor(
+            max_workers=self.cpu_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            # Spawned processes share nothing with the parent, so each loads
+            # the models as it starts rather than on its first claim
+            initializer=preload_models if settings.PRELOAD_MODELS else None,
+        )
+        set_cpu_executor(executor)
+        llm_limiter.configure(max_limit=self.llm_concurrency)
+        slots = asyncio.Semaphore(self.claim_concurrency)
+
+        logger.info(
+            f"Async worker consuming '{self.queue}' with {self.claim_concurrency} "
+            f"claim slots, {self.cpu_processes} CPU processes and "
+            f"up to {self.llm_concurrency} adaptive LLM slots"
+        )
+
+        await self._heartbeat(client)
+        heartbeat = asyncio.create_task(self._heartbeat_loop(client))
+        publisher = asyncio.create_task(publish_periodically("async-worker"))
+        try:
+            await self._recover_orphans(client)
+            while not self._stopping.is_set():
+                # Only pull a message once there is capacity to run it, so
+                # backlog stays in Redis where other workers can take it.
+                await slots.acquire()
+                raw = await client.blmove(
+                    self.queue, self.inflight_key, 1, src="RIGHT", dest="LEFT"
+                )
+                if raw is None:
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._handle(client, raw))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+
+            if self._tasks:
+                logger.info(f"Waiting for {len(self._tasks)} in-flight claims")
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            heartbeat.cancel()
+            publisher.cancel()
+            await client.delete(self.heartbeat_key)
+            set_cpu_executor(None)
+            executor.shutdown(wait=True)
+            await vision_batcher.close()
+            await client.close()
+            await engine.dispose()
+
+    async def _heartbeat(self, client) -> None:
+        await client.set(self.heartbeat_key, 1, ex=self.heartbeat_interval * 3)
+
+    async def _heartbeat_loop(self, client) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat(client)
+                await self._recover_orphans(client)
+            except Exception as e:
+                logger.warning(f"Heartbeat failed: {e}")
+
+    async def _recover_orphans(self, client) -> None:
+        """Requeue the in-flight messages of consumers that are no longer alive."""
+        prefix = self._inflight_key("")
+        async for key in client.scan_iter(match=prefix + "*"):
+            key = key.decode() if isinstance(key, bytes) else key
+            # A list being recovered belongs to the consumer recovering it
+            owner = key[len(prefix) :].rsplit(":recovering:", 1)[-1]
+            if key == self.inflight_key:
+                continue
+            if owner == self.consumer_id:
+                # Left over from an interrupted recovery of our own
+                await self._requeue(client, key, owner)
+                continue
+            if await client.exists(f"{self.queue}:consumer:{owner}"):
+                continue
+            # Take the list over first, so two consumers never recover it twice
+            recovering_key = f"{key}:recovering:{self.consumer_id}"
+            try:
+                await client.rename(key, recovering_key)
+            except redis.ResponseError:
+                continue  # Another consumer got there first
+            await self._requeue(client, recovering_key, owner)
+
+    async def _requeue(self, client, key: str, owner: str) -> None:
+        requeued = dead = 0
+        while (raw := await client.lindex(key, -1)) is not None:
+            redeliveries = await client.hincrby(
+                self.redeliveries_key, message_id(raw), 1
+            )
+            if redeliveries > self.max_redeliveries:
+                await client.lmove(key, self.unhandled_key, src="RIGHT", dest="LEFT")
+                await client.hdel(self.redeliveries_key, message_id(raw))
+                dead += 1
+            else:
+                await client.lmove(key, self.queue, src="RIGHT", dest="RIGHT")
+                requeued += 1
+        if requeued or dead:
+            logger.warning(
+                f"Recovered messages of dead consumer {owner}: {requeued} requeued, "
+                f"{dead} moved to {self.unhandled_key} after "
+                f"{self.max_redeliveries} redeliveries"
+            )
+
+    async def _handle(self, client, raw: bytes) -> None:
+        try:
+            task_name, task_id, args, kwargs = decode_celery_message(raw)
+        except Exception as e:
+            logger.error(f"Discarding undecodable message: {e}")
+            await client.lpush(self.unhandled_key, raw)
+            await client.lrem(self.inflight_key, 1, raw)
+            return
+
+        handler = TASK_HANDLERS.get(task_name)
+        if handler is None:
+            logger.error(f"No async handler for task {task_name} ({task_id})")
+            await client.lpush(self.unhandled_key, raw)
+        else:
+            try:
+                await handler(*args, **kwargs)
+                logger.info(f"Task {task_name} ({task_id}) succeeded")
+            except Exception as e:
+                logger.exception(f"Task {task_name} ({task_id}) failed: {e}")
+        await client.lrem(self.inflight_key, 1, raw)
+        await client.hdel(self.redeliveries_key, message_id(raw))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queue", default="main-queue")
+    parser.add_argument("--claim-concurrency", type=int)
+    parser.add_argument("--cpu-processes", type=int)
+    parser.add_argument("--llm-concurrency", type=int)
+    options = parser.parse_args()
+
+    setup_logging()
+    worker = AsyncClaimWorker(
+        queue=options.queue,
+        claim_concurrency=options.claim_concurrency,
+        cpu_processes=options.cpu_processes,
+        llm_concurrency=options.llm_concurrency,
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
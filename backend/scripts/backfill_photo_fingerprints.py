@@ -0,0 +1,31 @@
+"""Compute the SHA-256 and perceptual hash of stored claim photos missing either"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.database import AsyncSessionLocal, engine
+from app.services.photo_index import backfill_fingerprints
+
+
+async def backfill(batch_size):
+    """Fingerprint photos uploaded before hashing, so duplicate checks see them"""
+    try:
+        async with AsyncSessionLocal() as db:
+            updated = await backfill_fingerprints(db, batch_size=batch_size)
+    finally:
+        await engine.dispose()
+    print(f"✅ Fingerprinted {updated} claim photos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="photos per keyset page"
+    )
+    options = parser.parse_args()
+    asyncio.run(backfill(options.batch_size))
@@ -0,0 +1,60 @@
+"""Re-analyze claims in bulk through the Anthropic Message Batches API"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.database import engine
+from app.services.batch_analysis import (
+    MessageBatchClient,
+    apply_batch_results,
+    reanalyze_claims,
+)
+
+
+async def reanalyze(options):
+    """Submit (or resume) a batch re-analysis and print the outcome"""
+    try:
+        if options.resume:
+            client = MessageBatchClient()
+            try:
+                report = await apply_batch_results(client, options.resume)
+            finally:
+                await client.aclose()
+        else:
+            report = await reanalyze_claims(
+                claim_ids=options.claim_ids,
+                only_missing=options.only_missing,
+                batch_size=options.batch_size,
+            )
+    finally:
+        await engine.dispose()
+
+    print(f"✅ Updated {report.succeeded} claims ({report.failed} failed)")
+    print(f"   Batches: {', '.join(report.batch_ids) or 'none'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--only-missing",
+        action="store_true",
+        help="only claims with photos that have no AI analysis yet",
+    )
+    parser.add_argument(
+        "--claim-id",
+        dest="claim_ids",
+        type=uuid.UUID,
+        action="append",
+        help="limit to these claims",
+    )
+    parser.add_argument("--batch-size", type=int, help="claims per message batch")
+    parser.add_argument(
+        "--resume", metavar="BATCH_ID", help="apply the results of a submitted batch"
+    )
+    asyncio.run(reanalyze(parser.parse_args()))
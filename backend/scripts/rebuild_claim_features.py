@@ -0,0 +1,25 @@
+"""Rebuild the per-policy and per-VIN claim history features from the claims table"""
+
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.database import AsyncSessionLocal, engine
+from app.services.feature_store import rebuild_claim_history_features
+
+
+async def rebuild():
+    """Recompute every feature row; run while no claims are being written"""
+    try:
+        async with AsyncSessionLocal() as db:
+            written = await rebuild_claim_history_features(db)
+    finally:
+        await engine.dispose()
+    print(f"✅ Rebuilt {written} claim history feature rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(rebuild())
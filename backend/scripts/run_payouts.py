@@ -0,0 +1,39 @@
+"""Pay out every approved, unpaid claim and print the run report"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.database import engine
+from app.services.payout_runs import run_payouts
+
+
+async def pay(batch_size, concurrency):
+    """Run one payout pass over the approved claims"""
+    try:
+        report = await run_payouts(batch_size=batch_size, concurrency=concurrency)
+    finally:
+        await engine.dispose()
+
+    print(
+        f"✅ Paid {report.paid} claims (${report.amount_paid:,.2f}) in "
+        f"{report.batches} batches ({report.elapsed_seconds:.1f}s)"
+    )
+    if report.failures:
+        print(f"⚠️  {report.failed} payouts failed:")
+        for failure in report.failures:
+            print(f"   {failure['claim_id']}: {failure['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, help="claims locked per batch")
+    parser.add_argument(
+        "--concurrency", type=int, help="Stripe transfers in flight at once"
+    )
+    options = parser.parse_args()
+    asyncio.run(pay(options.batch_size, options.concurrency))
@@ -4,7 +4,7 @@ import random
 import secrets
 import string
 import sys
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
@@ -14,7 +14,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from app.core.config import settings
 from app.core.security import get_password_hash
 from app.models.claims import Claim, ClaimPhoto
+from app.models.policies import Policy
 from app.models.users import AdminUser
+from app.services.policy_store import policy_store
 
 # Generate some realistic-looking dummy data
 first_names = [
@@ -99,6 +101,30 @@ descriptions = [
     "Front bumper damaged from hitting a high curb.",
 ]
 
+# Fixed policies for manual testing of the policies API
+demo_policies = [
+    {
+        "policy_number": "POL-123456789",
+        "holder_name": "John Doe",
+        "status": "Active",
+        "vehicle_info": "2022 Tesla Model 3",
+        "coverage_limit": 50000.0,
+        "deductible": 500.0,
+        "effective_date": date(2024, 1, 1),
+        "expiration_date": date(2025, 1, 1),
+    },
+    {
+        "policy_number": "POL-987654321",
+        "holder_name": "Jane Smith",
+        "status": "Expired",
+        "vehicle_info": "2019 Honda Civic",
+        "coverage_limit": 30000.0,
+        "deductible": 1000.0,
+        "effective_date": date(2023, 1, 1),
+        "expiration_date": date(2024, 1, 1),
+    },
+]
+
 
 async def create_demo_data():
     """Seeds the database with 50 realistic test claims for Week 7."""
@@ -138,7 +164,18 @@ async def create_demo_data():
                 db.add(new_admin)
                 await db.commit()
 
-            # 2. Generate 50 claims
+            # 2. Ensure the demo policies exist
+            for policy in demo_policies:
+                result = await db.execute(
+                    select(Policy).where(
+                        Policy.policy_number == policy["policy_number"]
+                    )
+                )
+                if not result.scalars().first():
+                    # Through the store, so cached "not found" entries are dropped
+                    await policy_store.save(db, **policy)
+
+            # 3. Generate 50 claims, each on its own policy
             print("Generating 50 demo claims...")
             claims_created = 0
 
@@ -179,16 +216,35 @@ async def create_demo_data():
                     created_at = incident_date + timedelta(days=45)
                     status = "New"  # Force manual review due to delay
 
+                policy_number = f"POL-{random.randint(100000000, 999999999)}"
+                holder_name = (
+                    f"{random.choice(first_names)} {random.choice(last_names)}"
+                )
+                vehicle_vin = f"1HGCM82633A{random.randint(100000, 999999)}"
+                effective_date = (incident_date - timedelta(days=90)).date()
+                await policy_store.save(
+                    db,
+                    policy_number,
+                    holder_name=holder_name,
+                    status="Active",
+                    vehicle_vin=vehicle_vin,
+                    vehicle_info=f"{year} {make} {model}",
+                    coverage_limit=random.choice([25000.0, 50000.0, 100000.0]),
+                    deductible=random.choice([250.0, 500.0, 1000.0]),
+                    effective_date=effective_date,
+                    expiration_date=effective_date + timedelta(days=365),
+                )
+
                 claim = Claim(
-                    policy_number=f"POL-{random.randint(100000000, 999999999)}",
+                    policy_number=policy_number,
                     claim_number=f"CLM-{created_at.year}-{str(random.randint(1, 999999)).zfill(6)}",
-                    claimant_name=f"{random.choice(first_names)} {random.choice(last_names)}",
+                    claimant_name=holder_name,
                     claimant_phone=f"555-{random.randint(100, 999)}-{random.randint(1000, 9999)}",
                     claimant_email=f"claimant{i}@example.com",
                     incident_date=incident_date,
                     incident_location=random.choice(locations),
                     incident_description=random.choice(descriptions),
-                    vehicle_vin=f"1HGCM82633A{random.randint(100000, 999999)}",
+                    vehicle_vin=vehicle_vin,
                     vehicle_make=make,
                     vehicle_model=model,
                     vehicle_year=year,
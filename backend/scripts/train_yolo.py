@@ -1,3 +1,4 @@
+import argparse
 import os
 
 from ultralytics import YOLO
@@ -35,7 +36,53 @@ def train_model():
 
     print("Training complete!")
     print(f"Best model weights saved to: {results.save_dir}/weights/best.pt")
+    return os.path.join(results.save_dir, "weights", "best.pt")
+
+
+def export_onnx(weights_path, int8=False):
+    """
+    Export trained weights to ONNX for the onnxruntime vision backend
+    (VISION_BACKEND=onnx), optionally with an INT8-quantized copy.
+    """
+    if not os.path.exists(weights_path):
+        print(f"Error: Weights not found at {weights_path}")
+        print("Train the model first.")
+        return
+
+    # Dynamic axes let the service batch several photos per session.run()
+    onnx_path = YOLO(weights_path).export(format="onnx", dynamic=True, simplify=True)
+    print(f"ONNX model saved to: {onnx_path}")
+
+    if int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Weights are stored as INT8 and activations quantized on the fly, so
+        # no calibration dataset is needed
+        int8_path = onnx_path.replace(".onnx", ".int8.onnx")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+        print(f"INT8 model saved to: {int8_path}")
 
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="Train the YOLOv8 damage model")
+    parser.add_argument(
+        "--export",
+        action="store_true",
+        help="export the trained weights to ONNX after training",
+    )
+    parser.add_argument(
+        "--export-only",
+        action="store_true",
+        help="skip training and export the existing best.pt",
+    )
+    parser.add_argument(
+        "--int8", action="store_true", help="also write an INT8-quantized ONNX model"
+    )
+    options = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    weights = os.path.join(base_dir, "runs", "damage_assessment", "weights", "best.pt")
+    if not options.export_only:
+        weights = train_model()
+    if weights and (options.export or options.export_only):
+        export_onnx(weights, int8=options.int8)
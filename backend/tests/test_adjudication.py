@@ -45,6 +45,13 @@ class TestAdjudicationService(unittest.TestCase):
         self.assertEqual(result["status"], "Rejected")
         self.assertIn("Policy is not active.", result["reason"])
 
+    def test_review_unknown_policy(self):
+        result = AdjudicationService.evaluate_claim(
+            self.valid_claim, None, self.valid_ai_analysis, self.valid_fraud_score
+        )
+        self.assertEqual(result["status"], "Manual Review")
+        self.assertEqual(result["reason"], "Policy not found.")
+
     def test_review_high_cost(self):
         claim = self.valid_claim.copy()
         claim["estimated_damage_cost"] = 2500.0  # Above the $2000 limit
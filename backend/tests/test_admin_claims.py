@@ -0,0 +1,126 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.core.security import get_current_admin_user
+from app.main import app
+from app.models.claims import Claim
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_admin_user] = lambda: None
+    yield factory
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+async def create_claims(session_factory, count, statuses=("Approved", "Submitted")):
+    base = datetime(2024, 3, 1, 12)
+    claims = []
+    async with session_factory() as db:
+        for i in range(count):
+            claim = Claim(
+                id=uuid.uuid4(),
+                policy_number="POL-123456789",
+                claim_number=f"CLM-2024-{i:06d}",
+                claimant_name="John Doe",
+                claimant_email="john.doe@example.com",
+                claimant_phone="555-0123",
+                incident_date=base,
+                incident_location="New York, NY",
+                incident_description="Fender bender at intersection",
+                vehicle_make="Honda",
+                vehicle_model="Accord",
+                vehicle_year=2022,
+                status=statuses[i % len(statuses)],
+                # Pairs of claims share a timestamp, so ties are broken by id
+                created_at=base + timedelta(minutes=i // 2),
+                updated_at=base,
+            )
+            db.add(claim)
+            claims.append(claim)
+        await db.commit()
+    return claims
+
+
+def newest_first(claims):
+    return [
+        str(claim.id)
+        for claim in sorted(claims, key=lambda c: (c.created_at, c.id), reverse=True)
+    ]
+
+
+async def list_all(params):
+    ids, pages = [], 0
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        while True:
+            response = await client.get(
+                f"{settings.API_V1_STR}/admin/claims/", params=params
+            )
+            assert response.status_code == 200
+            page = response.json()
+            ids += [claim["id"] for claim in page["items"]]
+            pages += 1
+            if page["next_cursor"] is None:
+                return ids, pages
+            params = {**params, "cursor": page["next_cursor"]}
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_claim_once_newest_first(session_factory):
+    claims = await create_claims(session_factory, 7)
+
+    ids, pages = await list_all({"limit": 3})
+
+    assert ids == newest_first(claims)
+    assert pages == 3
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_with_status_filter(session_factory):
+    claims = await create_claims(session_factory, 10)
+    approved = [claim for claim in claims if claim.status == "Approved"]
+
+    ids, pages = await list_all({"limit": 2, "status": "Approved"})
+
+    assert ids == newest_first(approved)
+    assert pages == 3
+
+
+@pytest.mark.asyncio
+async def test_exact_last_page_has_no_next_cursor(session_factory):
+    await create_claims(session_factory, 4)
+
+    ids, pages = await list_all({"limit": 2})
+
+    assert len(ids) == 4
+    assert pages == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(session_factory):
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(
+            f"{settings.API_V1_STR}/admin/claims/", params={"cursor": "not-a-cursor"}
+        )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
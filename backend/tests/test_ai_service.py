@@ -1,6 +1,14 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
 import pytest
 
-from app.services.ai_service import ClaudeAIService, sanitize_input
+from app.core.metrics import metrics
+from app.services.ai_service import (
+    PROMPT_CACHE_MIN_TOKENS,
+    ClaudeAIService,
+    sanitize_input,
+)
 
 
 def test_sanitize_input():
@@ -50,7 +58,9 @@ def test_sanitize_input():
 
 @pytest.mark.asyncio
 async def test_assess_damage():
-    ai_service = ClaudeAIService()
+    # Without an API key the service returns mock data
+    with patch("app.services.ai_service.settings.ANTHROPIC_API_KEY", None):
+        ai_service = ClaudeAIService()
 
     analysis = await ai_service.assess_damage(
         photo_urls=["http://example.com/photo.jpg"],
@@ -62,3 +72,61 @@ async def test_assess_damage():
     assert "front_bumper" in analysis["damaged_parts"]
     assert analysis["estimated_cost"] == 2500.00
     assert analysis["confidence"] == 0.85
+
+
+def test_static_instructions_are_a_cacheable_prefix():
+    service = ClaudeAIService()
+    image = {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,AA=="}}
+
+    messages = service._build_messages(
+        [image, None],
+        {"make": "Toyota", "model": "Camry", "year": 2020},
+        {"description": "Rear-end collision", "date": "2024-03-01"},
+        {"status": "success", "detections": [{}], "highest_severity": "minor"},
+    )
+    other_claim = service._build_messages(
+        [image], {"make": "Honda"}, {"description": "Hail"}, {}
+    )
+
+    system, human = messages
+    assert system.content == other_claim[0].content
+    (block,) = system.content
+    assert block["cache_control"] == {"type": "ephemeral"}
+    assert "Be conservative" in block["text"]
+    # The API ignores breakpoints on shorter prefixes; every word is >= 1 token
+    assert len(block["text"].split()) >= PROMPT_CACHE_MIN_TOKENS
+    # Per-claim images and context follow the cached prefix
+    assert human.content[0] == image
+    assert "<make>Toyota</make>" in human.content[-1]["text"]
+    assert "Be conservative" not in human.content[-1]["text"]
+
+
+def test_prompt_cache_usage_is_recorded():
+    metrics.reset()
+    service = ClaudeAIService()
+    raw = {
+        "input_tokens": 120,
+        "output_tokens": 40,
+        "cache_read_input_tokens": 1500,
+        "cache_creation_input_tokens": 0,
+    }
+    # LangChain's normalized usage counts cached tokens in input_tokens
+    normalized = {
+        "input_tokens": 1630,
+        "output_tokens": 10,
+        "total_tokens": 1640,
+        "input_token_details": {"cache_creation": 1600},
+    }
+
+    # Raw API usage in response_metadata, as older langchain-anthropic reports it
+    legacy = SimpleNamespace(response_metadata={"usage": raw})
+    current = SimpleNamespace(usage_metadata=normalized, response_metadata={})
+    for response in (legacy, current, SimpleNamespace()):
+        service._record_usage(service._usage(response))
+
+    assert metrics.get("llm.input_tokens") == 150
+    assert metrics.get("llm.output_tokens") == 50
+    assert metrics.get("llm.cache_read_input_tokens") == 1500
+    assert metrics.get("llm.cache_creation_input_tokens") == 1600
+    assert metrics.get("llm.prompt_cache_hits") == 1
+    assert metrics.get("llm.prompt_cache_misses") == 2
@@ -0,0 +1,153 @@
+import contextlib
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app import tasks
+from app.core.database import Base
+from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
+from app.models.policies import Policy
+from app.services.policy_store import PolicyStore
+from app.tasks import process_claim_analysis_async
+
+ASSESSMENT = {
+    "severity": "minor",
+    "damaged_parts": ["rear_bumper"],
+    "estimated_cost": 800.0,
+    "confidence": 0.95,
+    "fraud_indicators": [],
+    "reasoning": "Scuffed bumper.",
+}
+
+
+class TrackingSessions:
+    """Session factory recording how many sessions are open at any time."""
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.open = 0
+
+    @contextlib.asynccontextmanager
+    async def __call__(self):
+        self.open += 1
+        try:
+            async with self.factory() as session:
+                yield session
+        finally:
+            self.open -= 1
+
+
+@pytest.fixture
+async def sessions():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield TrackingSessions(async_sessionmaker(engine, expire_on_commit=False))
+    await engine.dispose()
+
+
+async def seed_claim(sessions, coverage_limit=50000, deductible=500):
+    claim_id = uuid.uuid4()
+    async with sessions() as db:
+        db.add(
+            Policy(
+                policy_number="POL-1",
+                holder_name="Alex Driver",
+                coverage_limit=coverage_limit,
+                deductible=deductible,
+                effective_date=datetime.utcnow().date() - timedelta(days=30),
+                expiration_date=datetime.utcnow().date() + timedelta(days=335),
+            )
+        )
+        claim = Claim(
+            id=claim_id,
+            policy_number="POL-1",
+            claim_number="CLM-1",
+            claimant_email="driver@example.com",
+            # Filed weeks ago, two days after the incident
+            created_at=datetime.utcnow() - timedelta(days=40),
+            incident_date=datetime.utcnow() - timedelta(days=42, hours=1),
+        )
+        claim.photos.append(ClaimPhoto(photo_url="uploads/a.jpg"))
+        db.add(claim)
+        await db.commit()
+    return claim_id
+
+
+@contextlib.contextmanager
+def pipeline_patches(sessions, assess_damage):
+    ai_service = MagicMock()
+    ai_service.assess_damage = assess_damage
+    vision_batcher = AsyncMock()
+    vision_batcher.detect_damage.return_value = {"status": "success", "detections": []}
+    fraud_service = MagicMock()
+    fraud_service.analyze_fraud_risk.return_value = {"risk_score": 0, "method": "test"}
+    fraud_service.apply_duplicate_photo_risk.side_effect = lambda result, _: result
+    redis = AsyncMock()
+    redis.get.return_value = None
+
+    with (
+        patch("app.tasks.AsyncSessionLocal", sessions),
+        patch("app.tasks.policy_store", PolicyStore(session_factory=sessions)),
+        patch("app.services.policy_store.get_redis_client", return_value=redis),
+        patch("app.tasks.ai_service", ai_service),
+        patch("app.tasks.vision_batcher", vision_batcher),
+        patch("app.tasks.fraud_detection_service", fraud_service),
+        patch("app.tasks.email_task") as email_task,
+    ):
+        yield email_task
+
+
+@pytest.mark.asyncio
+async def test_pipeline_holds_no_session_during_llm_and_queues_email(sessions):
+    claim_id = await seed_claim(sessions)
+    sessions_during_llm = []
+
+    async def assess_damage(**kwargs):
+        sessions_during_llm.append(sessions.open)
+        assert kwargs["vision_result"]["status"] == "success"
+        return ASSESSMENT
+
+    with pipeline_patches(sessions, assess_damage) as email_task:
+        await process_claim_analysis_async(claim_id)
+        fraud_call = tasks.fraud_detection_service.analyze_fraud_risk.call_args
+
+    # Only the concurrent claim-history lookup may still be running
+    assert sessions_during_llm[0] <= 1
+    assert sessions.open == 0
+
+    async with sessions() as db:
+        claim = await db.get(Claim, claim_id)
+        photo = (await db.execute(select(ClaimPhoto))).scalars().one()
+        log = (await db.execute(select(ClaimAuditLog))).scalars().one()
+
+    assert claim.status == "Approved"
+    assert float(claim.approved_amount) == 800.0
+    assert claim.fraud_score == 0
+    # Days from incident to filing, not to now, feed the fraud model
+    assert fraud_call.args[1] == 2
+    assert photo.ai_analysis == ASSESSMENT
+    assert log.details["claim_history_count"] == 0
+    email_task.delay.assert_called_once()
+    assert email_task.delay.call_args.kwargs["to"] == "driver@example.com"
+    assert email_task.delay.call_args.kwargs["subject"] == "Claim Approved"
+
+
+@pytest.mark.asyncio
+async def test_pipeline_adjudicates_against_the_stored_coverage_limit(sessions):
+    claim_id = await seed_claim(sessions, coverage_limit=1000, deductible=500)
+
+    with pipeline_patches(sessions, AsyncMock(return_value=ASSESSMENT)):
+        await process_claim_analysis_async(claim_id)
+
+    async with sessions() as db:
+        claim = await db.get(Claim, claim_id)
+        log = (await db.execute(select(ClaimAuditLog))).scalars().one()
+
+    assert claim.status == "Manual Review"
+    assert claim.approved_amount is None
+    assert "exceeds coverage limit minus deductible ($500.0)" in log.details["reason"]
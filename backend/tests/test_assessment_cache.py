@@ -0,0 +1,157 @@
+import hashlib
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.cache import TTLCache
+from app.core.metrics import metrics
+from app.services.ai_service import ClaudeAIService
+from app.services.assessment_cache import AssessmentCache, make_assessment_key
+
+ASSESSMENT = {
+    "severity": "minor",
+    "damaged_parts": ["rear_bumper"],
+    "estimated_cost": 800.0,
+    "confidence": 0.95,
+    "fraud_indicators": [],
+    "reasoning": "Scuffed bumper.",
+}
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    with patch("app.core.cache.time.monotonic", return_value=1000.0):
+        cache.set("a", 1)
+    with patch("app.core.cache.time.monotonic", return_value=1061.0):
+        assert cache.get("a") is None
+
+
+def test_assessment_key_depends_on_images_prompt_and_model():
+    key = make_assessment_key("model-a", "prompt", ["img1", "img2"])
+
+    assert key == make_assessment_key("model-a", "prompt", ["img1", "img2"])
+    assert key != make_assessment_key("model-b", "prompt", ["img1", "img2"])
+    assert key != make_assessment_key("model-a", "prompt2", ["img1", "img2"])
+    assert key != make_assessment_key("model-a", "prompt", ["img2", "img1"])
+
+
+@pytest.mark.asyncio
+async def test_cache_reads_through_redis_into_local_lru():
+    metrics.reset()
+    redis_client = AsyncMock()
+    redis_client.get.return_value = json.dumps(ASSESSMENT)
+    cache = AssessmentCache(maxsize=4, ttl=60)
+
+    with patch(
+        "app.services.assessment_cache.get_redis_client", return_value=redis_client
+    ):
+        first = await cache.get("key")
+        second = await cache.get("key")
+
+    assert first == ASSESSMENT
+    assert second == ASSESSMENT
+    redis_client.get.assert_awaited_once_with("key")
+    assert metrics.get("ai_cache.hits.redis") == 1
+    assert metrics.get("ai_cache.hits.local") == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_and_set_survive_redis_outage():
+    metrics.reset()
+    redis_client = AsyncMock()
+    redis_client.get.side_effect = ConnectionError("redis down")
+    redis_client.setex.side_effect = ConnectionError("redis down")
+    cache = AssessmentCache(maxsize=4, ttl=60)
+
+    with patch(
+        "app.services.assessment_cache.get_redis_client", return_value=redis_client
+    ):
+        assert await cache.get("key") is None
+        await cache.set("key", ASSESSMENT)
+        assert await cache.get("key") == ASSESSMENT
+
+    assert metrics.get("ai_cache.misses") == 1
+
+
+@pytest.mark.asyncio
+async def test_assess_damage_returns_cached_result_without_calling_claude(tmp_path):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"fake image bytes")
+
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.ainvoke = AsyncMock()
+    cache = AsyncMock()
+    cache.get.return_value = ASSESSMENT
+
+    with patch("app.services.ai_service.assessment_cache", cache):
+        result = await service.assess_damage(
+            photo_urls=[str(photo)],
+            vehicle_info={"make": "Toyota", "model": "Camry", "year": 2020},
+            incident_info={"description": "Rear-end collision", "date": "2024-03-01"},
+        )
+
+    assert result == ASSESSMENT
+    service.client.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_assess_damage_caches_parsed_claude_response(tmp_path):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"fake image bytes")
+
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.ainvoke = AsyncMock(
+        return_value=MagicMock(content=json.dumps(ASSESSMENT))
+    )
+    cache = AsyncMock()
+    cache.get.return_value = None
+    vision = AsyncMock()
+    vision.detect_damage.return_value = {"status": "error", "detections": []}
+
+    with patch("app.services.ai_service.assessment_cache", cache), patch(
+        "app.services.ai_service.vision_batcher", vision
+    ), patch("app.services.ai_service.settings.LLM_STREAMING", False):
+        result = await service.assess_damage(
+            photo_urls=[str(photo)],
+            vehicle_info={"make": "Toyota", "model": "Camry", "year": 2020},
+            incident_info={"description": "Rear-end collision", "date": "2024-03-01"},
+        )
+
+    assert result == ASSESSMENT
+    cache_key = cache.get.await_args.args[0]
+    cache.set.assert_awaited_once_with(cache_key, ASSESSMENT)
+
+
+@pytest.mark.asyncio
+async def test_cache_key_uses_stored_photo_hashes_without_reading_photos():
+    data = b"fake image bytes"
+    service = ClaudeAIService()
+    args = (["uploads/photo.jpg"], {"make": "Toyota"}, {"description": "Dent"})
+
+    with patch(
+        "app.services.ai_service.storage_service.read_bytes",
+        new=AsyncMock(return_value=data),
+    ) as read_bytes:
+        read_key = await service._assessment_cache_key(*args)
+        read_bytes.reset_mock()
+        stored_key = await service._assessment_cache_key(
+            *args, [hashlib.sha256(data).hexdigest()]
+        )
+
+    read_bytes.assert_not_awaited()
+    assert stored_key == read_key
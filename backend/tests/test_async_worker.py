@@ -0,0 +1,163 @@
+import base64
+import json
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import redis.asyncio as redis
+
+from app.worker import AsyncClaimWorker, decode_celery_message, message_id
+
+
+def make_celery_message(task_name, args, kwargs=None, task_id="task-1"):
+    body = json.dumps([args, kwargs or {}, {"callbacks": None}]).encode()
+    return json.dumps(
+        {
+            "body": base64.b64encode(body).decode(),
+            "content-encoding": "utf-8",
+            "content-type": "application/json",
+            "headers": {"lang": "py", "task": task_name, "id": task_id},
+            "properties": {
+                "body_encoding": "base64",
+                "delivery_info": {"exchange": "", "routing_key": "main-queue"},
+            },
+        }
+    ).encode()
+
+
+def test_decode_celery_message():
+    raw = make_celery_message("app.tasks.ai_analysis_task", ["claim-123"])
+
+    task_name, task_id, args, kwargs = decode_celery_message(raw)
+
+    assert task_name == "app.tasks.ai_analysis_task"
+    assert task_id == "task-1"
+    assert args == ["claim-123"]
+    assert kwargs == {}
+
+
+@pytest.mark.asyncio
+async def test_handle_dispatches_known_task_and_acks():
+    raw = make_celery_message("app.tasks.ai_analysis_task", ["claim-123"])
+    client = AsyncMock()
+    handler = AsyncMock()
+    worker = AsyncClaimWorker(claim_concurrency=1, cpu_processes=1, llm_concurrency=1)
+
+    with patch.dict(
+        "app.worker.TASK_HANDLERS", {"app.tasks.ai_analysis_task": handler}
+    ):
+        await worker._handle(client, raw)
+
+    handler.assert_awaited_once_with("claim-123")
+    client.lrem.assert_awaited_once_with(worker.inflight_key, 1, raw)
+    client.lpush.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_failed_task_is_still_acked():
+    raw = make_celery_message("app.tasks.ai_analysis_task", ["claim-123"])
+    client = AsyncMock()
+    handler = AsyncMock(side_effect=RuntimeError("boom"))
+    worker = AsyncClaimWorker(claim_concurrency=1, cpu_processes=1, llm_concurrency=1)
+
+    with patch.dict(
+        "app.worker.TASK_HANDLERS", {"app.tasks.ai_analysis_task": handler}
+    ):
+        await worker._handle(client, raw)
+
+    client.lrem.assert_awaited_once_with(worker.inflight_key, 1, raw)
+
+
+@pytest.mark.asyncio
+async def test_handle_unknown_task_goes_to_unhandled_list():
+    raw = make_celery_message("app.tasks.unknown_task", [])
+    client = AsyncMock()
+    worker = AsyncClaimWorker(claim_concurrency=1, cpu_processes=1, llm_concurrency=1)
+
+    await worker._handle(client, raw)
+
+    client.lpush.assert_awaited_once_with("main-queue:unhandled", raw)
+    client.lrem.assert_awaited_once_with(worker.inflight_key, 1, raw)
+
+
+class FakeListRedis:
+    """The subset of Redis used to track and recover in-flight messages."""
+
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+        self.live = set()
+
+    async def scan_iter(self, match):
+        for key in list(self.lists):
+            if key.startswith(match.rstrip("*")):
+                yield key.encode()
+
+    async def exists(self, key):
+        return int(key in self.live)
+
+    async def rename(self, key, new_key):
+        if key not in self.lists:
+            raise redis.ResponseError("ERR no such key")
+        self.lists[new_key] = self.lists.pop(key)
+
+    async def lindex(self, key, index):
+        items = self.lists.get(key) or []
+        return items[index] if items else None
+
+    async def lmove(self, key, dest_key, src, dest):
+        value = self.lists[key].pop(-1 if src == "RIGHT" else 0)
+        if not self.lists[key]:
+            del self.lists[key]
+        target = self.lists.setdefault(dest_key, [])
+        target.insert(len(target) if dest == "RIGHT" else 0, value)
+
+    async def hincrby(self, key, field, amount):
+        counts = self.hashes.setdefault(key, {})
+        counts[field] = counts.get(field, 0) + amount
+        return counts[field]
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+
+def make_worker():
+    return AsyncClaimWorker(claim_concurrency=1, cpu_processes=1, llm_concurrency=1)
+
+
+def test_consumers_in_one_process_have_their_own_inflight_lists():
+    assert make_worker().inflight_key != make_worker().inflight_key
+
+
+@pytest.mark.asyncio
+async def test_only_messages_of_dead_consumers_are_requeued():
+    client = FakeListRedis()
+    worker, alive = make_worker(), make_worker()
+    dead_key = "main-queue:inflight:old-host-123-deadbeef"
+    client.live.add(alive.heartbeat_key)
+    client.lists[alive.inflight_key] = [make_celery_message("t", [], task_id="a")]
+    client.lists[worker.inflight_key] = [make_celery_message("t", [], task_id="b")]
+    client.lists[dead_key] = [make_celery_message("t", [], task_id="c")]
+
+    await worker._recover_orphans(client)
+
+    assert [message_id(raw) for raw in client.lists["main-queue"]] == ["c"]
+    assert len(client.lists[alive.inflight_key]) == 1
+    assert len(client.lists[worker.inflight_key]) == 1
+    assert dead_key not in client.lists
+
+
+@pytest.mark.asyncio
+async def test_message_redelivered_too_often_goes_to_unhandled_list():
+    client = FakeListRedis()
+    worker = make_worker()
+    worker.max_redeliveries = 2
+    raw = make_celery_message("app.tasks.ai_analysis_task", ["claim-123"])
+
+    for crash in range(3):
+        client.lists[f"main-queue:inflight:crashed-{crash}"] = [raw]
+        client.lists.pop("main-queue", None)
+        await worker._recover_orphans(client)
+
+    assert "main-queue" not in client.lists
+    assert client.lists["main-queue:unhandled"] == [raw]
+    assert client.hashes["main-queue:redeliveries"] == {}
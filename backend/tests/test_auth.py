@@ -1,3 +1,5 @@
+from unittest.mock import AsyncMock, patch
+
 import pytest
 from httpx import ASGITransport, AsyncClient
 
@@ -35,13 +37,25 @@ async def test_get_policy_unauthorized():
 
 @pytest.mark.asyncio
 async def test_get_policy_authorized():
-    # This endpoint uses a mock DB in the code, so it should work without a real DB connection
+    # Stub the policy store so the check does not need a database
+    policy_store = AsyncMock()
+    policy_store.get.return_value = {
+        "policy_number": "POL-123456789",
+        "holder_name": "John Doe",
+        "status": "Active",
+        "vehicle_info": "2022 Tesla Model 3",
+        "coverage_limit": 50000.0,
+        "deductible": 500.0,
+        "effective_date": "2024-01-01",
+        "expiration_date": "2025-01-01",
+    }
     transport = ASGITransport(app=app)
     headers = {"x-api-key": settings.API_KEY}
-    async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        response = await ac.get(
-            f"{settings.API_V1_STR}/policies/POL-123456789", headers=headers
-        )
+    with patch("app.api.v1.endpoints.policies.policy_store", policy_store):
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.get(
+                f"{settings.API_V1_STR}/policies/POL-123456789", headers=headers
+            )
     assert response.status_code == 200
     assert response.json()["policy_number"] == "POL-123456789"
 
@@ -0,0 +1,199 @@
+import json
+import uuid
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app.core.database import Base
+from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
+from app.services.batch_analysis import (
+    MessageBatchClient,
+    reanalyze_claims,
+    split_by_size,
+)
+from app.services.storage import LocalStorageBackend, StorageService
+
+ASSESSMENT = {
+    "severity": "minor",
+    "damaged_parts": ["rear_bumper"],
+    "estimated_cost": 800.0,
+    "confidence": 0.95,
+    "fraud_indicators": [],
+    "reasoning": "Scuffed bumper.",
+}
+
+
+class FakeBatchServer:
+    """In-memory stand-in for the Message Batches API."""
+
+    def __init__(self, polls_until_ended=1, fail_ids=()):
+        self.batches = {}
+        self.polls_until_ended = polls_until_ended
+        self.fail_ids = set(fail_ids)
+        self.headers = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.headers.append(request.headers)
+        path = request.url.path
+        if request.method == "POST" and path == "/v1/messages/batches":
+            batch_id = f"msgbatch_{len(self.batches)}"
+            self.batches[batch_id] = {
+                "requests": json.loads(request.content)["requests"],
+                "polls": 0,
+            }
+            return httpx.Response(200, json=self.describe(batch_id))
+        if path.endswith("/results"):
+            batch_id = path.split("/")[-2]
+            lines = [self.result(r) for r in self.batches[batch_id]["requests"]]
+            return httpx.Response(200, text="\n".join(lines) + "\n")
+        batch_id = path.rsplit("/", 1)[-1]
+        self.batches[batch_id]["polls"] += 1
+        return httpx.Response(200, json=self.describe(batch_id))
+
+    def describe(self, batch_id):
+        ended = self.batches[batch_id]["polls"] >= self.polls_until_ended
+        return {
+            "id": batch_id,
+            "processing_status": "ended" if ended else "in_progress",
+            "results_url": f"https://batches.test/v1/messages/batches/{batch_id}/results",
+        }
+
+    def result(self, request):
+        custom_id = request["custom_id"]
+        if custom_id in self.fail_ids:
+            result = {"type": "errored", "error": {"type": "overloaded_error"}}
+        else:
+            text = json.dumps(ASSESSMENT)
+            result = {
+                "type": "succeeded",
+                "message": {"content": [{"type": "text", "text": text}]},
+            }
+        return json.dumps({"custom_id": custom_id, "result": result})
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def seed_claims(session_factory, count, tmp_path):
+    (tmp_path / "uploads").mkdir(exist_ok=True)
+    (tmp_path / "uploads" / "photo.jpg").write_bytes(b"fake image bytes")
+    ids = []
+    async with session_factory() as db:
+        for i in range(count):
+            claim = Claim(
+                id=uuid.uuid4(),
+                policy_number="POL-1",
+                claim_number=f"CLM-{uuid.uuid4()}",
+                vehicle_make="Toyota",
+            )
+            photo = ClaimPhoto(photo_url="uploads/photo.jpg")
+            if i == 0:
+                photo.ai_analysis = {"old": True}
+            claim.photos.append(photo)
+            db.add(claim)
+            ids.append(claim.id)
+        db.add(Claim(policy_number="POL-2", claim_number="CLM-NO-PHOTOS"))
+        await db.commit()
+    return ids
+
+
+def fake_client(server):
+    return MessageBatchClient(
+        api_key="test-key",
+        base_url="https://batches.test",
+        transport=httpx.MockTransport(server.handler),
+    )
+
+
+@pytest.fixture
+def local_photos(tmp_path):
+    vision = AsyncMock()
+    vision.detect_damage.return_value = {"status": "error", "detections": []}
+    storage = StorageService(backend=LocalStorageBackend(root=str(tmp_path)))
+    with (
+        patch("app.services.ai_service.vision_batcher", vision),
+        patch("app.services.ai_service.storage_service", storage),
+        patch("app.services.ai_service.settings.LLM_IMAGE_PREPROCESS", False),
+    ):
+        yield
+
+
+@pytest.mark.asyncio
+async def test_reanalysis_batches_claims_and_writes_results_back(
+    session_factory, tmp_path, local_photos
+):
+    claim_ids = await seed_claims(session_factory, 5, tmp_path)
+    failed_id = str(claim_ids[3])
+    server = FakeBatchServer(polls_until_ended=2, fail_ids=[failed_id])
+
+    with patch("app.services.batch_analysis.asyncio.sleep", new=AsyncMock()):
+        report = await reanalyze_claims(
+            batch_size=2,
+            client=fake_client(server),
+            session_factory=session_factory,
+        )
+
+    # Claims without photos are skipped; 5 claims in pages of 2
+    assert report.submitted == 5
+    assert len(report.batch_ids) == 3
+    assert (report.succeeded, report.failed) == (4, 1)
+    assert server.headers[0]["x-api-key"] == "test-key"
+
+    params = server.batches["msgbatch_0"]["requests"][0]["params"]
+    assert params["system"][0]["text"].startswith("You are an auto insurance")
+    assert params["system"][0]["cache_control"] == {"type": "ephemeral"}
+    image, text = params["messages"][0]["content"]
+    assert image["source"]["media_type"] == "image/jpeg"
+    assert "<make>Toyota</make>" in text["text"]
+
+    async with session_factory() as db:
+        photos = (await db.execute(select(ClaimPhoto))).scalars().all()
+        analyses = {photo.claim_id: photo.ai_analysis for photo in photos}
+        logs = (await db.execute(select(ClaimAuditLog))).scalars().all()
+
+    assert analyses[claim_ids[0]] == ASSESSMENT
+    assert analyses[claim_ids[3]] is None
+    assert len(logs) == 4
+    assert {log.action for log in logs} == {"ai_batch_reanalysis"}
+
+
+@pytest.mark.asyncio
+async def test_only_missing_skips_already_analyzed_claims(
+    session_factory, tmp_path, local_photos
+):
+    claim_ids = await seed_claims(session_factory, 3, tmp_path)
+    server = FakeBatchServer()
+
+    report = await reanalyze_claims(
+        only_missing=True,
+        client=fake_client(server),
+        session_factory=session_factory,
+    )
+
+    submitted = {r["custom_id"] for r in server.batches["msgbatch_0"]["requests"]}
+    assert submitted == {str(claim_ids[1]), str(claim_ids[2])}
+    assert report.succeeded == 2
+
+
+def test_batches_are_split_by_serialized_size():
+    requests = [{"custom_id": str(i), "params": {"data": "x" * 100}} for i in range(5)]
+    request_size = len(json.dumps(requests[0])) + 1
+
+    chunks = split_by_size(requests, max_bytes=request_size * 2)
+
+    assert [[r["custom_id"] for r in chunk] for chunk in chunks] == [
+        ["0", "1"],
+        ["2", "3"],
+        ["4"],
+    ]
+    # An oversized request is still sent, on its own
+    assert split_by_size(requests[:2], max_bytes=10) == [[requests[0]], [requests[1]]]
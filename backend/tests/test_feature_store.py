@@ -0,0 +1,150 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app.core.database import Base
+from app.models.claims import Claim, ClaimHistoryFeatures
+from app.services.feature_store import (
+    ClaimFeatureStore,
+    feature_store,
+    rebuild_claim_history_features,
+)
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    feature_store.clear()
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    feature_store.clear()
+    await engine.dispose()
+
+
+def make_claim(policy="POL-1", vin="1hgcm82633a004123 ", days_ago=0, **kwargs):
+    return Claim(
+        policy_number=policy,
+        claim_number=f"CLM-{uuid.uuid4()}",
+        vehicle_vin=vin,
+        incident_date=datetime.utcnow() - timedelta(days=days_ago),
+        **kwargs,
+    )
+
+
+async def all_features(db):
+    rows = (await db.execute(select(ClaimHistoryFeatures))).scalars().all()
+    return {
+        (row.entity_type, row.entity_key): (
+            row.claim_count,
+            float(row.total_paid),
+            len(row.recent_claim_dates),
+        )
+        for row in rows
+    }
+
+
+@pytest.mark.asyncio
+async def test_features_maintained_on_create_and_payout(session_factory):
+    async with session_factory() as db:
+        db.add_all([make_claim(days_ago=5), make_claim(days_ago=60)])
+        db.add(make_claim(days_ago=400, vin=None))
+        await db.commit()
+
+        claim = make_claim(policy="POL-2", days_ago=1, approved_amount=1200)
+        db.add(claim)
+        await db.commit()
+
+        claim.status = "Paid"
+        await db.commit()
+
+        features = await all_features(db)
+        assert features[("policy", "POL-1")] == (3, 0.0, 2)
+        assert features[("policy", "POL-2")] == (1, 1200.0, 1)
+        # VINs are normalized; POL-1's third claim had no VIN
+        assert features[("vin", "1HGCM82633A004123")] == (3, 1200.0, 3)
+
+        claim.status = "Approved"
+        await db.commit()
+        assert (await all_features(db))[("policy", "POL-2")] == (1, 0.0, 1)
+
+
+@pytest.mark.asyncio
+async def test_get_features_reads_through_cache_and_invalidates_on_commit(
+    session_factory,
+):
+    async with session_factory() as db:
+        db.add_all([make_claim(days_ago=5), make_claim(days_ago=60)])
+        await db.commit()
+
+        first = await feature_store.get_features(db, "POL-1", "1HGCM82633A004123")
+        assert first["policy"]["claim_count"] == 2
+        assert first["policy"]["claims_30d"] == 1
+        assert first["policy"]["claims_90d"] == 2
+        assert first["vin"]["claim_count"] == 2
+
+        # Cached: no query needed even though the DB is unchanged
+        cached = await feature_store.get_features(db, "POL-1")
+        assert cached["policy"] == first["policy"]
+        assert cached["vin"] is None
+
+        db.add(make_claim(days_ago=2))
+        await db.commit()
+        refreshed = await feature_store.get_features(db, "POL-1")
+        assert refreshed["policy"]["claim_count"] == 3
+        assert refreshed["policy"]["claims_30d"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fresh_read_sees_claims_committed_by_another_process(session_factory):
+    # The store of another process: commits here never invalidate it
+    other_process = ClaimFeatureStore(maxsize=10, ttl=60)
+    async with session_factory() as db:
+        db.add(make_claim(days_ago=5))
+        await db.commit()
+        assert (await other_process.get_features(db, "POL-1"))["policy"][
+            "claim_count"
+        ] == 1
+
+        db.add(make_claim(days_ago=1))
+        await db.commit()
+        stale = await other_process.get_features(db, "POL-1")
+        fresh = await other_process.get_features(db, "POL-1", fresh=True)
+        cached = await other_process.get_features(db, "POL-1")
+
+    assert stale["policy"]["claim_count"] == 1
+    assert fresh["policy"]["claim_count"] == 2
+    assert cached["policy"]["claim_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_entities_are_cached_as_empty_history(session_factory):
+    store = ClaimFeatureStore(maxsize=10, ttl=60)
+    async with session_factory() as db:
+        features = await store.get_features(db, "POL-NEW", None)
+
+    assert features["policy"]["claim_count"] == 0
+    assert features["policy"]["claims_365d"] == 0
+    assert features["policy"]["last_claim_date"] is None
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_incremental_maintenance(session_factory):
+    async with session_factory() as db:
+        db.add_all(
+            [
+                make_claim(days_ago=5),
+                make_claim(days_ago=400),
+                make_claim(policy="POL-2", status="Paid", approved_amount=300),
+            ]
+        )
+        await db.commit()
+        incremental = await all_features(db)
+
+        written = await rebuild_claim_history_features(db)
+
+        assert written == len(incremental) == 3
+        assert await all_features(db) == incremental
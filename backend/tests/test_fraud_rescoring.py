@@ -0,0 +1,164 @@
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app.core.database import Base
+from app.models.claims import Claim, ClaimPhoto
+from app.services.fraud_rescoring import days_between, rescore_claims
+from app.services.fraud_service import DUPLICATE_PHOTO_RISK, fraud_detection_service
+from app.services.photo_index import band_columns
+
+
+class RecordingFraudService:
+    def __init__(self):
+        self.batches = []
+
+    def analyze_fraud_risk_batch(self, costs, days, history):
+        self.batches.append((list(costs), list(days), list(history)))
+        risk = np.asarray(history) * 10 + np.asarray(days)
+        return {"is_anomaly": risk > 30, "risk_score": risk, "method": "recording"}
+
+    def apply_duplicate_photo_risk(self, fraud_result, duplicate_photos):
+        return fraud_detection_service.apply_duplicate_photo_risk(
+            fraud_result, duplicate_photos
+        )
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def seed(session_factory):
+    now = datetime.utcnow()
+    # (policy, status, cost, days from incident to claim, claim age in days)
+    claims = [
+        ("POL-A", "New", 1000, 3, 0),
+        ("POL-A", "Manual Review", 2000, 40, 2),
+        ("POL-A", "Paid", 500, None, 90),
+        ("POL-B", "Processing", 700, 1, 60),
+        # Triaged without the LLM: no estimate, deliberately left unscored
+        ("POL-D", "Manual Review", None, 2, 5),
+        ("POL-C", "Rejected", 9000, 5, 10),
+    ]
+    async with session_factory() as db:
+        for policy, status, cost, delay, age in claims:
+            created_at = now - timedelta(days=age, hours=6)
+            db.add(
+                Claim(
+                    policy_number=policy,
+                    claim_number=f"CLM-{uuid.uuid4()}",
+                    status=status,
+                    estimated_damage_cost=cost,
+                    incident_date=(
+                        created_at - timedelta(days=delay, hours=2)
+                        if delay is not None
+                        else None
+                    ),
+                    created_at=created_at,
+                )
+            )
+        await db.commit()
+
+
+async def scores_by_policy(session_factory):
+    async with session_factory() as db:
+        rows = (
+            await db.execute(
+                select(Claim.policy_number, Claim.status, Claim.fraud_score)
+            )
+        ).all()
+    return {(policy, status): score for policy, status, score in rows}
+
+
+@pytest.mark.asyncio
+async def test_rescore_pages_through_open_claims(session_factory, monkeypatch):
+    await seed(session_factory)
+    service = RecordingFraudService()
+    monkeypatch.setattr("app.services.fraud_rescoring.fraud_detection_service", service)
+
+    report = await rescore_claims(batch_size=2, session_factory=session_factory)
+
+    assert report.claims_scored == 3
+    assert report.batches == 2
+    assert all(len(batch[0]) <= 2 for batch in service.batches)
+    scores = await scores_by_policy(session_factory)
+    # History counts every other claim on the policy, including closed ones
+    assert scores[("POL-A", "New")] == 2 * 10 + 3
+    assert scores[("POL-A", "Manual Review")] == 2 * 10 + 40
+    # Days from incident to claim, not to now: a 60-day-old claim is not older
+    assert scores[("POL-B", "Processing")] == 1
+    assert scores[("POL-D", "Manual Review")] is None
+    assert scores[("POL-A", "Paid")] is None
+    assert scores[("POL-C", "Rejected")] is None
+    assert report.anomalies == 1
+
+
+@pytest.mark.asyncio
+async def test_rescore_can_include_closed_claims(session_factory, monkeypatch):
+    await seed(session_factory)
+    monkeypatch.setattr(
+        "app.services.fraud_rescoring.fraud_detection_service",
+        RecordingFraudService(),
+    )
+
+    report = await rescore_claims(
+        batch_size=10, include_closed=True, session_factory=session_factory
+    )
+
+    assert report.claims_scored == 5
+    assert report.batches == 1
+    assert report.claims_per_second > 0
+    scores = await scores_by_policy(session_factory)
+    assert scores[("POL-A", "Paid")] == 20
+    assert scores[("POL-C", "Rejected")] == 5
+
+
+@pytest.mark.asyncio
+async def test_rescore_keeps_duplicate_photo_risk(session_factory, monkeypatch):
+    await seed(session_factory)
+    async with session_factory() as db:
+        claims = {
+            claim.status: claim
+            for claim in (await db.execute(select(Claim))).scalars().all()
+        }
+        # The open claim reuses a photo from the paid one
+        for status in ("Paid", "New"):
+            db.add(
+                ClaimPhoto(
+                    claim_id=claims[status].id,
+                    photo_url=f"uploads/{status}.jpg",
+                    **band_columns(1234),
+                )
+            )
+        await db.commit()
+    monkeypatch.setattr(
+        "app.services.fraud_rescoring.fraud_detection_service",
+        RecordingFraudService(),
+    )
+
+    report = await rescore_claims(batch_size=10, session_factory=session_factory)
+
+    scores = await scores_by_policy(session_factory)
+    assert scores[("POL-A", "New")] == 2 * 10 + 3 + DUPLICATE_PHOTO_RISK
+    assert scores[("POL-A", "Manual Review")] == 2 * 10 + 40
+    assert report.anomalies == 2
+
+
+def test_days_between_compiles_for_postgresql():
+    expr = days_between(Claim.created_at, Claim.incident_date)
+
+    sql = str(expr.compile(dialect=postgresql.dialect()))
+
+    assert sql == (
+        "CAST(EXTRACT(DAY FROM claims.created_at - claims.incident_date) AS INTEGER)"
+    )
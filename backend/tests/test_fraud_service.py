@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import IsolationForest
+
+from app.services.fraud_service import MLFraudDetectionService, reporting_delay_days
+
+FEATURES = ["estimated_cost", "days_since_incident", "claim_history_count"]
+
+
+def make_service(model):
+    service = MLFraudDetectionService.__new__(MLFraudDetectionService)
+    service.model = model
+    return service
+
+
+def trained_model():
+    rng = np.random.default_rng(7)
+    history = pd.DataFrame(
+        {
+            "estimated_cost": rng.uniform(300, 5000, 200),
+            "days_since_incident": rng.integers(0, 20, 200),
+            "claim_history_count": rng.integers(0, 2, 200),
+        }
+    )
+    return IsolationForest(contamination=0.15, random_state=42).fit(history)
+
+
+def test_batch_matches_per_claim_predict_and_decision_function():
+    model = trained_model()
+    service = make_service(model)
+    costs = [500, 2500, 21000, 900, 15000]
+    days = [2, 10, 90, 1, 60]
+    history = [0, 1, 5, 0, 4]
+
+    scores = service.analyze_fraud_risk_batch(costs, days, history)
+
+    assert scores["method"] == "ml_isolation_forest"
+    for i in range(len(costs)):
+        row = pd.DataFrame(
+            [dict(zip(FEATURES, (costs[i], days[i], history[i]), strict=True))]
+        )
+        expected_risk = max(
+            0, min(100, int(50 - model.decision_function(row)[0] * 100))
+        )
+        assert scores["is_anomaly"][i] == (model.predict(row)[0] == -1)
+        assert scores["risk_score"][i] == expected_risk
+
+
+def test_single_claim_api_returns_plain_python_types():
+    result = make_service(trained_model()).analyze_fraud_risk(21000, 90, 5)
+
+    assert result["is_anomaly"] is True
+    assert isinstance(result["risk_score"], int)
+    assert result["method"] == "ml_isolation_forest"
+
+
+def test_heuristic_fallback_is_vectorized():
+    scores = make_service(None).analyze_fraud_risk_batch(
+        [500, 12000, 12000], [1, 45, 45], [0, 0, 3]
+    )
+
+    assert scores["method"] == "heuristic"
+    assert scores["risk_score"].tolist() == [0, 35, 60]
+    assert scores["is_anomaly"].tolist() == [False, False, True]
+
+
+def test_model_errors_fall_back_to_zero_risk_for_whole_batch():
+    model = trained_model()
+    model.score_samples = MagicMock(side_effect=ValueError("boom"))
+
+    scores = make_service(model).analyze_fraud_risk_batch([1, 2], [1, 2], [0, 0])
+
+    assert scores["method"] == "error_fallback"
+    assert scores["risk_score"].tolist() == [0, 0]
+    assert scores["is_anomaly"].tolist() == [False, False]
+
+
+def test_reporting_delay_is_measured_from_the_incident_to_the_claim():
+    filed = datetime(2026, 3, 10, 9, 0)
+
+    assert reporting_delay_days(filed, filed - timedelta(days=4, hours=3)) == 4
+    assert reporting_delay_days(filed, datetime(2026, 3, 9, tzinfo=timezone.utc)) == 1
+    # Incident dated after filing (bad input) and missing dates score as zero
+    assert reporting_delay_days(filed, filed + timedelta(days=2)) == 0
+    assert reporting_delay_days(filed, None) == 0
@@ -0,0 +1,110 @@
+import io
+import os
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from app.services.image_processing import (
+    derived_path,
+    inference_image_path,
+    prepare_inference_image,
+    prepare_thumbnail,
+    prepare_variant,
+    resize_and_encode,
+)
+from app.services.storage import LocalStorageBackend, StorageService
+
+
+def make_jpeg(width, height, exif_orientation=None):
+    image = Image.new("RGB", (width, height), color=(200, 30, 30))
+    output = io.BytesIO()
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        image.save(output, format="JPEG", exif=exif)
+    else:
+        image.save(output, format="JPEG")
+    return output.getvalue()
+
+
+def test_derived_path_sits_next_to_original():
+    assert (
+        derived_path("uploads/abc.png", "llm", 1568, "JPEG")
+        == "uploads/abc.llm-1568.jpg"
+    )
+    assert derived_path("uploads/abc.jpg", "thumb", 256, "webp") == (
+        "uploads/abc.thumb-256.webp"
+    )
+
+
+def test_resize_and_encode_limits_long_edge():
+    encoded = resize_and_encode(make_jpeg(4000, 3000), max_edge=1000)
+
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (1000, 750)
+        assert image.format == "JPEG"
+
+
+def test_resize_and_encode_never_upscales():
+    encoded = resize_and_encode(make_jpeg(300, 200), max_edge=1000, fmt="WEBP")
+
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (300, 200)
+        assert image.format == "WEBP"
+
+
+def test_resize_and_encode_applies_orientation_and_strips_exif():
+    # Orientation 6 means the camera was rotated 90 degrees
+    encoded = resize_and_encode(make_jpeg(400, 200, exif_orientation=6), 1000)
+
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.size == (200, 400)
+        assert not image.getexif()
+
+
+@pytest.fixture
+def local_storage(tmp_path):
+    storage = StorageService(backend=LocalStorageBackend(root=str(tmp_path)))
+    with patch("app.services.image_processing.storage_service", storage):
+        yield tmp_path
+
+
+@pytest.mark.asyncio
+async def test_prepare_variant_writes_once_and_reuses(local_storage):
+    (local_storage / "uploads" / "photo.jpg").write_bytes(make_jpeg(2000, 1000))
+
+    first = await prepare_variant("uploads/photo.jpg", "llm", 500, "JPEG", 80)
+    written = local_storage / first
+    mtime = os.path.getmtime(written)
+    second = await prepare_variant("uploads/photo.jpg", "llm", 500, "JPEG", 80)
+
+    assert first == second == "uploads/photo.llm-500.jpg"
+    assert os.path.getmtime(written) == mtime
+    with Image.open(written) as image:
+        assert image.size == (500, 250)
+
+
+@pytest.mark.asyncio
+async def test_prepare_variant_returns_none_for_undecodable_file(local_storage):
+    (local_storage / "uploads" / "photo.jpg").write_bytes(b"not an image")
+
+    assert await prepare_variant("uploads/photo.jpg", "llm", 500, "JPEG", 80) is None
+    assert await prepare_variant("uploads/missing.jpg", "llm", 500, "JPEG", 80) is None
+    assert os.listdir(local_storage / "uploads") == ["photo.jpg"]
+
+
+@pytest.mark.asyncio
+async def test_upload_variants_use_preloaded_bytes(local_storage):
+    data = make_jpeg(3000, 2000)
+
+    # The original is never read back when its bytes are passed in
+    inference = await prepare_inference_image("uploads/photo.jpg", data)
+    thumbnail = await prepare_thumbnail("uploads/photo.jpg", data)
+
+    assert inference == inference_image_path("uploads/photo.jpg")
+    with Image.open(local_storage / inference) as image:
+        assert image.size == (640, 427)
+    with Image.open(local_storage / thumbnail) as image:
+        assert max(image.size) == 256
+        assert image.format == "WEBP"
@@ -0,0 +1,213 @@
+import hashlib
+import io
+import uuid
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+from httpx import ASGITransport, AsyncClient
+from PIL import Image
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.main import app
+from app.models.claims import Claim, ClaimPhoto
+from app.services.ingest import StreamingUploadIngest
+
+BOUNDARY = "testboundary"
+ALLOWED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp"}
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def make_png(size=(64, 64)):
+    output = io.BytesIO()
+    Image.new("RGB", size, color=(10, 20, 30)).save(output, format="PNG")
+    return output.getvalue()
+
+
+def multipart_body(content, filename="photo.png", field="file", extra_field=True):
+    parts = []
+    if extra_field:
+        parts.append(
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="note"\r\n\r\n'
+            "front bumper\r\n".encode()
+        )
+    parts.append(
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: image/png\r\n\r\n".encode()
+        + content
+        + b"\r\n"
+    )
+    parts.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(parts)
+
+
+def make_request(body, chunk_size=1000):
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "headers": [
+            (
+                b"content-type",
+                f"multipart/form-data; boundary={BOUNDARY}".encode(),
+            )
+        ],
+    }
+    return Request(scope, receive)
+
+
+class MemoryStorage:
+    def __init__(self):
+        self.files = {}
+
+    async def upload_stream(self, chunks, file_extension):
+        data = bytearray()
+        async for chunk in chunks:
+            data.extend(chunk)
+        path = f"uploads/stored{file_extension}"
+        self.files[path] = bytes(data)
+        return path
+
+    async def read_bytes(self, key):
+        return self.files[key]
+
+
+def make_ingest(request, max_size=None):
+    return StreamingUploadIngest(
+        request,
+        allowed_mime_types=ALLOWED_MIME_TYPES,
+        allowed_extensions=ALLOWED_EXTENSIONS,
+        max_size=max_size,
+    )
+
+
+@pytest.mark.asyncio
+async def test_ingest_streams_validates_and_hashes_in_one_pass():
+    content = make_png((400, 400))
+    storage = MemoryStorage()
+
+    with patch("app.services.ingest.storage_service", storage):
+        upload = await make_ingest(make_request(multipart_body(content))).ingest()
+
+    assert upload.path == "uploads/stored.png"
+    assert storage.files[upload.path] == content
+    assert upload.size == len(content)
+    assert upload.sha256 == hashlib.sha256(content).hexdigest()
+    assert upload.mime_type == "image/png"
+    assert upload.content_type == "image/png"
+    assert upload.filename == "photo.png"
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_spoofed_content_before_writing():
+    storage = MemoryStorage()
+    body = multipart_body(b"This is just a text file, not an image.")
+
+    with patch("app.services.ingest.storage_service", storage):
+        with pytest.raises(HTTPException) as exc_info:
+            await make_ingest(make_request(body)).ingest()
+
+    assert exc_info.value.status_code == 400
+    assert "Invalid file content type" in exc_info.value.detail
+    assert storage.files == {}
+
+
+@pytest.mark.asyncio
+async def test_ingest_rejects_disallowed_extension():
+    storage = MemoryStorage()
+    body = multipart_body(make_png(), filename="photo.exe")
+
+    with patch("app.services.ingest.storage_service", storage):
+        with pytest.raises(HTTPException) as exc_info:
+            await make_ingest(make_request(body)).ingest()
+
+    assert exc_info.value.status_code == 400
+    assert "Invalid file extension" in exc_info.value.detail
+
+
+@pytest.mark.asyncio
+async def test_ingest_enforces_size_limit_and_aborts_writer():
+    content = make_png((400, 400))
+    storage = MemoryStorage()
+
+    with patch("app.services.ingest.storage_service", storage):
+        with pytest.raises(HTTPException) as exc_info:
+            await make_ingest(
+                make_request(multipart_body(content)), max_size=len(content) - 1
+            ).ingest()
+
+    assert exc_info.value.status_code == 413
+    assert storage.files == {}
+
+
+@pytest.mark.asyncio
+async def test_ingest_requires_file_field():
+    body = multipart_body(make_png(), field="attachment")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await make_ingest(make_request(body)).ingest()
+
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_upload_succeeds_and_is_hashed_when_variant_task_cannot_be_queued():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    claim_id = uuid.uuid4()
+    async with factory() as db:
+        db.add(
+            Claim(id=claim_id, policy_number="POL-1", claim_number="CLM-2024-000001")
+        )
+        await db.commit()
+
+    async def override_get_db():
+        async with factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    storage = MemoryStorage()
+    try:
+        with (
+            patch("app.services.ingest.storage_service", storage),
+            patch("app.api.v1.endpoints.claims.storage_service", storage),
+            patch(
+                "app.api.v1.endpoints.claims.generate_photo_variants_task.delay",
+                side_effect=ConnectionError("broker down"),
+            ),
+        ):
+            transport = ASGITransport(app=app)
+            async with AsyncClient(transport=transport, base_url="http://test") as ac:
+                response = await ac.post(
+                    f"{settings.API_V1_STR}/claims/{claim_id}/photos",
+                    files={"file": ("photo.png", make_png(), "image/png")},
+                    headers={"x-api-key": settings.API_KEY},
+                )
+        async with factory() as db:
+            photo = (await db.execute(select(ClaimPhoto))).scalars().one()
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    assert response.status_code == 200
+    assert response.json()["photo_url"] == "uploads/stored.png"
+    # Fingerprinted at upload, so duplicate checks do not need the variants task
+    assert photo.phash is not None
+    assert photo.phash_band0 is not None
@@ -0,0 +1,162 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.llm_limiter import AdaptiveConcurrencyLimiter
+from app.core.metrics import metrics
+from app.services.ai_service import ClaudeAIService
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(
+            headers={"retry-after": retry_after} if retry_after else {}
+        )
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_callers_beyond_the_limit_in_order():
+    metrics.reset()
+    limiter = AdaptiveConcurrencyLimiter("test_llm", max_limit=2)
+    release = asyncio.Event()
+    order = []
+
+    async def call(i):
+        async with limiter.slot():
+            order.append(i)
+            await release.wait()
+
+    tasks = [asyncio.create_task(call(i)) for i in range(4)]
+    await asyncio.sleep(0)
+
+    assert limiter.in_flight == 2
+    assert limiter.queue_depth == 2
+    assert metrics.get("test_llm.queue_depth") == 2
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == [0, 1, 2, 3]
+    assert limiter.in_flight == 0
+    assert metrics.get("test_llm.queue_depth") == 0
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_limit_once_per_window_and_success_regrows_it():
+    limiter = AdaptiveConcurrencyLimiter("test_llm", max_limit=8)
+
+    async with limiter.slot() as first, limiter.slot() as second:
+        limiter.record_overload(first)
+        # Started before the decrease: same congestion event
+        limiter.record_overload(second)
+    assert limiter.limit == 4
+
+    async with limiter.slot() as later:
+        limiter.record_overload(later)
+    assert limiter.limit == 2
+
+    # Additive increase: roughly one slot per limit's worth of successes
+    for _ in range(2):
+        limiter.record_success()
+    assert limiter.limit == 2
+    limiter.record_success()
+    assert limiter.limit == 3
+
+    for _ in range(100):
+        limiter.record_success()
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place():
+    limiter = AdaptiveConcurrencyLimiter("test_llm", max_limit=1)
+    async with limiter.slot():
+        waiter = asyncio.create_task(limiter.slot().__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queue_depth == 0
+
+    async with limiter.slot():
+        assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_waiter_cancelled_before_wake_runs_still_raises_cancelled():
+    limiter = AdaptiveConcurrencyLimiter("test_llm", max_limit=1)
+    async with limiter.slot():
+        waiter = asyncio.create_task(limiter.slot().__aenter__())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        # Wakes (and drops) the cancelled waiter before its task resumes
+        limiter.configure(max_limit=2)
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 1
+
+
+def make_service(side_effect):
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.ainvoke = AsyncMock(side_effect=side_effect)
+    service.llm_limiter = AdaptiveConcurrencyLimiter("test_llm", max_limit=4)
+    return service
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_calls_are_retried_with_backoff():
+    metrics.reset()
+    response = MagicMock(content="{}")
+    service = make_service([FakeAPIError(429), FakeAPIError(529, "3"), response])
+
+    with patch("app.services.ai_service.asyncio.sleep", new=AsyncMock()) as sleep:
+        assert await service._invoke_with_retries([]) is response
+
+    assert service.client.ainvoke.await_count == 3
+    assert metrics.get("llm.retries") == 2
+    assert metrics.get("test_llm.overloaded") == 2
+    # Retry-After is honoured over a shorter jittered delay
+    assert sleep.await_args_list[1].args[0] >= 3
+    assert service.llm_limiter.limit < 4
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_errors_fail_without_retrying():
+    service = make_service([FakeAPIError(400)])
+
+    with patch("app.services.ai_service.asyncio.sleep", new=AsyncMock()) as sleep:
+        with pytest.raises(FakeAPIError):
+            await service._invoke_with_retries([])
+
+    sleep.assert_not_awaited()
+    assert service.llm_limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_exhausted_retries_return_zero_confidence_result(tmp_path):
+    photo = tmp_path / "photo.jpg"
+    photo.write_bytes(b"fake image bytes")
+    service = make_service(FakeAPIError(429))
+    vision = AsyncMock()
+    vision.detect_damage.return_value = {"status": "error", "detections": []}
+
+    with (
+        patch("app.services.ai_service.settings.AI_CACHE_ENABLED", False),
+        patch("app.services.ai_service.settings.LLM_STREAMING", False),
+        patch("app.services.ai_service.settings.LLM_MAX_RETRIES", 2),
+        patch("app.services.ai_service.vision_batcher", vision),
+        patch("app.services.ai_service.asyncio.sleep", new=AsyncMock()),
+    ):
+        result = await service.assess_damage(
+            photo_urls=[str(photo)],
+            vehicle_info={"make": "Toyota", "model": "Camry", "year": 2020},
+            incident_info={"description": "Rear-end collision", "date": "2024-03-01"},
+        )
+
+    assert service.client.ainvoke.await_count == 3
+    assert result["confidence"] == 0.0
+    assert result["estimated_cost"] == 0.0
@@ -1,7 +1,13 @@
+import json
+import time
+from unittest.mock import patch
+
 import pytest
 from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
 
+from app.core.config import settings
+from app.core.metrics import PUBLISHED_KEY, metrics
 from app.main import app
 
 client = TestClient(app)
@@ -45,3 +51,47 @@ def test_health_check():
     assert data["status"] == "healthy"
     assert data["service"] == "widle-insure-api"
     assert "database" in data
+
+
+class FakeHashRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    async def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def hdel(self, key, field):
+        self.hashes.get(key, {}).pop(field, None)
+
+
+def test_metrics_requires_api_key():
+    response = client.get("/metrics")
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_published_worker_snapshots():
+    redis_client = FakeHashRedis()
+    metrics.reset()
+    metrics.increment("ai_cache.hits")
+    with patch("app.core.metrics.process_id", return_value="worker-1"):
+        await metrics.publish(redis_client, "async-worker")
+    stale = {"role": "async-worker", "published_at": time.time() - 3600}
+    await redis_client.hset(PUBLISHED_KEY, "worker-0", json.dumps(stale))
+    metrics.reset()
+
+    transport = ASGITransport(app=app)
+    with patch(
+        "app.api.v1.endpoints.health.get_redis_client", return_value=redis_client
+    ):
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.get("/metrics", headers={"x-api-key": settings.API_KEY})
+
+    assert response.status_code == 200
+    workers = response.json()["workers"]
+    assert list(workers) == ["worker-1"]
+    assert workers["worker-1"]["counters"] == {"ai_cache.hits": 1}
+    assert "worker-0" not in redis_client.hashes[PUBLISHED_KEY]
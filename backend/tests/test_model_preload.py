@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock, patch
+
+from app.core.celery_app import preload_worker_models
+from app.services.fraud_service import MLFraudDetectionService
+from app.services.model_preload import preload_models
+from app.services.vision_service import YoloVisionService
+
+
+def test_vision_model_is_not_loaded_until_first_use():
+    with patch("app.services.vision_service.HAS_YOLO", False):
+        service = YoloVisionService()
+        assert service._model_loaded is False
+
+        assert service.model is None
+        assert service._model_loaded is True
+
+
+def test_fraud_model_loads_once_across_calls():
+    service = MLFraudDetectionService()
+    model = MagicMock()
+    with (
+        patch("app.services.fraud_service.os.path.exists", return_value=True),
+        patch("app.services.fraud_service.joblib.load", return_value=model) as load,
+    ):
+        assert service.load() is model
+        assert service.model is model
+        assert service.load() is model
+
+    load.assert_called_once()
+
+
+def test_failed_load_is_not_retried_per_call():
+    service = MLFraudDetectionService()
+    with (
+        patch("app.services.fraud_service.os.path.exists", return_value=True),
+        patch(
+            "app.services.fraud_service.joblib.load", side_effect=OSError("corrupt")
+        ) as load,
+    ):
+        assert service.model is None
+        assert service.model is None
+
+    load.assert_called_once()
+
+
+def test_preload_models_loads_both_singletons():
+    with (
+        patch("app.services.model_preload.yolo_vision_service") as vision,
+        patch("app.services.model_preload.fraud_detection_service") as fraud,
+    ):
+        preload_models()
+
+    vision.load.assert_called_once()
+    fraud.load.assert_called_once()
+
+
+def test_celery_parent_preloads_then_freezes_gc():
+    calls = []
+    with (
+        patch("app.core.celery_app.settings.PRELOAD_MODELS", True),
+        patch(
+            "app.services.model_preload.preload_models",
+            side_effect=lambda: calls.append("preload"),
+        ),
+        patch(
+            "app.core.celery_app.gc.freeze", side_effect=lambda: calls.append("freeze")
+        ),
+    ):
+        preload_worker_models()
+
+    assert calls == ["preload", "freeze"]
+
+
+def test_celery_preload_can_be_disabled():
+    with (
+        patch("app.core.celery_app.settings.PRELOAD_MODELS", False),
+        patch("app.services.model_preload.preload_models") as preload,
+        patch("app.core.celery_app.gc.freeze") as freeze,
+    ):
+        preload_worker_models()
+
+    preload.assert_not_called()
+    freeze.assert_not_called()
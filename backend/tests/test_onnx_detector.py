@@ -0,0 +1,126 @@
+import importlib.util
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.onnx_detector import (
+    OnnxYoloDetector,
+    decode_predictions,
+    letterbox,
+    non_max_suppression,
+)
+from app.services.vision_service import YoloVisionService
+
+requires_cv2 = pytest.mark.skipif(
+    importlib.util.find_spec("cv2") is None, reason="opencv is not installed"
+)
+
+
+class FakeSession:
+    """Returns one fixed raw YOLOv8 output per image in the batch."""
+
+    def __init__(self, output, batch="batch"):
+        self.output = output
+        self.batch = batch
+        self.inputs = []
+
+    def get_inputs(self):
+        return [
+            SimpleNamespace(
+                name="images", type="tensor(float)", shape=[self.batch, 3, 64, 64]
+            )
+        ]
+
+    def run(self, output_names, feed):
+        batch = feed["images"]
+        self.inputs.append(batch)
+        return [np.repeat(self.output[None], len(batch), axis=0)]
+
+
+def raw_output(rows):
+    """Build a (4 + 2 classes, anchors) output from (cx, cy, w, h, s0, s1) rows."""
+    return np.array(rows, dtype=np.float32).T
+
+
+@requires_cv2
+def test_letterbox_keeps_aspect_ratio_and_centres_padding():
+    image = np.zeros((32, 64, 3), dtype=np.uint8)
+
+    padded, gain, pad = letterbox(image, (64, 64))
+
+    assert padded.shape == (64, 64, 3)
+    assert gain == 1.0
+    assert pad == (0, 16)
+    assert padded[0, 0].tolist() == [114, 114, 114]
+
+
+def test_nms_keeps_best_of_overlapping_boxes():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=float)
+    scores = np.array([0.6, 0.9, 0.5])
+
+    assert non_max_suppression(boxes, scores, 0.5).tolist() == [1, 2]
+
+
+def test_decode_maps_boxes_back_and_applies_thresholds_per_class():
+    output = raw_output(
+        [
+            [20, 26, 8, 4, 0.9, 0.0],
+            # Overlaps the first box but is another class: kept
+            [20, 26, 8, 4, 0.0, 0.8],
+            # Same class, same place, lower score: suppressed
+            [20, 26, 8, 4, 0.7, 0.0],
+            # Below the confidence threshold
+            [40, 40, 8, 8, 0.1, 0.1],
+        ]
+    )
+
+    result = decode_predictions(output, gain=0.5, pad=(0, 16), image_shape=(64, 128))
+
+    assert [int(box.cls[0].item()) for box in result.boxes] == [0, 1]
+    assert [round(box.conf[0].item(), 2) for box in result.boxes] == [0.9, 0.8]
+    assert result.boxes[0].xyxy[0].tolist() == [32.0, 16.0, 48.0, 24.0]
+
+
+@requires_cv2
+def test_detector_batches_images_and_splits_static_batches():
+    output = raw_output([[32, 32, 10, 10, 0.0, 0.95]])
+    images = [np.zeros((64, 64, 3), dtype=np.uint8) for _ in range(3)]
+
+    dynamic = FakeSession(output)
+    results = OnnxYoloDetector(dynamic, names={1: "dent"})(images)
+    assert len(results) == 3
+    assert [batch.shape for batch in dynamic.inputs] == [(3, 3, 64, 64)]
+    assert dynamic.inputs[0].dtype == np.float32
+
+    static = FakeSession(output, batch=1)
+    OnnxYoloDetector(static)(images)
+    assert [len(batch) for batch in static.inputs] == [1, 1, 1]
+
+
+@requires_cv2
+def test_vision_service_uses_onnx_detector_results():
+    output = raw_output([[32, 32, 10, 10, 0.0, 0.95]])
+    with patch("app.services.vision_service.HAS_YOLO", False):
+        service = YoloVisionService()
+    service.model = OnnxYoloDetector(FakeSession(output))
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+
+    with patch.object(service, "_decode_image", return_value=image):
+        result = service.detect_damage(["uploads/a.jpg"])
+
+    assert result["highest_severity"] == "moderate"
+    assert result["detections"][0]["class"] == "moderate_damage"
+    assert result["detections"][0]["box"] == [27.0, 27.0, 37.0, 37.0]
+
+
+def test_onnx_backend_falls_back_to_torch_path_when_unavailable():
+    with (
+        patch("app.services.vision_service.settings.VISION_BACKEND", "onnx"),
+        patch("app.services.vision_service.HAS_YOLO", False),
+        patch.object(YoloVisionService, "_load_onnx", return_value=None) as load_onnx,
+    ):
+        assert YoloVisionService().model is None
+
+    load_onnx.assert_called_once()
@@ -1,241 +1,209 @@
 import uuid
-from unittest.mock import AsyncMock, MagicMock, patch
+from datetime import datetime
+from unittest.mock import MagicMock, patch
 
 import pytest
 import stripe
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
 
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import Base, get_db
 from app.main import app
+from app.models.claims import Claim, ClaimAuditLog
+from app.models.payouts import Payout
 
+auth_headers = {"x-api-key": settings.API_KEY}
 
-@pytest.mark.asyncio
-async def test_initiate_payout_unauthorized():
-    transport = ASGITransport(app=app)
-    claim_id = uuid.uuid4()
-    async with AsyncClient(transport=transport, base_url="http://test") as client:
-        response = await client.post(f"{settings.API_V1_STR}/payments/{claim_id}/payout")
-
-    assert response.status_code == 403
-
-
-@pytest.mark.asyncio
-async def test_initiate_payout_claim_not_found():
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
 
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = None
-    mock_db.execute.return_value = mock_result
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
 
     async def override_get_db():
-        yield mock_db
+        async with factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
+    yield factory
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+async def create_claim(session_factory, status="Approved", approved_amount=1000.00):
+    claim = Claim(
+        id=uuid.uuid4(),
+        policy_number="POL-123456789",
+        claim_number="CLM-2024-001234",
+        claimant_name="John Doe",
+        claimant_email="john.doe@example.com",
+        claimant_phone="555-0123",
+        incident_date=datetime(2024, 1, 1, 12),
+        incident_location="New York, NY",
+        incident_description="Fender bender at intersection",
+        vehicle_vin="1HGCM82633A004123",
+        vehicle_make="Honda",
+        vehicle_model="Accord",
+        vehicle_year=2022,
+        status=status,
+        approved_amount=approved_amount,
+    )
+    async with session_factory() as db:
+        db.add(claim)
+        await db.commit()
+    return claim
+
 
+async def post_payout(claim_id, headers=auth_headers):
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
-        response = await client.post(
-            f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-            headers=auth_headers,
+        return await client.post(
+            f"{settings.API_V1_STR}/payments/{claim_id}/payout", headers=headers
         )
 
-    app.dependency_overrides.clear()
 
-    assert response.status_code == 404
-    assert response.json()["detail"] == "Claim not found"
+async def stored(session_factory, claim_id):
+    async with session_factory() as db:
+        claim = await db.get(Claim, claim_id)
+        payout = (
+            await db.execute(select(Payout).where(Payout.claim_id == claim_id))
+        ).scalar_one_or_none()
+    return claim, payout
 
 
 @pytest.mark.asyncio
-async def test_initiate_payout_claim_not_approved(mock_claim_class):
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
+async def test_initiate_payout_unauthorized():
+    response = await post_payout(uuid.uuid4(), headers={})
 
-    mock_claim = mock_claim_class(claim_id, {})
-    mock_claim.status = "New"
+    assert response.status_code == 403
 
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_claim
-    mock_db.execute.return_value = mock_result
 
-    async def override_get_db():
-        yield mock_db
+@pytest.mark.asyncio
+async def test_initiate_payout_claim_not_found(session_factory):
+    response = await post_payout(uuid.uuid4())
 
-    app.dependency_overrides[get_db] = override_get_db
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Claim not found"
 
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as client:
-        response = await client.post(
-            f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-            headers=auth_headers,
-        )
 
-    app.dependency_overrides.clear()
+@pytest.mark.asyncio
+async def test_initiate_payout_claim_not_approved(session_factory):
+    claim = await create_claim(session_factory, status="New")
+
+    response = await post_payout(claim.id)
 
     assert response.status_code == 400
     assert response.json()["detail"] == "Only approved claims can be paid out"
 
 
 @pytest.mark.asyncio
-async def test_initiate_payout_amount_zero(mock_claim_class):
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
-
-    mock_claim = mock_claim_class(claim_id, {})
-    mock_claim.status = "Approved"
-    mock_claim.approved_amount = 0
+async def test_initiate_payout_amount_zero(session_factory):
+    claim = await create_claim(session_factory, approved_amount=0)
 
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_claim
-    mock_db.execute.return_value = mock_result
-
-    async def override_get_db():
-        yield mock_db
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    with patch("app.api.v1.endpoints.payments.getattr") as mock_getattr:
-        mock_getattr.side_effect = lambda obj, attr, default=None: "test_stripe_key" if attr == "STRIPE_SECRET_KEY" else getattr(obj, attr, default)
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            response = await client.post(
-                f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-                headers=auth_headers,
-            )
-
-    app.dependency_overrides.clear()
+    with patch(
+        "app.services.payout_service.settings.STRIPE_SECRET_KEY", "test_stripe_key"
+    ):
+        response = await post_payout(claim.id)
 
     assert response.status_code == 500
     assert response.json()["detail"] == "Internal server error during payout"
+    claim, payout = await stored(session_factory, claim.id)
+    assert claim.status == "Approved"
+    assert payout is None
 
 
 @pytest.mark.asyncio
-async def test_initiate_payout_stripe_success(mock_claim_class):
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
-
-    mock_claim = mock_claim_class(claim_id, {})
-    mock_claim.status = "Approved"
-    mock_claim.approved_amount = 1000.00
-
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_claim
-    mock_db.execute.return_value = mock_result
-
-    async def override_get_db():
-        yield mock_db
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    with patch("app.api.v1.endpoints.payments.getattr") as mock_getattr, \
-         patch("stripe.Transfer.create") as mock_transfer_create:
-
-        mock_getattr.side_effect = lambda obj, attr, default=None: "test_stripe_key" if attr == "STRIPE_SECRET_KEY" else getattr(obj, attr, default)
-
+async def test_initiate_payout_stripe_success(session_factory):
+    claim = await create_claim(session_factory)
+
+    with (
+        patch(
+            "app.services.payout_service.settings.STRIPE_SECRET_KEY", "test_stripe_key"
+        ),
+        patch("stripe.Transfer.create") as mock_transfer_create,
+    ):
         mock_transfer = MagicMock()
         mock_transfer.id = "tr_123456"
         mock_transfer_create.return_value = mock_transfer
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            response = await client.post(
-                f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-                headers=auth_headers,
-            )
-
-    app.dependency_overrides.clear()
+        response = await post_payout(claim.id)
 
     assert response.status_code == 200
-    assert mock_claim.status == "Paid"
+    assert response.json()["status"] == "Paid"
     mock_transfer_create.assert_called_once_with(
         amount=100000,
         currency="usd",
         destination="acct_1032D82eZvKYlo2C",
-        description=f"Insurance claim payout: {mock_claim.claim_number}"
+        description=f"Insurance claim payout: {claim.claim_number}",
+        idempotency_key=f"claim-payout-{claim.id}",
     )
+    claim, payout = await stored(session_factory, claim.id)
+    assert claim.status == "Paid"
+    assert (payout.status, payout.transfer_id, payout.attempts) == (
+        "paid",
+        "tr_123456",
+        1,
+    )
+    assert float(payout.amount) == 1000.0
 
 
 @pytest.mark.asyncio
-async def test_initiate_payout_mock_success(mock_claim_class):
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
-
-    mock_claim = mock_claim_class(claim_id, {})
-    mock_claim.status = "Approved"
-    mock_claim.approved_amount = 1000.00
+async def test_initiate_payout_mock_success(session_factory):
+    claim = await create_claim(session_factory)
 
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_claim
-    mock_db.execute.return_value = mock_result
-
-    async def override_get_db():
-        yield mock_db
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    with patch("app.api.v1.endpoints.payments.getattr") as mock_getattr:
-        mock_getattr.side_effect = lambda obj, attr, default=None: None if attr == "STRIPE_SECRET_KEY" else getattr(obj, attr, default)
-
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            response = await client.post(
-                f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-                headers=auth_headers,
-            )
-
-    app.dependency_overrides.clear()
+    with patch("app.services.payout_service.settings.STRIPE_SECRET_KEY", None):
+        response = await post_payout(claim.id)
 
     assert response.status_code == 200
-    assert mock_claim.status == "Paid"
+    claim, payout = await stored(session_factory, claim.id)
+    assert claim.status == "Paid"
+    assert payout.transfer_id.startswith("tr_mock_")
+    async with session_factory() as db:
+        log = (await db.execute(select(ClaimAuditLog))).scalars().one()
+    assert log.action == "payout"
+    assert log.details["transfer_id"] == payout.transfer_id
 
 
 @pytest.mark.asyncio
-async def test_initiate_payout_stripe_error(mock_claim_class):
-    auth_headers = {"x-api-key": settings.API_KEY}
-    claim_id = uuid.uuid4()
-
-    mock_claim = mock_claim_class(claim_id, {})
-    mock_claim.status = "Approved"
-    mock_claim.approved_amount = 1000.00
-
-    mock_db = AsyncMock()
-    mock_result = MagicMock()
-    mock_result.scalars.return_value.first.return_value = mock_claim
-    mock_db.execute.return_value = mock_result
-
-    async def override_get_db():
-        yield mock_db
-
-    app.dependency_overrides[get_db] = override_get_db
-
-    with patch("app.api.v1.endpoints.payments.getattr") as mock_getattr, \
-         patch("stripe.Transfer.create") as mock_transfer_create:
-
-        mock_getattr.side_effect = lambda obj, attr, default=None: "test_stripe_key" if attr == "STRIPE_SECRET_KEY" else getattr(obj, attr, default)
-
-        # Override the property
-        class MockStripeError(stripe.error.StripeError):
-            @property
-            def user_message(self):
-                return "Test user message"
-
+async def test_initiate_payout_stripe_error(session_factory):
+    claim = await create_claim(session_factory)
+
+    # Override the property
+    class MockStripeError(stripe.error.StripeError):
+        @property
+        def user_message(self):
+            return "Test user message"
+
+    with (
+        patch(
+            "app.services.payout_service.settings.STRIPE_SECRET_KEY", "test_stripe_key"
+        ),
+        patch("stripe.Transfer.create") as mock_transfer_create,
+    ):
         mock_transfer_create.side_effect = MockStripeError("Test Error")
+        response = await post_payout(claim.id)
 
-        transport = ASGITransport(app=app)
-        async with AsyncClient(transport=transport, base_url="http://test") as client:
-            response = await client.post(
-                f"{settings.API_V1_STR}/payments/{claim_id}/payout",
-                headers=auth_headers,
-            )
+        assert response.status_code == 502
+        assert response.json()["detail"] == "Payment gateway error: Test user message"
+        claim, payout = await stored(session_factory, claim.id)
+        assert claim.status == "Approved"
+        assert (payout.status, payout.attempts) == ("failed", 1)
 
-    app.dependency_overrides.clear()
+        # A retry reuses the payout record and its idempotency key
+        mock_transfer_create.side_effect = None
+        mock_transfer_create.return_value = MagicMock(id="tr_retry")
+        response = await post_payout(claim.id)
 
-    assert response.status_code == 502
-    assert response.json()["detail"] == "Payment gateway error: Test user message"
+    assert response.status_code == 200
+    claim, payout = await stored(session_factory, claim.id)
+    assert (payout.status, payout.transfer_id, payout.attempts) == (
+        "paid",
+        "tr_retry",
+        2,
+    )
+    keys = {c.kwargs["idempotency_key"] for c in mock_transfer_create.call_args_list}
+    assert keys == {f"claim-payout-{claim.id}"}
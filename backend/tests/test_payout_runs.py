@@ -0,0 +1,162 @@
+import asyncio
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.database import Base
+from app.main import app
+from app.models.claims import Claim, ClaimAuditLog
+from app.models.payouts import Payout
+from app.services.payout_runs import run_payouts
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def seed(session_factory, *claims):
+    async with session_factory() as db:
+        rows = [
+            Claim(
+                id=uuid.uuid4(),
+                policy_number="POL-1",
+                claim_number=f"CLM-{i}",
+                status=status,
+                approved_amount=amount,
+            )
+            for i, (status, amount) in enumerate(claims)
+        ]
+        db.add_all(rows)
+        await db.commit()
+    return [row.id for row in rows]
+
+
+async def statuses(session_factory):
+    async with session_factory() as db:
+        claims = (await db.execute(select(Claim))).scalars().all()
+        payouts = (await db.execute(select(Payout))).scalars().all()
+    return (
+        {claim.id: claim.status for claim in claims},
+        {payout.claim_id: payout for payout in payouts},
+    )
+
+
+class FakeStripe:
+    """create_transfer stand-in recording peak concurrency and failing on demand."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, claim):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if claim.id in self.failing:
+                raise RuntimeError("card_declined")
+            return f"tr_{claim.claim_number}"
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_run_pays_approved_claims_in_batches_with_bounded_concurrency(
+    session_factory,
+):
+    ids = await seed(
+        session_factory,
+        *[("Approved", 100.0 + i) for i in range(5)],
+        ("Manual Review", 500.0),
+        ("Approved", 0),
+    )
+    stripe = FakeStripe()
+
+    with patch("app.services.payout_runs.payout_service.create_transfer", stripe):
+        report = await run_payouts(
+            batch_size=2, concurrency=2, session_factory=session_factory
+        )
+
+    assert (report.paid, report.failed, report.batches) == (5, 0, 3)
+    assert report.amount_paid == pytest.approx(510.0)
+    assert stripe.peak == 2
+
+    claims, payouts = await statuses(session_factory)
+    assert [claims[claim_id] for claim_id in ids] == ["Paid"] * 5 + [
+        "Manual Review",
+        "Approved",
+    ]
+    assert {payout.transfer_id for payout in payouts.values()} == {
+        f"tr_CLM-{i}" for i in range(5)
+    }
+    async with session_factory() as db:
+        logs = (await db.execute(select(ClaimAuditLog))).scalars().all()
+    assert {log.action for log in logs} == {"payout"}
+    assert len(logs) == 5
+
+
+@pytest.mark.asyncio
+async def test_failed_payouts_are_retried_by_later_runs_up_to_the_limit(
+    session_factory,
+):
+    ok, declined = await seed(session_factory, ("Approved", 100.0), ("Approved", 200.0))
+    stripe = FakeStripe(failing={declined})
+
+    with patch("app.services.payout_runs.payout_service.create_transfer", stripe):
+        first = await run_payouts(max_attempts=2, session_factory=session_factory)
+        second = await run_payouts(max_attempts=2, session_factory=session_factory)
+        third = await run_payouts(max_attempts=2, session_factory=session_factory)
+
+    assert (first.paid, first.failed) == (1, 1)
+    assert first.failures == [{"claim_id": str(declined), "error": "card_declined"}]
+    assert (second.paid, second.failed) == (0, 1)
+    # Attempts exhausted: left for manual handling
+    assert third.claims_selected == 0
+
+    claims, payouts = await statuses(session_factory)
+    assert claims[ok] == "Paid"
+    assert claims[declined] == "Approved"
+    assert (payouts[declined].status, payouts[declined].attempts) == ("failed", 2)
+    assert payouts[declined].last_error == "card_declined"
+
+
+@pytest.mark.asyncio
+async def test_mocked_stripe_run_end_to_end(session_factory):
+    [claim_id] = await seed(session_factory, ("Approved", 250.0))
+
+    with patch("app.services.payout_service.settings.STRIPE_SECRET_KEY", None):
+        report = await run_payouts(session_factory=session_factory)
+
+    assert report.paid == 1
+    _, payouts = await statuses(session_factory)
+    assert payouts[claim_id].transfer_id.startswith("tr_mock_")
+    assert payouts[claim_id].idempotency_key == f"claim-payout-{claim_id}"
+
+
+@pytest.mark.asyncio
+async def test_payout_run_endpoint_queues_the_job():
+    task = MagicMock()
+    task.delay.return_value = MagicMock(id="task-123")
+
+    with patch("app.api.v1.endpoints.payments.payout_run_task", task):
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(
+                f"{settings.API_V1_STR}/payments/payout-runs",
+                headers={"x-api-key": settings.API_KEY},
+            )
+
+    assert response.status_code == 202
+    assert response.json()["task_id"] == "task-123"
+    task.delay.assert_called_once_with()
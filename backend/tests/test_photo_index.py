@@ -0,0 +1,215 @@
+import hashlib
+import io
+import uuid
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.core.metrics import metrics
+from app.models.claims import Claim, ClaimPhoto
+from app.services.fraud_service import fraud_detection_service
+from app.services.photo_index import (
+    backfill_fingerprints,
+    band_columns,
+    compute_phash,
+    fill_missing_phashes,
+    find_by_sha256,
+    find_cross_claim_duplicates,
+    find_cross_claim_duplicates_batch,
+    find_near_duplicates,
+    hamming_distance,
+    phash_bands,
+    to_signed64,
+)
+
+
+def encode_scene(size=(800, 600), fmt="PNG", quality=95):
+    image = Image.new("RGB", (800, 600), color=(200, 200, 200))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 100, 400, 350), fill=(180, 30, 30))
+    draw.ellipse((450, 200, 700, 500), fill=(20, 40, 160))
+    output = io.BytesIO()
+    image.resize(size).save(output, format=fmt, quality=quality)
+    return output.getvalue()
+
+
+def encode_other_scene():
+    image = Image.new("RGB", (800, 600), color=(30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((500, 50, 750, 550), fill=(250, 250, 90))
+    draw.line((0, 600, 800, 0), fill=(0, 200, 0), width=40)
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_photo(db, claim, phash, sha256=None):
+    photo = ClaimPhoto(
+        claim_id=claim.id,
+        photo_url=f"uploads/{uuid.uuid4()}.jpg",
+        sha256=sha256,
+        **band_columns(phash),
+    )
+    db.add(photo)
+    await db.commit()
+    return photo
+
+
+async def add_claim(db):
+    claim = Claim(policy_number="POL-1", claim_number=f"CLM-{uuid.uuid4()}")
+    db.add(claim)
+    await db.commit()
+    return claim
+
+
+def test_phash_survives_resize_and_reencode():
+    original = compute_phash(encode_scene())
+    resized = compute_phash(encode_scene(size=(400, 300), fmt="JPEG", quality=60))
+    other = compute_phash(encode_other_scene())
+
+    assert hamming_distance(original, resized) <= 3
+    assert hamming_distance(original, other) > 10
+
+
+def test_phash_fits_signed_bigint_and_bands_roundtrip():
+    phash = -1  # all 64 bits set
+    assert phash_bands(phash) == [0xFFFF] * 4
+    columns = band_columns(phash)
+    assert columns["phash"] == -1
+    assert columns["phash_band3"] == 0xFFFF
+    assert band_columns(None) == {}
+
+
+def test_compute_phash_returns_none_for_undecodable_bytes():
+    assert compute_phash(b"not an image") is None
+
+
+@pytest.mark.asyncio
+async def test_band_lookup_finds_near_duplicates_only(db):
+    base = 0x0123456789ABCDEF
+    # Three flipped bits, spread over three different bands
+    near = base ^ (1 | (1 << 20) | (1 << 40))
+    far = to_signed64(base ^ 0xFFFF0000FFFF0000)
+
+    claim_a, claim_b = await add_claim(db), await add_claim(db)
+    near_photo = await add_photo(db, claim_a, near)
+    await add_photo(db, claim_a, far)
+    await add_photo(db, claim_b, base)
+
+    matches = await find_near_duplicates(db, base, exclude_claim_id=claim_b.id)
+
+    assert [(photo.id, distance) for photo, distance in matches] == [(near_photo.id, 3)]
+    with pytest.raises(ValueError):
+        await find_near_duplicates(db, base, max_distance=8)
+
+
+@pytest.mark.asyncio
+async def test_cross_claim_duplicates_and_fraud_flag(db):
+    claim_a, claim_b = await add_claim(db), await add_claim(db)
+    await add_photo(db, claim_a, 42, sha256="a" * 64)
+    own = await add_photo(db, claim_b, 42)
+
+    duplicates = await find_cross_claim_duplicates(db, claim_b.id, [own])
+
+    assert len(duplicates) == 1
+    assert duplicates[0]["matched_claim_id"] == str(claim_a.id)
+    assert duplicates[0]["distance"] == 0
+    assert (await find_by_sha256(db, "a" * 64)).claim_id == claim_a.id
+
+    flagged = fraud_detection_service.apply_duplicate_photo_risk(
+        {"is_anomaly": False, "risk_score": 10, "method": "heuristic"}, duplicates
+    )
+    assert flagged["is_anomaly"] is True
+    assert flagged["risk_score"] == 50
+    assert flagged["duplicate_photos"] == duplicates
+
+
+@pytest.mark.asyncio
+async def test_batch_lookup_matches_per_claim_lookup(db):
+    base = 0x0123456789ABCDEF
+    claim_a, claim_b, claim_c = (
+        await add_claim(db),
+        await add_claim(db),
+        await add_claim(db),
+    )
+    await add_photo(db, claim_a, base)
+    near = await add_photo(db, claim_b, base ^ 0b101)
+    # Same photo twice on one claim is not a cross-claim duplicate
+    await add_photo(db, claim_c, to_signed64(base ^ 0xFFFF0000FFFF0000))
+    await add_photo(db, claim_c, to_signed64(base ^ 0xFFFF0000FFFF0000))
+
+    batch = await find_cross_claim_duplicates_batch(
+        db, [claim_a.id, claim_b.id, claim_c.id]
+    )
+
+    assert set(batch) == {claim_a.id, claim_b.id}
+    assert batch[claim_b.id] == await find_cross_claim_duplicates(
+        db, claim_b.id, [near]
+    )
+    assert batch[claim_a.id][0]["matched_claim_id"] == str(claim_b.id)
+    assert await find_cross_claim_duplicates_batch(db, [uuid.uuid4()]) == {}
+
+
+class PhotoFiles:
+    def __init__(self, files):
+        self.files = files
+
+    async def read_bytes(self, key):
+        if key not in self.files:
+            raise FileNotFoundError(key)
+        return self.files[key]
+
+
+@pytest.mark.asyncio
+async def test_unhashed_photos_are_hashed_before_the_duplicate_lookup(db):
+    claim_a, claim_b = await add_claim(db), await add_claim(db)
+    await add_photo(db, claim_a, compute_phash(encode_scene()))
+    # Uploaded before hashing happened at upload time
+    unhashed = await add_photo(db, claim_b, None)
+    missing = await add_photo(db, claim_b, None)
+    storage = PhotoFiles({unhashed.photo_url: encode_scene(fmt="JPEG")})
+    metrics.reset()
+
+    with patch("app.services.photo_index.storage_service", storage):
+        await fill_missing_phashes(db, [unhashed, missing])
+    duplicates = await find_cross_claim_duplicates(db, claim_b.id, [unhashed])
+
+    assert [d["matched_claim_id"] for d in duplicates] == [str(claim_a.id)]
+    await db.refresh(unhashed)
+    assert unhashed.phash_band0 is not None
+    # A photo that cannot be read is reported, not silently skipped
+    assert metrics.get("photo_index.unhashed_photos") == 1
+
+
+@pytest.mark.asyncio
+async def test_backfill_fingerprints_existing_photos(db):
+    claim = await add_claim(db)
+    content = encode_scene()
+    legacy = await add_photo(db, claim, None)
+    gone = await add_photo(db, claim, None)
+    done = await add_photo(db, claim, 7, sha256="b" * 64)
+    storage = PhotoFiles({legacy.photo_url: content, done.photo_url: b"unused"})
+
+    with patch("app.services.photo_index.storage_service", storage):
+        updated = await backfill_fingerprints(db, batch_size=1)
+
+    assert updated == 1
+    for photo in (legacy, gone, done):
+        await db.refresh(photo)
+    assert legacy.sha256 == hashlib.sha256(content).hexdigest()
+    assert legacy.phash == compute_phash(content)
+    assert (gone.sha256, gone.phash) == (None, None)
+    assert (done.sha256, done.phash) == ("b" * 64, 7)
@@ -1,13 +1,104 @@
+import asyncio
+import json
+import time
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
 import pytest
-from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.database import Base
+from app.core.metrics import metrics
 from app.main import app
+from app.models.policies import Policy
+from app.services.policy_store import PolicyStore, policy_store
 
-client = TestClient(app)
 headers = {"x-api-key": settings.API_KEY}
 
+POLICIES = [
+    {
+        "policy_number": "POL-123456789",
+        "holder_name": "John Doe",
+        "status": "Active",
+        "vehicle_vin": "5YJ3E1EA7NF000001",
+        "vehicle_info": "2022 Tesla Model 3",
+        "coverage_limit": 50000.0,
+        "deductible": 500.0,
+        "effective_date": date(2024, 1, 1),
+        "expiration_date": date(2025, 1, 1),
+    },
+    {
+        "policy_number": "POL-987654321",
+        "holder_name": "Jane Smith",
+        "status": "Expired",
+        "vehicle_vin": "2HGFC2F59KH000002",
+        "vehicle_info": "2019 Honda Civic",
+        "coverage_limit": 30000.0,
+        "deductible": 1000.0,
+        "effective_date": date(2023, 1, 1),
+        "expiration_date": date(2024, 1, 1),
+    },
+]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as db:
+        db.add_all([Policy(**policy) for policy in POLICIES])
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.fixture
+def redis_client():
+    client = FakeRedis()
+    with patch("app.services.policy_store.get_redis_client", return_value=client):
+        yield client
+
+
+@pytest.fixture
+async def client(session_factory, redis_client):
+    policy_store.clear()
+    transport = ASGITransport(app=app)
+    with patch.object(policy_store, "session_factory", session_factory):
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+    policy_store.clear()
+
 
+class CountingSessions:
+    def __init__(self, factory):
+        self.factory = factory
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self.factory()
+
+
+@pytest.mark.asyncio
 @pytest.mark.parametrize(
     "policy_number, req_headers, expected_status, expected_response",
     [
@@ -61,9 +152,183 @@ headers = {"x-api-key": settings.API_KEY}
         ),
     ],
 )
-def test_get_policy(policy_number, req_headers, expected_status, expected_response):
-    response = client.get(
+async def test_get_policy(
+    client, policy_number, req_headers, expected_status, expected_response
+):
+    response = await client.get(
         f"{settings.API_V1_STR}/policies/{policy_number}", headers=req_headers
     )
     assert response.status_code == expected_status
     assert response.json() == expected_response
+
+
+@pytest.mark.asyncio
+async def test_reads_are_served_from_memory_then_redis(session_factory, redis_client):
+    metrics.reset()
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=session_factory)
+
+    first = await store.get("POL-123456789")
+    assert first["coverage_limit"] == 50000.0
+    assert "policy:POL-123456789" in redis_client.data
+
+    # Writes that bypass the store are not seen while the entry is cached
+    async with session_factory() as db:
+        await db.execute(update(Policy).values(coverage_limit=1000))
+        await db.commit()
+    assert (await store.get("POL-123456789"))["coverage_limit"] == 50000.0
+
+    # Another process (empty local tier) is served by Redis
+    other = PolicyStore(maxsize=10, local_ttl=30, session_factory=session_factory)
+    assert (await other.get("POL-123456789"))["coverage_limit"] == 50000.0
+
+    assert metrics.get("policy_cache.misses") == 1
+    assert metrics.get("policy_cache.hits.local") == 1
+    assert metrics.get("policy_cache.hits.redis") == 1
+
+
+@pytest.mark.asyncio
+async def test_save_invalidates_both_tiers(session_factory, redis_client):
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=session_factory)
+    await store.get("POL-123456789")
+
+    async with session_factory() as db:
+        saved = await store.save(
+            db, "POL-123456789", status="Cancelled", coverage_limit=20000
+        )
+        created = await store.save(
+            db,
+            "POL-NEW",
+            holder_name="Sam Lee",
+            vehicle_vin=" 1hgcm82633a004123",
+            coverage_limit=15000,
+            effective_date=date(2026, 1, 1),
+            expiration_date=date(2027, 1, 1),
+        )
+
+    assert saved["status"] == "Cancelled"
+    assert "policy:POL-123456789" not in redis_client.data
+    refreshed = await store.get("POL-123456789")
+    assert refreshed["status"] == "Cancelled"
+    assert refreshed["coverage_limit"] == 20000.0
+
+    assert created["status"] == "Active"
+    assert created["deductible"] == 0.0
+    async with session_factory() as db:
+        by_vin = await store.find_by_vin(db, "1HGCM82633A004123")
+    assert [policy["policy_number"] for policy in by_vin] == ["POL-NEW"]
+
+
+@pytest.mark.asyncio
+async def test_redis_outage_falls_back_to_database(session_factory):
+    redis = AsyncMock()
+    redis.get.side_effect = ConnectionError("redis down")
+    redis.setex.side_effect = ConnectionError("redis down")
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=session_factory)
+
+    with patch("app.services.policy_store.get_redis_client", return_value=redis):
+        policy = await store.get("POL-987654321")
+        missing = await store.get("POL-NONEXISTENT")
+
+    assert policy["status"] == "Expired"
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load(session_factory, redis_client):
+    metrics.reset()
+    sessions = CountingSessions(session_factory)
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=sessions)
+
+    results = await asyncio.gather(*(store.get("POL-123456789") for _ in range(20)))
+
+    assert sessions.opened == 1
+    assert all(result["holder_name"] == "John Doe" for result in results)
+    # Callers get their own copies
+    results[0]["status"] = "Cancelled"
+    assert results[1]["status"] == "Active"
+    assert metrics.get("policy_cache.coalesced") == 19
+
+
+@pytest.mark.asyncio
+async def test_unknown_policy_numbers_are_cached_until_created(
+    session_factory, redis_client
+):
+    sessions = CountingSessions(session_factory)
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=sessions)
+
+    assert await store.get("POL-NEW") is None
+    assert await store.get("POL-NEW") is None
+    assert sessions.opened == 1
+    entry = json.loads(redis_client.data["policy:POL-NEW"])
+    assert entry["policy"] is None
+
+    # Another process is answered by the negative entry in Redis
+    other = PolicyStore(maxsize=10, local_ttl=30, session_factory=sessions)
+    assert await other.get("POL-NEW") is None
+    assert sessions.opened == 1
+
+    async with session_factory() as db:
+        await store.save(
+            db,
+            "POL-NEW",
+            holder_name="Sam Lee",
+            coverage_limit=15000,
+            effective_date=date(2026, 1, 1),
+            expiration_date=date(2027, 1, 1),
+        )
+    assert (await store.get("POL-NEW"))["holder_name"] == "Sam Lee"
+
+
+@pytest.mark.asyncio
+async def test_redis_entries_near_expiry_are_refreshed_early(
+    session_factory, redis_client
+):
+    metrics.reset()
+    sessions = CountingSessions(session_factory)
+    redis_client.data["policy:POL-123456789"] = json.dumps(
+        {
+            "policy": {"policy_number": "POL-123456789", "status": "Stale"},
+            "delta": 0.5,
+            "expiry": time.time() + 0.01,
+        }
+    )
+
+    lazy = PolicyStore(early_refresh_beta=0, session_factory=sessions)
+    assert (await lazy.get("POL-123456789"))["status"] == "Stale"
+    assert sessions.opened == 0
+
+    # With the recompute taking 0.5s, 10ms before expiry refreshes almost surely
+    with patch("app.services.policy_store.random.random", return_value=0.5):
+        eager = PolicyStore(early_refresh_beta=1.0, session_factory=sessions)
+        assert (await eager.get("POL-123456789"))["status"] == "Active"
+
+    assert sessions.opened == 1
+    assert metrics.get("policy_cache.early_refreshes") == 1
+    refreshed = json.loads(redis_client.data["policy:POL-123456789"])
+    assert refreshed["policy"]["status"] == "Active"
+    assert refreshed["expiry"] > time.time() + 3000
+
+
+@pytest.mark.asyncio
+async def test_load_racing_a_write_is_not_cached(session_factory, redis_client):
+    store = PolicyStore(maxsize=10, local_ttl=30, session_factory=session_factory)
+    loaded = asyncio.Event()
+    release = asyncio.Event()
+    original_load = store._load
+
+    async def slow_load(db, policy_number):
+        value = await original_load(db, policy_number)
+        loaded.set()
+        await release.wait()
+        return value
+
+    with patch.object(store, "_load", slow_load):
+        reader = asyncio.create_task(store.get("POL-123456789"))
+        await loaded.wait()
+        async with session_factory() as db:
+            await store.save(db, "POL-123456789", status="Cancelled")
+        release.set()
+        assert (await reader)["status"] == "Active"
+
+    assert "policy:POL-123456789" not in redis_client.data
+    assert (await store.get("POL-123456789"))["status"] == "Cancelled"
@@ -1,9 +1,13 @@
+import uuid
 from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
 
 import pytest
 from pydantic import ValidationError
 
-from app.schemas.claims import ClaimCreate
+from app.models.claims import ClaimPhoto
+from app.schemas.claims import ClaimCreate, ClaimPhotoResponse
+from app.services.storage import S3StorageBackend
 
 
 def get_valid_claim_data():
@@ -122,3 +126,34 @@ def test_required_fields():
     with pytest.raises(ValidationError) as excinfo:
         ClaimCreate(**data)
     assert "Field required" in str(excinfo.value)
+
+
+def make_photo():
+    return ClaimPhoto(
+        id=uuid.uuid4(),
+        photo_url="uploads/a.jpg",
+        thumbnail_url="uploads/a_thumb.jpg",
+        uploaded_at=datetime(2024, 3, 1, 12),
+    )
+
+
+def test_photo_response_keeps_keys_on_local_storage():
+    data = ClaimPhotoResponse.model_validate(make_photo()).model_dump()
+
+    assert data["photo_url"] == "uploads/a.jpg"
+    assert data["thumbnail_url"] == "uploads/a_thumb.jpg"
+    assert data["created_at"] == datetime(2024, 3, 1, 12)
+
+
+def test_photo_response_returns_presigned_urls_on_s3():
+    client = MagicMock()
+    client.generate_presigned_url.side_effect = (
+        lambda op, Params, ExpiresIn: f"https://s3.test/{Params['Key']}?sig"
+    )
+    backend = S3StorageBackend("photos", client=client)
+
+    with patch("app.schemas.claims.storage_service.backend", backend):
+        data = ClaimPhotoResponse.model_validate(make_photo()).model_dump()
+
+    assert data["photo_url"] == "https://s3.test/uploads/a.jpg?sig"
+    assert data["thumbnail_url"] == "https://s3.test/uploads/a_thumb.jpg?sig"
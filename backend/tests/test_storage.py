@@ -2,10 +2,15 @@ import os
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi import HTTPException, UploadFile, status
+from fastapi import HTTPException, status
 
-from app.core.config import settings
-from app.services.storage import UPLOAD_DIR, StorageService
+from app.services.storage import (
+    S3_MIN_PART_SIZE,
+    UPLOAD_DIR,
+    LocalStorageBackend,
+    S3StorageBackend,
+    StorageService,
+)
 
 
 @patch("app.services.storage.os.makedirs")
@@ -41,85 +46,137 @@ def test_storage_service_init_does_not_create_dir(mock_exists, mock_makedirs):
 @patch("app.services.storage.uuid4")
 @patch("app.services.storage.os.makedirs")
 @patch("app.services.storage.os.path.exists")
-async def test_upload_file(mock_exists, mock_makedirs, mock_uuid4, mock_aiofiles_open):
+@patch("app.services.storage.os.remove")
+async def test_upload_stream_removes_partial_file_on_error(
+    mock_remove, mock_exists, mock_makedirs, mock_uuid4, mock_aiofiles_open
+):
     # Setup
     mock_exists.return_value = True
     mock_uuid4.return_value = "1234-5678"
-
-    mock_file = MagicMock(spec=UploadFile)
-    mock_file.filename = "test_image.jpg"
-    mock_file.size = 100
-    mock_file.file = MagicMock()
-    mock_file.file.read.side_effect = [b"dummy content", b""]
-
-    # Mocking async read
-    async def mock_read(size):
-        if not hasattr(mock_read, "called"):
-            mock_read.called = True
-            return b"dummy content"
-        return b""
-
-    mock_file.read = mock_read
-
-    # Mocking aiofiles open
     mock_file_obj = AsyncMock()
     mock_aiofiles_open.return_value.__aenter__.return_value = mock_file_obj
 
+    async def failing_chunks():
+        yield b"first chunk"
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
     # Execute
-    with patch("app.services.storage.shutil.copyfileobj"):
-        service = StorageService()
-        file_path = await service.upload_file(mock_file)
+    service = StorageService()
+    with pytest.raises(HTTPException):
+        await service.upload_stream(failing_chunks(), ".jpg")
 
     # Assert
-    expected_file_path = os.path.join(UPLOAD_DIR, "1234-5678.jpg")
-    assert file_path == expected_file_path
+    mock_file_obj.write.assert_awaited_once_with(b"first chunk")
+    mock_remove.assert_called_once_with(os.path.join(UPLOAD_DIR, "1234-5678.jpg"))
+
+
+class NoSuchKey(Exception):
+    response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the boto3 S3 client calls the backend makes."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body):
+        self.objects[(Bucket, Key)] = bytes(Body)
+
+    def get_object(self, Bucket, Key, Range=None):
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey()
+        data = self.objects[(Bucket, Key)]
+        if Range:
+            first, last = Range.removeprefix("bytes=").split("-")
+            data = data[int(first) : int(last) + 1 if last else None]
+        return {"Body": MagicMock(read=MagicMock(return_value=data))}
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKey()
+        return {}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def create_multipart_upload(self, Bucket, Key):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(
+            parts[part["PartNumber"]] for part in MultipartUpload["Parts"]
+        )
 
-    # mock_aiofiles_open is not called because size is provided, it uses sync copy
-    mock_aiofiles_open.assert_not_called()
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
 
+    def generate_presigned_url(self, operation, Params, ExpiresIn):
+        return f"https://s3.test/{Params['Bucket']}/{Params['Key']}?expires={ExpiresIn}"
+
+
+async def chunked(data, size):
+    for i in range(0, len(data), size):
+        yield data[i : i + size]
 
 
 @pytest.mark.asyncio
-@patch("app.services.storage.aiofiles.open")
-@patch("app.services.storage.uuid4")
-@patch("app.services.storage.os.makedirs")
-@patch("app.services.storage.os.path.exists")
-@patch("app.services.storage.os.remove")
-async def test_upload_file_exceeds_size_limit(
-    mock_remove, mock_exists, mock_makedirs, mock_uuid4, mock_aiofiles_open
-):
-    # Setup
-    mock_exists.return_value = True
-    mock_uuid4.return_value = "1234-5678"
+async def test_s3_backend_streams_large_upload_as_multipart():
+    client = FakeS3Client()
+    backend = S3StorageBackend("photos", client=client, part_size=S3_MIN_PART_SIZE)
+    service = StorageService(backend=backend)
+    data = os.urandom(S3_MIN_PART_SIZE * 2 + 123)
 
-    mock_file = MagicMock(spec=UploadFile)
-    mock_file.filename = "test_large_image.jpg"
-    mock_file.size = settings.MAX_UPLOAD_SIZE + 1
-    mock_file.file = MagicMock()
-    mock_file.file.read.side_effect = [b"A" * (settings.MAX_UPLOAD_SIZE + 1), b""]
+    key = await service.upload_stream(chunked(data, 64 * 1024), ".jpg")
 
-    # Mocking async read to return more than MAX_UPLOAD_SIZE
-    async def mock_read(size):
-        if not hasattr(mock_read, "called"):
-            mock_read.called = True
-            return b"A" * (settings.MAX_UPLOAD_SIZE + 1)
-        return b""
+    assert key.startswith(f"{UPLOAD_DIR}/") and key.endswith(".jpg")
+    assert client.objects[("photos", key)] == data
+    assert client.uploads == {}  # completed as one 3-part multipart upload
+    assert await service.read_bytes(key, 10, 20) == data[10:20]
+    assert await service.exists(key)
+    assert await service.presigned_url(key, 60) == (
+        f"https://s3.test/photos/{key}?expires=60"
+    )
 
-    mock_file.read = mock_read
+    await service.delete_file(key)
+    assert not await service.exists(key)
+    with pytest.raises(FileNotFoundError):
+        await service.read_bytes(key)
 
-    # Mocking aiofiles open
-    mock_file_obj = AsyncMock()
-    mock_aiofiles_open.return_value.__aenter__.return_value = mock_file_obj
 
-    # Execute and Assert Exception
-    service = StorageService()
-    os.path.join(UPLOAD_DIR, "1234-5678.jpg")
+@pytest.mark.asyncio
+async def test_s3_backend_aborts_multipart_upload_on_error():
+    client = FakeS3Client()
+    backend = S3StorageBackend("photos", client=client, part_size=S3_MIN_PART_SIZE)
 
-    with pytest.raises(HTTPException) as exc_info:
-        with patch("app.services.storage.shutil.copyfileobj"):
-            await service.upload_file(mock_file)
+    async def failing_chunks():
+        yield b"A" * S3_MIN_PART_SIZE
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+    with pytest.raises(HTTPException):
+        await backend.save_stream("uploads/big.jpg", failing_chunks())
+
+    assert client.aborted == ["upload-0"]
+    assert client.objects == {}
+
+
+@pytest.mark.asyncio
+async def test_local_backend_ranged_read_and_write(tmp_path):
+    service = StorageService(backend=LocalStorageBackend(root=str(tmp_path)))
 
-    # Assert Status Code and Cleanup
-    assert exc_info.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    await service.write_bytes("uploads/a.bin", b"0123456789")
 
-    # The exception is thrown BEFORE writing in this case
+    assert await service.read_bytes("uploads/a.bin", 2, 5) == b"234"
+    assert await service.read_bytes("/uploads/a.bin", 7) == b"789"
+    assert await service.presigned_url("uploads/a.bin") is None
+    assert os.listdir(tmp_path / UPLOAD_DIR) == ["a.bin"]
@@ -0,0 +1,169 @@
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.core.metrics import metrics
+from app.schemas.assessment import DamageAssessment
+from app.services.ai_service import ClaudeAIService
+from app.services.structured_output import (
+    IncrementalJSONObjectParser,
+    parse_json_object,
+)
+
+ASSESSMENT = {
+    "severity": "minor",
+    "damaged_parts": ["rear_bumper"],
+    "estimated_cost": 800.0,
+    "confidence": 0.95,
+    "fraud_indicators": [],
+    "reasoning": 'Scuffed bumper, no {structural} "damage".',
+}
+
+
+def chunks(text, size=7):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_handles_fences_prose_and_trailing_garbage():
+    text = (
+        "Sure {not json}, here it is:\n```json\n"
+        + json.dumps(ASSESSMENT)
+        + "\n```\nLet me know if you need anything { else"
+    )
+    parser = IncrementalJSONObjectParser()
+
+    done = [parser.feed(chunk) for chunk in chunks(text)]
+
+    assert parser.result == ASSESSMENT
+    # Finished on the closing brace, before the trailing text
+    assert done.index(True) < len(done) - 3
+    assert parse_json_object(text) == ASSESSMENT
+
+
+def test_parser_stops_once_required_fields_are_complete():
+    text = json.dumps({"a": {"nested": [1, 2]}, "b": "x,y", "c": 3, "d": "long tail"})
+    parser = IncrementalJSONObjectParser(required_fields=["a", "b"])
+
+    stopped_at = next(i for i, char in enumerate(text) if parser.feed(char))
+
+    assert parser.result == {"a": {"nested": [1, 2]}, "b": "x,y"}
+    assert text[stopped_at] == ","
+
+
+def test_parser_returns_none_for_incomplete_object():
+    assert parse_json_object('{"severity": "minor", "damaged') is None
+
+
+def test_assessment_schema_normalizes_and_rejects_bad_values():
+    parsed = DamageAssessment.model_validate(
+        {**ASSESSMENT, "severity": "Total Loss", "estimated_cost": "1200.50"}
+    )
+    assert parsed.severity == "total_loss"
+    assert parsed.estimated_cost == 1200.5
+
+    with pytest.raises(ValueError):
+        DamageAssessment.model_validate({**ASSESSMENT, "confidence": 1.5})
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.consumed = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.consumed == len(self.parts):
+            raise StopAsyncIteration
+        self.consumed += 1
+        return self.parts[self.consumed - 1]
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_streamed_assessment_stops_once_schema_fields_arrive():
+    metrics.reset()
+    body = json.dumps({**ASSESSMENT, "notes": "extra member, not needed"})
+    parts = [
+        AIMessageChunk(
+            content="",
+            usage_metadata={
+                "input_tokens": 1600,
+                "output_tokens": 0,
+                "total_tokens": 1600,
+                "input_token_details": {"cache_read": 1500},
+            },
+        ),
+        *(AIMessageChunk(content=[{"type": "text", "text": c}]) for c in chunks(body)),
+        AIMessageChunk(content=" trailing notes that are never read"),
+    ]
+    stream = FakeStream(parts)
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.astream = MagicMock(return_value=stream)
+
+    result = await service._invoke_with_retries([], stream=True)
+
+    assert result == ASSESSMENT
+    assert stream.consumed < len(parts) - 2
+    assert stream.closed
+    assert metrics.get("llm.cache_read_input_tokens") == 1500
+    assert metrics.get("llm.input_tokens") == 100
+    assert metrics.get("llm.prompt_cache_hits") == 1
+
+
+@pytest.mark.asyncio
+async def test_streamed_usage_falls_back_to_response_metadata():
+    # Older langchain-anthropic releases leave usage_metadata unset on chunks
+    metrics.reset()
+    parts = [
+        AIMessageChunk(
+            content="",
+            response_metadata={
+                "usage": {"input_tokens": 900, "cache_creation_input_tokens": 1400}
+            },
+        ),
+        AIMessageChunk(content=json.dumps(ASSESSMENT)),
+        AIMessageChunk(content="", response_metadata={"usage": {"output_tokens": 75}}),
+    ]
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.astream = MagicMock(return_value=FakeStream(parts))
+
+    result = await service._invoke_with_retries([], stream=True)
+
+    assert result == ASSESSMENT
+    assert metrics.get("llm.input_tokens") == 900
+    assert metrics.get("llm.cache_creation_input_tokens") == 1400
+    assert metrics.get("llm.prompt_cache_misses") == 1
+
+
+@pytest.mark.asyncio
+async def test_schema_violations_fall_back_to_parse_failure():
+    service = ClaudeAIService()
+    service.client = MagicMock()
+    service.client.astream = MagicMock(
+        return_value=FakeStream(
+            [AIMessageChunk(content=json.dumps({**ASSESSMENT, "severity": "bad"}))]
+        )
+    )
+    vision = MagicMock()
+
+    async def detect_damage(urls):
+        return {"status": "error", "detections": []}
+
+    vision.detect_damage = detect_damage
+    with (
+        patch("app.services.ai_service.settings.AI_CACHE_ENABLED", False),
+        patch("app.services.ai_service.vision_batcher", vision),
+    ):
+        result = await service.assess_damage([], {}, {})
+
+    assert result["confidence"] == 0.0
+    assert result["reasoning"] == "Failed to parse AI response."
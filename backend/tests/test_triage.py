@@ -0,0 +1,131 @@
+import uuid
+from datetime import date
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+from app.core.database import Base
+from app.models.claims import Claim, ClaimAuditLog, ClaimPhoto
+from app.models.policies import Policy
+from app.services.policy_store import PolicyStore
+from app.services.triage_service import TriageService
+from app.tasks import process_claim_analysis_async
+
+ACTIVE_POLICY = {"status": "Active", "coverage_limit": 50000.0, "deductible": 500.0}
+
+
+def vision(*detections):
+    return {"status": "success", "detections": list(detections)}
+
+
+def test_claims_needing_the_llm_are_not_triaged():
+    minor = {"class": "minor_damage", "confidence": 0.9}
+    unsure_major = {"class": "major_damage", "confidence": 0.3}
+
+    assert TriageService.evaluate(ACTIVE_POLICY, vision(minor, unsure_major)) is None
+    assert TriageService.evaluate(ACTIVE_POLICY, {"status": "error"}) is None
+
+
+def test_confident_major_damage_goes_straight_to_manual_review():
+    result = TriageService.evaluate(
+        ACTIVE_POLICY,
+        vision({"class": "major_damage", "confidence": 0.82}),
+        min_vision_confidence=0.6,
+    )
+
+    assert result["status"] == "Manual Review"
+    assert result["rule"] == "severe_damage_detected"
+    assert "major_damage" in result["reason"]
+
+
+def test_policy_and_duplicate_rules():
+    inactive = TriageService.evaluate({"status": "Lapsed"}, vision())
+    assert (inactive["status"], inactive["rule"]) == ("Rejected", "inactive_policy")
+
+    duplicate = TriageService.evaluate(
+        ACTIVE_POLICY, vision(), duplicate_photos=[{"photo_id": "x"}]
+    )
+    assert (duplicate["status"], duplicate["rule"]) == (
+        "Manual Review",
+        "duplicate_photos",
+    )
+
+    exhausted = TriageService.evaluate(
+        {"status": "Active", "coverage_limit": 500.0, "deductible": 500.0}, vision()
+    )
+    assert exhausted["rule"] == "no_available_coverage"
+
+    unknown = TriageService.evaluate(None, vision())
+    assert (unknown["status"], unknown["rule"]) == ("Manual Review", "unknown_policy")
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pipeline_skips_llm_and_records_why(session_factory):
+    claim_id = uuid.uuid4()
+    async with session_factory() as db:
+        db.add(
+            Policy(
+                policy_number="POL-1",
+                holder_name="Alex Driver",
+                coverage_limit=50000,
+                deductible=500,
+                effective_date=date(2026, 1, 1),
+                expiration_date=date(2027, 1, 1),
+            )
+        )
+        claim = Claim(
+            id=claim_id,
+            policy_number="POL-1",
+            claim_number="CLM-1",
+            estimated_damage_cost=4200.0,
+        )
+        claim.photos.append(ClaimPhoto(photo_url="uploads/a.jpg"))
+        db.add(claim)
+        await db.commit()
+
+    vision_batcher = AsyncMock()
+    vision_batcher.detect_damage.return_value = {
+        **vision({"class": "major_damage", "confidence": 0.9}),
+        "highest_severity": "major",
+        "damaged_parts": [],
+    }
+    ai_service = AsyncMock()
+    redis = AsyncMock()
+    redis.get.return_value = None
+    with (
+        patch("app.tasks.AsyncSessionLocal", session_factory),
+        patch("app.tasks.policy_store", PolicyStore(session_factory=session_factory)),
+        patch("app.services.policy_store.get_redis_client", return_value=redis),
+        patch("app.tasks.vision_batcher", vision_batcher),
+        patch("app.tasks.ai_service", ai_service),
+        patch("app.tasks.email_task"),
+    ):
+        await process_claim_analysis_async(claim_id)
+
+    ai_service.assess_damage.assert_not_called()
+    async with session_factory() as db:
+        claim = await db.get(Claim, claim_id)
+        logs = (await db.execute(select(ClaimAuditLog))).scalars().all()
+        photo = (await db.execute(select(ClaimPhoto))).scalars().one()
+
+    assert claim.status == "Manual Review"
+    assert photo.ai_analysis["llm_skipped"] is True
+    by_action = {log.action: log.details for log in logs}
+    assert by_action["llm_triage_skip"]["rule"] == "severe_damage_detected"
+    assert by_action["auto_adjudication"]["llm_skipped"] is True
+    # No LLM estimate, so the stored cost is kept and fraud is not scored on it
+    assert claim.estimated_damage_cost == 4200.0
+    assert (claim.fraud_score, claim.fraud_scored_at) == (None, None)
+    assert by_action["auto_adjudication"]["fraud_score"] is None
+    assert by_action["auto_adjudication"]["ml_method"] == "not_computed"
@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.vision_batcher import VisionBatchScheduler
+from app.services.vision_service import YoloVisionService
+
+
+def make_vision_service(predict_batch):
+    with patch("app.services.vision_service.HAS_YOLO", False):
+        service = YoloVisionService()
+    service.model = MagicMock()
+    service.predict_batch = MagicMock(side_effect=predict_batch)
+    return service
+
+
+def severity_detections(urls, max_batch_size=None):
+    return [
+        [
+            {
+                "class": "major_damage" if "major" in url else "minor_damage",
+                "confidence": 0.9,
+                "box": [0, 0, 1, 1],
+            }
+        ]
+        for url in urls
+    ]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_share_one_forward_pass():
+    service = make_vision_service(severity_detections)
+    scheduler = VisionBatchScheduler(service, window_ms=20, max_batch_size=16)
+
+    try:
+        first, second = await asyncio.gather(
+            scheduler.detect_damage(["claim1_a.jpg", "claim1_b.jpg"]),
+            scheduler.detect_damage(["claim2_major.jpg"]),
+        )
+    finally:
+        await scheduler.close()
+
+    service.predict_batch.assert_called_once_with(
+        ["claim1_a.jpg", "claim1_b.jpg", "claim2_major.jpg"], 16
+    )
+    assert first["highest_severity"] == "minor"
+    assert len(first["detections"]) == 2
+    assert second["highest_severity"] == "major"
+    assert len(second["detections"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_is_flushed_when_full():
+    service = make_vision_service(severity_detections)
+    scheduler = VisionBatchScheduler(service, window_ms=1000, max_batch_size=2)
+
+    try:
+        result = await asyncio.wait_for(
+            scheduler.detect_damage(["a.jpg", "b.jpg", "c.jpg"]), timeout=5
+        )
+    finally:
+        await scheduler.close()
+
+    assert [call.args[0] for call in service.predict_batch.call_args_list] == [
+        ["a.jpg", "b.jpg"],
+        ["c.jpg"],
+    ]
+    assert len(result["detections"]) == 3
+
+
+@pytest.mark.asyncio
+async def test_inference_error_is_propagated_to_callers():
+    def failing_predict(urls, max_batch_size=None):
+        raise RuntimeError("model crashed")
+
+    service = make_vision_service(failing_predict)
+    scheduler = VisionBatchScheduler(service, window_ms=5)
+
+    try:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            await scheduler.detect_damage(["a.jpg"])
+    finally:
+        await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_direct_call_without_model():
+    with patch("app.services.vision_service.HAS_YOLO", False):
+        service = YoloVisionService()
+    scheduler = VisionBatchScheduler(service)
+
+    result = await scheduler.detect_damage(["a.jpg"])
+
+    assert result["status"] == "error"
+    assert scheduler._consumer is None
+
+
+@pytest.mark.asyncio
+async def test_availability_check_does_not_load_the_model_on_the_loop():
+    service = YoloVisionService()
+    service.load = MagicMock()
+    service.predict_batch = MagicMock(side_effect=severity_detections)
+    scheduler = VisionBatchScheduler(service, window_ms=1)
+
+    with patch("app.services.vision_service.HAS_YOLO", True):
+        result = await scheduler.detect_damage(["major.jpg"])
+    await scheduler.close()
+
+    service.load.assert_not_called()
+    assert result["highest_severity"] == "major"
@@ -0,0 +1,158 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+from app.services.vision_service import YoloVisionService
+
+
+class FakeTensor:
+    def __init__(self, value):
+        self.value = value
+
+    def item(self):
+        return self.value
+
+    def tolist(self):
+        return self.value
+
+
+class FakeBox:
+    def __init__(self, cls_id, conf, xyxy=None):
+        self.cls = [FakeTensor(cls_id)]
+        self.conf = [FakeTensor(conf)]
+        self.xyxy = [FakeTensor(xyxy or [0.0, 0.0, 10.0, 10.0])]
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_service(model):
+    with patch("app.services.vision_service.HAS_YOLO", False):
+        service = YoloVisionService()
+    service.model = model
+    return service
+
+
+def test_detect_damage_without_model_returns_error():
+    service = make_service(None)
+
+    result = service.detect_damage(["uploads/a.jpg"])
+
+    assert result["status"] == "error"
+    assert result["detections"] == []
+
+
+def test_detect_damage_batches_images_in_one_forward_pass():
+    model = MagicMock(
+        return_value=[
+            FakeResult([FakeBox(1, 0.912)]),
+            FakeResult([FakeBox(3, 0.5)]),
+            FakeResult([FakeBox(2, 0.77)]),
+        ]
+    )
+    service = make_service(model)
+
+    with patch.object(service, "_decode_image", side_effect=lambda url: url):
+        result = service.detect_damage(["a.jpg", "b.jpg", "c.jpg"])
+
+    model.assert_called_once_with(["a.jpg", "b.jpg", "c.jpg"])
+    assert result["status"] == "success"
+    assert result["highest_severity"] == "major"
+    assert result["damaged_parts"] == ["front_bumper"]
+    assert [d["class"] for d in result["detections"]] == [
+        "moderate_damage",
+        "front_bumper",
+        "major_damage",
+    ]
+    assert result["detections"][0]["confidence"] == 0.91
+
+
+def test_detect_damage_respects_max_batch_size():
+    model = MagicMock(
+        side_effect=lambda images: [FakeResult([FakeBox(0, 0.6)]) for _ in images]
+    )
+    service = make_service(model)
+
+    with patch.object(service, "_decode_image", side_effect=lambda url: url):
+        result = service.detect_damage(
+            ["a.jpg", "b.jpg", "c.jpg", "d.jpg", "e.jpg"], max_batch_size=2
+        )
+
+    assert [call.args[0] for call in model.call_args_list] == [
+        ["a.jpg", "b.jpg"],
+        ["c.jpg", "d.jpg"],
+        ["e.jpg"],
+    ]
+    assert len(result["detections"]) == 5
+
+
+def test_predict_batch_skips_missing_images_and_keeps_order():
+    model = MagicMock(return_value=[FakeResult([FakeBox(2, 0.8)])])
+    service = make_service(model)
+
+    with patch.object(
+        service,
+        "_decode_image",
+        side_effect=lambda url: None if url == "missing.jpg" else url,
+    ):
+        per_image = service.predict_batch(["missing.jpg", "present.jpg"])
+
+    model.assert_called_once_with(["present.jpg"])
+    assert per_image[0] == []
+    assert per_image[1][0]["class"] == "major_damage"
+
+
+def test_predict_batch_falls_back_to_single_images_on_batch_error():
+    def fake_model(images):
+        if isinstance(images, list):
+            raise RuntimeError("batch failed")
+        if images == "bad.jpg":
+            raise RuntimeError("corrupt image")
+        return [FakeResult([FakeBox(1, 0.7)])]
+
+    service = make_service(MagicMock(side_effect=fake_model))
+
+    with patch.object(service, "_decode_image", side_effect=lambda url: url):
+        per_image = service.predict_batch(["good.jpg", "bad.jpg"])
+
+    assert per_image[0][0]["class"] == "moderate_damage"
+    assert per_image[1] == []
+
+
+def test_storage_errors_skip_the_image_instead_of_failing_the_batch():
+    model = MagicMock(return_value=[FakeResult([FakeBox(0, 0.9)])])
+    service = make_service(model)
+    reads = {
+        "uploads/inference/ok.jpg": TimeoutError("read timed out"),
+        "uploads/ok.jpg": b"original bytes",
+    }
+
+    def read_bytes_sync(key):
+        outcome = reads.get(key, ConnectionError("storage unavailable"))
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    cv2 = MagicMock()
+    cv2.imdecode.side_effect = lambda data, flags: bytes(data)
+    with (
+        # Imported together with opencv, which the test environment may lack
+        patch("app.services.vision_service.cv2", cv2, create=True),
+        patch("app.services.vision_service.np", np, create=True),
+        patch(
+            "app.services.vision_service.inference_image_path",
+            side_effect=lambda url: url.replace("uploads/", "uploads/inference/"),
+        ),
+        patch(
+            "app.services.vision_service.storage_service.read_bytes_sync",
+            side_effect=read_bytes_sync,
+        ),
+    ):
+        per_image = service.predict_batch(["uploads/broken.jpg", "uploads/ok.jpg"])
+
+    # The variant timed out, so the original was used for the readable photo
+    model.assert_called_once_with([b"original bytes"])
+    assert per_image[0] == []
+    assert per_image[1][0]["class"] == "minor_damage"
@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.core.worker_loop import WorkerEventLoop
+
+
+async def current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_tasks_share_one_persistent_loop():
+    worker_loop = WorkerEventLoop()
+    worker_loop.start()
+    try:
+        first = worker_loop.run(current_loop())
+        second = worker_loop.run(current_loop())
+    finally:
+        worker_loop.stop()
+
+    assert first is second
+    assert not worker_loop.is_running
+
+
+def test_run_without_started_loop_falls_back_to_asyncio_run():
+    worker_loop = WorkerEventLoop()
+
+    first = worker_loop.run(current_loop())
+    second = worker_loop.run(current_loop())
+
+    assert first is not second
+    assert first.is_closed()
+
+
+def test_stop_runs_shutdown_coroutine_on_the_loop():
+    worker_loop = WorkerEventLoop()
+    worker_loop.start()
+    loop = worker_loop.run(current_loop())
+    seen = []
+
+    async def shutdown():
+        seen.append(asyncio.get_running_loop())
+
+    worker_loop.stop(shutdown())
+
+    assert seen == [loop]
+    assert loop.is_closed()
+
+
+def test_exceptions_propagate_to_the_caller():
+    worker_loop = WorkerEventLoop()
+    worker_loop.start()
+
+    async def boom():
+        raise ValueError("bad claim")
+
+    try:
+        with pytest.raises(ValueError, match="bad claim"):
+            worker_loop.run(boom())
+    finally:
+        worker_loop.stop()
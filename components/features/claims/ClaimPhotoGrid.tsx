@@ -3,12 +3,18 @@ import { API_URL } from "@/lib/api-client";
 interface Photo {
   id: string;
   photo_url: string;
+  thumbnail_url?: string | null;
 }
 
 interface ClaimPhotoGridProps {
   photos: Photo[];
 }
 
+// Presigned storage URLs are absolute; local storage keys are served by the API
+function photoSrc(url: string) {
+  return /^https?:\/\//.test(url) ? url : `${API_URL}${url}`;
+}
+
 export function ClaimPhotoGrid({ photos }: ClaimPhotoGridProps) {
   if (!photos || photos.length === 0) return null;
 
@@ -22,7 +28,7 @@ export function ClaimPhotoGrid({ photos }: ClaimPhotoGridProps) {
             className="relative aspect-video rounded-lg overflow-hidden border shadow-sm"
           >
             <img
-              src={`${API_URL}${photo.photo_url}`}
+              src={photoSrc(photo.thumbnail_url ?? photo.photo_url)}
               alt="Damage"
               className="object-cover w-full h-full"
             />